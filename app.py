@@ -1,14 +1,15 @@
 # app.py — Manual Prediction + Dataset Insights + Platform Filtering + Full Logging
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-from pathlib import Path
-from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
-from src.Utils import load_joblib, read_parquet
-from src.components.data_transformation import coerce_and_engineer, get_feature_sets
-from src.logger import get_logger
-import numpy as np
 import math
+import os
+import time
+from pathlib import Path
+
+import streamlit as st
+
+from src.logger import get_logger, timed
+from src.startup import import_profile, mark_first_paint, start_import_profile, warm_up
+
+_script_start = time.perf_counter()
 
 # ---------------------------------------------------------
 # PAGE CONFIG
@@ -19,26 +20,53 @@ st.title("📈 Social Media Post Popularity — Manual Input & Platform Insights
 log = get_logger(__name__)
 log.info("🚀 Streamlit app started")
 
-processed_path = Path("artifacts/processed.parquet")
+# partitioned dataset written by train_pipeline; legacy single-file layout as fallback
+processed_path = Path("artifacts/processed")
+if not processed_path.exists():
+    processed_path = Path("artifacts/processed.parquet")
 model_path = Path("artifacts/model.joblib")
-
-# ---------------------------------------------------------
-# LOAD PROCESSED DATA
-# ---------------------------------------------------------
-df = None
-if processed_path.exists():
-    try:
-        df = read_parquet(str(processed_path))
-        # normalize platform column for filtering
-        if "platform" in df.columns:
-            df["platform"] = df["platform"].astype(str).str.strip().str.lower()
-        log.info(f"✅ Loaded dataset from {processed_path} with shape {df.shape}")
-    except Exception as e:
-        log.exception(f"❌ Failed to read parquet file: {e}")
-        st.error("Failed to load processed dataset — check logs.")
-else:
-    log.warning("⚠️ Processed dataset not found at artifacts/processed.parquet")
-    st.warning("⚠️ Processed dataset not found. Run training pipeline first to generate artifacts/processed.parquet.")
+summary_path = Path("artifacts/platform_summary.json")
+
+
+def warm_up_tasks() -> dict:
+    """
+    What the sections below the form need, loaded in page order on the warm-up thread.
+    Each task imports its own modules: the page's imports may not have run yet.
+    """
+    def modules():
+        import plotly.express, plotly.graph_objects, sklearn.metrics, scipy.sparse  # noqa: F401
+
+    def summary():
+        from src.Utils import cached_artifact
+        from src.components.model_evaluation import load_platform_summary
+        if summary_path.exists():
+            cached_artifact(str(summary_path), load_platform_summary)
+
+    def model():
+        from src.Utils import cached_artifact
+        from src.components.feature_schema import resolve_schema
+        from src.components.feature_store import FeatureStore, store_path_for
+        from src.components.forest_compiler import load_predictor
+        if model_path.exists():
+            cached_artifact(str(model_path), load_predictor)
+            cached_artifact(str(model_path), resolve_schema, name="feature_schema")
+            if store_path_for(model_path).exists():
+                cached_artifact(str(store_path_for(model_path)), FeatureStore.load)
+
+    def post_index():
+        from src.Utils import cached_artifact
+        from src.components.post_index import build_post_index
+        if processed_path.exists():
+            cached_artifact(str(processed_path), lambda p: build_post_index(p, model_path), name="post_index",
+                            depends_on=[model_path])
+
+    return {"modules": modules, "summary": summary, "model": model, "post_index": post_index}
+
+
+# artifacts load in the background while the manual form below is already usable; imports
+# are profiled from here on, so modules the warm-up loads first are in the profile too
+start_import_profile()
+warm_up(warm_up_tasks())
 
 # ---------------------------------------------------------
 # MANUAL INPUT FORM (uses exact formula ER = (likes+comments+shares)/followers)
@@ -84,6 +112,8 @@ if submitted:
         st.info(f"🔥 Popularity Level: **{label}**")
 
         # Engagement Rate Meter (percentage bar)
+        import plotly.express as px
+
         color = "#ef4444" if label == "LOW" else ("#facc15" if label == "MEDIUM" else "#22c55e")
         fig = px.bar(x=["Engagement Rate"], y=[er_pct],
                      color_discrete_sequence=[color],
@@ -99,38 +129,274 @@ if submitted:
         st.error(f"Prediction failed: {e}")
         log.exception("❌ Manual prediction error")
 
+
+mark_first_paint((time.perf_counter() - _script_start) * 1000)
+
+# ---------------------------------------------------------
+# DEFERRED IMPORTS — after the form is on screen; per-module times go to logs/startup_profile.json
+# ---------------------------------------------------------
+with import_profile():
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from src.Utils import cached_artifact, processed_columns, read_processed
+    from src.components.data_transformation import coerce_and_engineer
+    from src.components.feature_schema import as_model_input, build_matrix, resolve_schema, source_columns
+    from src.components.feature_store import FeatureStore, store_path_for, uses_history
+    from src.components.forest_compiler import load_predictor
+    from src.components.model_evaluation import (
+        ALL_PLATFORMS, MAX_SCATTER_POINTS, histogram_bins, load_platform_summary, summarize_predictions,
+        summary_platforms,
+    )
+    from src.components.post_index import SORT_KEYS as POST_SORT_KEYS, build_post_index, page
+    from src.components.prediction_cache import open_prediction_cache
+    from src.components.what_if import (
+        DIMENSIONS as SWEEP_DIMENSIONS, MEDIA_TYPES as WHAT_IF_MEDIA_TYPES, PLATFORMS as WHAT_IF_PLATFORMS,
+        best_scenario, cached_sweep, follower_grid, sweep_grid,
+    )
+
+# scatter point cap: a slider in the sidebar, defaulting to DASHBOARD_MAX_POINTS
+DEFAULT_MAX_POINTS = int(os.getenv("DASHBOARD_MAX_POINTS", MAX_SCATTER_POINTS))
+MAX_POINTS_LIMIT = 20_000
+
+
+def load_platforms(path: str) -> list:
+    """Distinct platforms, reading only the 'platform' column."""
+    if "platform" not in processed_columns(path):
+        return []
+    values = read_processed(path, columns=["platform"])["platform"].dropna()
+    return sorted(values.astype(str).str.strip().str.lower().unique())
+
+
+def load_platform_view(path: str, platform: str) -> pd.DataFrame:
+    """
+    Read one platform's rows (partition pruning + column pushdown) once per artifact
+    version; the frame is shared across sessions and must be treated as read-only.
+    """
+    available = processed_columns(path)
+    columns = None
+    if model_path.exists():
+        schema = cached_artifact(str(model_path), resolve_schema, name="feature_schema")
+        wanted = source_columns(schema) + ["engagement_rate", "platform", "posted_at"]
+        columns = [c for c in dict.fromkeys(wanted) if c in available]
+    filters = [("platform", "==", platform)] if platform != "All" and "platform" in available else None
+    data = read_processed(path, columns=columns, filters=filters)
+    # normalize platform column for filtering
+    if "platform" in data.columns:
+        data["platform"] = data["platform"].astype(str).str.strip().str.lower()
+    return data
+
+
+def load_feature_store(schema: dict):
+    """Feature store next to the model when the schema uses history features (shared, read-only)."""
+    path = store_path_for(model_path)
+    if not uses_history(schema) or not path.exists():
+        return None
+    return cached_artifact(str(path), FeatureStore.load)
+
+
+def histogram_figure(counts, edges, title: str):
+    """Bar chart of pre-binned counts — the payload is one bar per bin, not one value per row."""
+    edges = np.asarray(edges, dtype=float)
+    h = px.bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, title=title, color_discrete_sequence=["#60a5fa"])
+    h.update_traces(width=float(edges[1] - edges[0]) if len(edges) > 1 else None)
+    h.update_layout(xaxis_title="Engagement Rate (fraction)", yaxis_title="Count",
+                    bargap=0, plot_bgcolor="rgba(0,0,0,0)")
+    return h
+
+
+def actual_vs_predicted_figure(s: dict, view: str, max_points: int, title: str):
+    """
+    Density heatmap or point sample of a summary from summarize_predictions, plus its
+    full-data trendline. 'Auto' shows the density once the slice has more rows than max_points.
+    """
+    has_density = len(s.get("density_counts") or []) > 0
+    use_density = has_density and (view == "Density" or (view == "Auto" and s["n"] > max_points))
+    labels = {"x": "Actual ER", "y": "Predicted ER"}
+
+    if use_density:
+        x_edges, y_edges = np.asarray(s["density_x_edges"]), np.asarray(s["density_y_edges"])
+        counts = np.asarray(s["density_counts"], dtype=float)
+        counts[counts == 0] = np.nan  # empty cells stay transparent
+        fig = go.Figure(go.Heatmap(x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+                                   z=counts.T, colorscale="Greens", colorbar=dict(title="Posts")))
+        fig.update_layout(title=title, xaxis_title=labels["x"], yaxis_title=labels["y"])
+        lo, hi = x_edges[0], x_edges[-1]
+    else:
+        actual, pred = np.asarray(s["sample_actual"]), np.asarray(s["sample_pred"])
+        if len(actual) > max_points:  # evenly spaced subset of the stored sample
+            keep = np.linspace(0, len(actual) - 1, max_points).astype(int)
+            actual, pred = actual[keep], pred[keep]
+        fig = px.scatter(x=actual, y=pred, title=title, labels=labels, color_discrete_sequence=["#22c55e"])
+        fig.update_traces(marker=dict(size=5, opacity=0.6))
+        lo, hi = (actual.min(), actual.max()) if len(actual) else (np.nan, np.nan)
+
+    if np.isfinite(lo) and np.isfinite(hi):
+        xs = np.array([lo, hi])
+        ys = s["trend_slope"] * xs + s["trend_intercept"]
+        fig.add_scatter(x=xs, y=ys, mode="lines", showlegend=False, line=dict(color="#16a34a"))
+    return fig
+
+
+# chart settings: how many points the actual/predicted scatter may send to the browser
+st.sidebar.header("⚙️ Chart Settings")
+max_points = st.sidebar.slider("Max scatter points", min_value=100, max_value=MAX_POINTS_LIMIT,
+                               value=min(max(DEFAULT_MAX_POINTS, 100), MAX_POINTS_LIMIT), step=100)
+scatter_view = st.sidebar.radio("Actual vs Predicted view", ["Auto", "Points", "Density"],
+                                help="Auto switches to a density heatmap when a slice has more posts than the point cap.")
+
+# ---------------------------------------------------------
+# WHAT-IF SWEEP — one post across platforms, media types, hours and follower counts
+# ---------------------------------------------------------
+st.markdown("---")
+st.header("🧪 What-if Scenario Sweep")
+
+if not model_path.exists():
+    st.info("Train a model first (artifacts/model.joblib) to explore what-if scenarios.")
+else:
+    with st.form("what_if_form"):
+        w1, w2, w3 = st.columns(3)
+        with w1:
+            wi_likes = st.number_input("Likes", min_value=0, value=100, key="wi_likes")
+            wi_comments = st.number_input("Comments", min_value=0, value=10, key="wi_comments")
+            wi_shares = st.number_input("Shares", min_value=0, value=1, key="wi_shares")
+            wi_saves = st.number_input("Saves", min_value=0, value=5, key="wi_saves")
+        with w2:
+            wi_views = st.number_input("Views", min_value=0, value=1000, key="wi_views")
+            wi_caption = st.number_input("Caption Length (chars)", min_value=0, value=100, key="wi_caption")
+            wi_weekday = st.selectbox("Weekday", list(range(7)), index=2, key="wi_weekday",
+                                      format_func=lambda d: ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][d])
+        with w3:
+            wi_followers = st.slider("Follower range", min_value=100, max_value=1_000_000,
+                                     value=(1_000, 100_000), step=100, key="wi_followers")
+            wi_steps = st.slider("Follower steps", min_value=1, max_value=20, value=8, key="wi_steps")
+            wi_hours = st.slider("Posting hours", min_value=0, max_value=23, value=(0, 23), key="wi_hours")
+        wi_platforms = st.multiselect("Platforms", WHAT_IF_PLATFORMS, default=WHAT_IF_PLATFORMS, key="wi_platforms")
+        wi_media = st.multiselect("Media types", WHAT_IF_MEDIA_TYPES, default=WHAT_IF_MEDIA_TYPES, key="wi_media")
+        run_sweep = st.form_submit_button("Run Sweep")
+
+    # scored only on submit; reruns (e.g. changing the heatmap axes) reuse the session's last sweep
+    model_version = model_path.stat().st_mtime_ns
+    if run_sweep:
+        st.session_state.pop("what_if_sweep", None)
+        if not (wi_platforms and wi_media):
+            st.warning("Select at least one platform and one media type.")
+        else:
+            try:
+                model = cached_artifact(str(model_path), load_predictor)
+                schema = cached_artifact(str(model_path), resolve_schema, name="feature_schema")
+                base = {"likes": int(wi_likes), "comments": int(wi_comments), "shares": int(wi_shares),
+                        "saves": int(wi_saves), "views": int(wi_views), "caption_length": int(wi_caption),
+                        "weekday": int(wi_weekday)}
+                followers_grid = follower_grid(wi_followers[0], wi_followers[1], wi_steps)
+                hours = list(range(wi_hours[0], wi_hours[1] + 1))
+                with timed("app.what_if") as t:
+                    sweep = cached_sweep(str(model_path), model, schema, base, wi_platforms, wi_media, hours,
+                                         followers_grid, load_feature_store(schema))
+                    t.rows = int(sweep["pred"].size)
+                st.session_state["what_if_sweep"] = (model_version, sweep)
+            except Exception as e:
+                st.error(f"What-if sweep failed: {e}")
+                log.exception(f"❌ What-if sweep error: {e}")
+
+    sweep_version, sweep = st.session_state.get("what_if_sweep", (None, None))
+    if sweep is not None and sweep_version == model_version:
+        try:
+            a1, a2 = st.columns(2)
+            rows_dim = a1.selectbox("Heatmap rows", SWEEP_DIMENSIONS, index=0, key="wi_rows")
+            cols_dim = a2.selectbox("Heatmap columns", [d for d in SWEEP_DIMENSIONS if d != rows_dim],
+                                    index=1, key="wi_cols")
+            grid = sweep_grid(sweep, rows_dim, cols_dim) * 100
+            averaged = [d for d in SWEEP_DIMENSIONS if d not in (rows_dim, cols_dim)]
+            fig_sweep = px.imshow(grid, x=[str(v) for v in sweep["axes"][cols_dim]],
+                                  y=[str(v) for v in sweep["axes"][rows_dim]], aspect="auto",
+                                  color_continuous_scale="Viridis", labels={"color": "Predicted ER (%)"},
+                                  title=f"Predicted Engagement Rate (%) — averaged over {' & '.join(averaged)}")
+            fig_sweep.update_layout(xaxis_title=cols_dim, yaxis_title=rows_dim)
+            st.plotly_chart(fig_sweep, use_container_width=True)
+
+            best = best_scenario(sweep)
+            st.success(f"🏆 Best scenario: **{best['platform']}** / **{best['media_type']}** at "
+                       f"**{best['hour']:02d}:00** with **{best['followers']:,}** followers — "
+                       f"predicted ER **{best['engagement_rate'] * 100:.2f}%**")
+            st.caption(f"{sweep['pred'].size:,} scenarios scored in one model call ({sweep['seconds'] * 1000:.0f} ms).")
+        except Exception as e:
+            st.error(f"What-if sweep failed: {e}")
+            log.exception(f"❌ What-if sweep error: {e}")
+    elif not run_sweep:
+        st.caption("Set up a scenario and press **Run Sweep** to score it.")
+
+# ---------------------------------------------------------
+# LOCATE PROCESSED DATA (loaded lazily per platform through src/Utils.cached_artifact)
+# ---------------------------------------------------------
+df_filtered = None
+if not processed_path.exists():
+    log.warning("⚠️ Processed dataset not found at artifacts/processed")
+    st.warning("⚠️ Processed dataset not found. Run training pipeline first to generate artifacts/processed.")
+
+# precomputed per-platform evaluation written by train_and_save (optional)
+summary = None
+if summary_path.exists():
+    try:
+        with timed("app.load_summary"):
+            summary = cached_artifact(str(summary_path), load_platform_summary)
+    except Exception as e:
+        log.exception(f"❌ Failed to read platform summary: {e}")
+
 # ---------------------------------------------------------
 # DATASET VISUAL SECTION — Dynamic Platform Filter
 # ---------------------------------------------------------
 st.markdown("---")
 st.subheader("📊 Dataset Insights by Platform")
 
-if df is not None and len(df):
-    if "platform" in df.columns:
-        platforms = sorted(df["platform"].dropna().unique())
-        selected_platform = st.selectbox("🔍 Select Platform for Analysis", options=["All"] + platforms, index=0)
-        log.info(f"📊 User selected platform filter: {selected_platform}")
-    else:
-        st.warning("⚠️ No 'platform' column found — showing all data.")
-        selected_platform = "All"
-
-    # Filter df for platform
-    if selected_platform != "All" and "platform" in df.columns:
-        df_filtered = df[df["platform"] == selected_platform].copy()
-        st.info(f"📊 Showing data for **{selected_platform.capitalize()}** — {len(df_filtered)} posts")
-    else:
-        df_filtered = df.copy()
-        st.info(f"📊 Showing data for **All Platforms** — {len(df_filtered)} posts")
+selected_platform = "All"
+platform_summary = None
+if summary is not None:
+    platforms = summary_platforms(summary)
+    selected_platform = st.selectbox("🔍 Select Platform for Analysis", options=["All"] + platforms, index=0)
+    log.info(f"📊 User selected platform filter: {selected_platform}")
+    platform_summary = summary["platforms"].get(selected_platform if selected_platform != "All" else ALL_PLATFORMS)
+
+if platform_summary is not None:
+    label_platform = selected_platform.capitalize() if selected_platform != "All" else "All Platforms"
+    st.info(f"📊 Showing data for **{label_platform}** — {platform_summary['n']} posts")
+
+    # Engagement Rate Distribution from precomputed bins
+    st.subheader("Engagement Rate Distribution")
+    h = histogram_figure(platform_summary["hist_counts"], platform_summary["hist_edges"],
+                         f"Engagement Rate Distribution ({selected_platform.capitalize()})")
+    st.plotly_chart(h, use_container_width=True)
+    log.info(f"📈 Rendered engagement histogram for {selected_platform} (precomputed)")
+
+elif processed_path.exists():
+    try:
+        platforms = cached_artifact(str(processed_path), load_platforms)
+        if platforms:
+            selected_platform = st.selectbox("🔍 Select Platform for Analysis", options=["All"] + platforms, index=0)
+            log.info(f"📊 User selected platform filter: {selected_platform}")
+        else:
+            st.warning("⚠️ No 'platform' column found — showing all data.")
+            selected_platform = "All"
+
+        # Read only the selected platform's partition
+        with timed("app.load_platform_view", platform=selected_platform) as t:
+            df_filtered = cached_artifact(str(processed_path), lambda p: load_platform_view(p, selected_platform),
+                                          name=f"platform_view[{selected_platform}]", depends_on=[model_path])
+            t.rows = len(df_filtered)
+        label_platform = selected_platform.capitalize() if selected_platform != "All" else "All Platforms"
+        st.info(f"📊 Showing data for **{label_platform}** — {len(df_filtered)} posts")
+    except Exception as e:
+        log.exception(f"❌ Failed to read processed dataset: {e}")
+        st.error("Failed to load processed dataset — check logs.")
 
+if df_filtered is not None:
     # Engagement Rate Distribution (shown as fraction axis but labels are percentage)
     if "engagement_rate" in df_filtered.columns:
         st.subheader("Engagement Rate Distribution")
-        h = px.histogram(df_filtered, x="engagement_rate", nbins=50,
-                         title=f"Engagement Rate Distribution ({selected_platform.capitalize()})",
-                         color_discrete_sequence=["#60a5fa"])
-        h.update_layout(xaxis_title="Engagement Rate (fraction)", yaxis_title="Count",
-                        plot_bgcolor="rgba(0,0,0,0)")
-        # change x tick labels to show percent in hover and axis doesn't change numeric data
+        # binned with NumPy here; only the bin counts go to the browser
+        counts, edges = histogram_bins(df_filtered["engagement_rate"])
+        h = histogram_figure(counts, edges, f"Engagement Rate Distribution ({selected_platform.capitalize()})")
         st.plotly_chart(h, use_container_width=True)
         log.info(f"📈 Rendered engagement histogram for {selected_platform}")
     else:
@@ -141,110 +407,115 @@ if df is not None and len(df):
 # ---------------------------------------------------------
 st.markdown("### ⚖️ Model Evaluation — Actual vs Predicted Engagement Rate")
 
-if model_path.exists() and df_filtered is not None and "engagement_rate" in df_filtered.columns:
+evaluation_summary = None
+if platform_summary is not None:
+    # precomputed at training time — no scoring on rerun
+    evaluation_summary = platform_summary
+
+elif model_path.exists() and df_filtered is not None and "engagement_rate" in df_filtered.columns:
+    try:
+        with timed("app.evaluation", rows=len(df_filtered), platform=selected_platform):
+            model = cached_artifact(str(model_path), load_predictor)
+            # model-ready matrix from the feature schema saved next to the model
+            schema = cached_artifact(str(model_path), resolve_schema, name="feature_schema")
+            df_eval = coerce_and_engineer(df_filtered, feature_store=load_feature_store(schema))
+            X = build_matrix(df_eval, schema)
+
+            y_true = df_eval["engagement_rate"].to_numpy(dtype=float)
+            # reruns and overlapping platform views reuse predictions of rows already scored
+            prediction_cache = cached_artifact(str(model_path), lambda p: open_prediction_cache(p, "memory"),
+                                               name="prediction_cache")
+            y_pred = prediction_cache.predict(lambda rows: model.predict(as_model_input(model, rows, schema)), X)
+
+            # same aggregates as the training-time summary (bins, density, sample, trendline)
+            evaluation_summary = summarize_predictions(y_true, y_pred, np.random.default_rng(42),
+                                                       max_points=max_points)
+    except Exception as e:
+        st.error(f"Error evaluating model on dataset: {e}")
+        log.exception(f"❌ Evaluation error: {e}")
+else:
+    st.info("Model or dataset not available for evaluation (ensure artifacts/model.joblib and artifacts/processed exist).")
+
+evaluation = None
+if evaluation_summary is not None:
     try:
-        model = load_joblib(str(model_path))
-        df_eval = coerce_and_engineer(df_filtered.copy())
+        fig_scatter = actual_vs_predicted_figure(
+            evaluation_summary, scatter_view, max_points,
+            f"Actual vs Predicted Engagement Rate ({selected_platform.capitalize()})")
+        q = evaluation_summary["er_quantiles"]
+        evaluation = dict(
+            fig_scatter=fig_scatter, r2=evaluation_summary["r2"], rmse=evaluation_summary["rmse"],
+            mae=evaluation_summary["mae"], avg_er=evaluation_summary["er_mean"], med_er=q["0.5"],
+            max_er=q["1.0"], min_er=q["0.0"],
+        )
+    except Exception as e:
+        st.error(f"Error rendering model evaluation: {e}")
+        log.exception(f"❌ Evaluation render error: {e}")
 
-        # create model-ready feature set (only keep overlapping features)
-        model_features = list(getattr(model, "feature_names_in_", []))
-        available = [c for c in model_features if c in df_eval.columns]
-        missing = [c for c in model_features if c not in df_eval.columns]
+if evaluation is not None:
+    r2, rmse, mae = evaluation["r2"], evaluation["rmse"], evaluation["mae"]
+    st.plotly_chart(evaluation["fig_scatter"], use_container_width=True)
 
-        if len(available) == 0 and len(model_features) > 0:
-            raise ValueError("No overlapping features between dataset and model.")
+    log.info(f"⚖️ Model evaluation: {selected_platform} | R²={r2:.3f} | RMSE={rmse:.5f} | MAE={mae:.5f}")
 
-        # prepare X: use available features, fill missing with zeros, reorder to model_features
-        if model_features:
-            X = df_eval.reindex(columns=model_features, fill_value=0)
-        else:
-            # fallback: use numeric columns chosen earlier
-            cat_cols, num_cols = get_feature_sets(df_eval)
-            X = pd.get_dummies(df_eval[cat_cols + num_cols], columns=cat_cols, drop_first=True)
-            for f in getattr(model, "feature_names_in_", []):
-                if f not in X.columns:
-                    X[f] = 0
-            X = X[model.feature_names_in_]
-
-        y_true = df_eval["engagement_rate"]
-        y_pred = model.predict(X)
-
-        # scatter with regression line
-        fig_scatter = px.scatter(df_eval, x=y_true, y=y_pred, trendline="ols",
-                                 title=f"Actual vs Predicted Engagement Rate ({selected_platform.capitalize()})",
-                                 labels={"x": "Actual ER", "y": "Predicted ER"},
-                                 color_discrete_sequence=["#22c55e"])
-        fig_scatter.update_traces(marker=dict(size=5, opacity=0.6))
-        st.plotly_chart(fig_scatter, use_container_width=True)
-
-        # metrics
-        mse = mean_squared_error(y_true, y_pred)
-        rmse = float(np.sqrt(mse))
-        mae = float(mean_absolute_error(y_true, y_pred))
-        r2 = float(r2_score(y_true, y_pred))
-
-        log.info(f"⚖️ Model evaluation: {selected_platform} | R²={r2:.3f} | RMSE={rmse:.5f} | MAE={mae:.5f}")
-
-        # -------- Metric cards like your screenshot --------
-        st.markdown("## ")
-        col_r2, col_rmse, col_mae = st.columns(3)
-
-        with col_r2:
-            st.markdown("### 📊 R² Score")
-            st.markdown(f"<h2 style='margin-top:-10px;font-size:40px;'>{r2:.3f}</h2>", unsafe_allow_html=True)
-
-        with col_rmse:
-            st.markdown("### 📉 RMSE")
-            st.markdown(f"<h2 style='margin-top:-10px;font-size:40px;'>{rmse:.5f}</h2>", unsafe_allow_html=True)
-
-        with col_mae:
-            st.markdown("### ⚖️ MAE")
-            st.markdown(f"<h2 style='margin-top:-10px;font-size:40px;'>{mae:.5f}</h2>", unsafe_allow_html=True)
-
-        st.markdown("---")
-
-        # -------- Detailed insights (concise) --------
-        st.markdown("### 💬 Detailed Model Fit Insights")
-        fit_quality = "Excellent" if r2 > 0.9 else "Good" if r2 > 0.75 else "Moderate" if r2 > 0.5 else "Weak"
-
-        st.markdown(f"**🧾 Model Performance Summary ({selected_platform.capitalize() if selected_platform != 'All' else 'All Platforms'})**")
-        st.markdown(f"""
+    # -------- Metric cards like your screenshot --------
+    st.markdown("## ")
+    col_r2, col_rmse, col_mae = st.columns(3)
+
+    with col_r2:
+        st.markdown("### 📊 R² Score")
+        st.markdown(f"<h2 style='margin-top:-10px;font-size:40px;'>{r2:.3f}</h2>", unsafe_allow_html=True)
+
+    with col_rmse:
+        st.markdown("### 📉 RMSE")
+        st.markdown(f"<h2 style='margin-top:-10px;font-size:40px;'>{rmse:.5f}</h2>", unsafe_allow_html=True)
+
+    with col_mae:
+        st.markdown("### ⚖️ MAE")
+        st.markdown(f"<h2 style='margin-top:-10px;font-size:40px;'>{mae:.5f}</h2>", unsafe_allow_html=True)
+
+    st.markdown("---")
+
+    # -------- Detailed insights (concise) --------
+    st.markdown("### 💬 Detailed Model Fit Insights")
+    fit_quality = "Excellent" if r2 > 0.9 else "Good" if r2 > 0.75 else "Moderate" if r2 > 0.5 else "Weak"
+
+    st.markdown(f"**🧾 Model Performance Summary ({selected_platform.capitalize() if selected_platform != 'All' else 'All Platforms'})**")
+    st.markdown(f"""
 • **Fit Quality:** {fit_quality} ({r2:.3f} R²)  
 • **Prediction Error (RMSE):** {rmse:.5f}  
 • **Average Absolute Error (MAE):** {mae:.5f}
 """)
 
-        st.markdown("**🧠 Interpretation (short):**")
-        st.markdown(f"""
+    st.markdown("**🧠 Interpretation (short):**")
+    st.markdown(f"""
 - Model explains **{r2*100:.1f}%** of engagement variance for this platform.  
 - Typical prediction deviation (MAE) ≈ **{mae*100:.2f}%** engagement rate.  
 - RMSE ≈ **{rmse*100:.2f}%** (typical root-mean error).
 """)
 
-        # highlight fit message
-        if r2 > 0.9:
-            st.success(f"✅ Excellent fit for {selected_platform.capitalize()} — highly reliable predictions.")
-        elif r2 > 0.75:
-            st.info(f"🟢 Good fit — strong predictive performance for {selected_platform.capitalize()}.")
-        elif r2 > 0.5:
-            st.warning(f"🟠 Moderate fit — captures main patterns but can improve for {selected_platform.capitalize()}.")
-        else:
-            st.error(f"🔴 Weak fit — retraining recommended for {selected_platform.capitalize()} data.")
-
-        # -------- Platform Engagement Stats (as in your screenshot) --------
-        st.markdown("### 💡 Platform Engagement Insights")
-        avg_er = df_filtered["engagement_rate"].mean()
-        med_er = df_filtered["engagement_rate"].median()
-        max_er = df_filtered["engagement_rate"].max()
-        min_er = df_filtered["engagement_rate"].min()
-
-        c1, c2, c3, c4 = st.columns(4)
-        c1.metric("📈 Avg Engagement", f"{avg_er*100:.2f}%")
-        c2.metric("📊 Median Engagement", f"{med_er*100:.2f}%")
-        c3.metric("🔥 Max Engagement", f"{max_er*100:.2f}%")
-        c4.metric("⚖️ Min Engagement", f"{min_er*100:.2f}%")
-
-        st.markdown(f"""
+    # highlight fit message
+    if r2 > 0.9:
+        st.success(f"✅ Excellent fit for {selected_platform.capitalize()} — highly reliable predictions.")
+    elif r2 > 0.75:
+        st.info(f"🟢 Good fit — strong predictive performance for {selected_platform.capitalize()}.")
+    elif r2 > 0.5:
+        st.warning(f"🟠 Moderate fit — captures main patterns but can improve for {selected_platform.capitalize()}.")
+    else:
+        st.error(f"🔴 Weak fit — retraining recommended for {selected_platform.capitalize()} data.")
+
+    # -------- Platform Engagement Stats (as in your screenshot) --------
+    st.markdown("### 💡 Platform Engagement Insights")
+    avg_er, med_er = evaluation["avg_er"], evaluation["med_er"]
+    max_er, min_er = evaluation["max_er"], evaluation["min_er"]
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("📈 Avg Engagement", f"{avg_er*100:.2f}%")
+    c2.metric("📊 Median Engagement", f"{med_er*100:.2f}%")
+    c3.metric("🔥 Max Engagement", f"{max_er*100:.2f}%")
+    c4.metric("⚖️ Min Engagement", f"{min_er*100:.2f}%")
+
+    st.markdown(f"""
 **🔍 Insights for {selected_platform.capitalize() if selected_platform != 'All' else 'All Platforms'}**
 - Average engagement: **{avg_er*100:.2f}%**
 - Median engagement: **{med_er*100:.2f}%**
@@ -252,8 +523,50 @@ if model_path.exists() and df_filtered is not None and "engagement_rate" in df_f
 - Lowest post ER: **{min_er*100:.2f}%**
 """)
 
-    except Exception as e:
-        st.error(f"Error evaluating model on dataset: {e}")
-        log.exception(f"❌ Evaluation error: {e}")
+# ---------------------------------------------------------
+# POST EXPLORER — indexed top-K / range queries over the scored dataset
+# ---------------------------------------------------------
+st.markdown("---")
+st.header("🔎 Post Explorer")
+
+if not processed_path.exists():
+    st.info("Run the training pipeline first to explore individual posts.")
 else:
-    st.info("Model or dataset not available for evaluation (ensure artifacts/model.joblib and artifacts/processed.parquet exist).")
+    try:
+        with timed("app.post_index"):
+            post_index = cached_artifact(str(processed_path), lambda p: build_post_index(p, model_path),
+                                         name="post_index", depends_on=[model_path])
+
+        e1, e2, e3 = st.columns(3)
+        pe_platform = e1.selectbox("Platform", ["All"] + post_index.platforms, key="pe_platform")
+        pe_key = e2.selectbox("Rank by", [k for k in reversed(POST_SORT_KEYS) if k in post_index.keys], key="pe_key",
+                              format_func=lambda k: {"predicted_er": "Predicted ER", "engagement_rate": "Actual ER"}[k])
+        pe_order = e3.radio("Order", ["Highest first", "Lowest first"], horizontal=True, key="pe_order")
+
+        e4, e5, e6 = st.columns(3)
+        pe_range = e4.slider("ER range (%)", min_value=0.0, max_value=100.0, value=(0.0, 100.0), step=0.5,
+                             key="pe_range")
+        pe_top = e5.number_input("Top K (0 = all matches)", min_value=0, value=50, step=10, key="pe_top")
+        pe_page_size = e6.selectbox("Rows per page", [25, 50, 100], key="pe_page_size")
+        pe_dates = st.date_input("Posted between (optional)", value=[], key="pe_dates")
+
+        start, end = (None, None)
+        if len(pe_dates) == 2:
+            start, end = pd.Timestamp(pe_dates[0]), pd.Timestamp(pe_dates[1]) + pd.Timedelta(days=1)
+        lo = pe_range[0] / 100 if pe_range[0] > 0 else None
+        hi = pe_range[1] / 100 if pe_range[1] < 100 else None
+
+        with timed("app.post_query", platform=pe_platform) as t:
+            positions = post_index.query(pe_platform, pe_key, lo=lo, hi=hi, start=start, end=end,
+                                         k=int(pe_top) or None, descending=pe_order == "Highest first")
+            t.rows = len(positions)
+
+        n_pages = max(1, math.ceil(len(positions) / pe_page_size))
+        pe_page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, key="pe_page")
+        st.dataframe(post_index.frame(page(positions, pe_page, pe_page_size)), use_container_width=True,
+                     hide_index=True)
+        st.caption(f"{len(positions):,} matching posts — page {pe_page} of {n_pages} "
+                   f"(query {t.duration_ms:.1f} ms over {len(post_index.rows):,} indexed posts).")
+    except Exception as e:
+        st.error(f"Post explorer failed: {e}")
+        log.exception(f"❌ Post explorer error: {e}")
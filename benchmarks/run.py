@@ -0,0 +1,237 @@
+# benchmarks/run.py
+"""
+Stage-by-stage benchmarks of the training / batch prediction / dashboard hot paths.
+
+    python -m benchmarks.run --sizes 10k 1m --out benchmarks/results/latest.json
+    python -m benchmarks.run --sizes 10k --baseline benchmarks/baseline.json --threshold 0.25
+
+Each stage records wall time, rows/s, the peak RSS observed while it ran and how far
+that peak rose above the RSS at its start. With --baseline the run fails (exit code 1)
+when a stage is slower than the baseline, or its RSS growth is larger, by more than
+--threshold. The process peak is reported but not compared: it carries every earlier
+stage's memory, so it cannot pin a regression on one stage.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any
+
+import numpy as np
+
+from benchmarks.synthetic import write_synthetic_csv
+from src.logger import get_logger, rss_mb
+
+log = get_logger(__name__)
+
+DATA_DIR = Path("artifacts") / "benchmarks" / "data"
+DEFAULT_THRESHOLD = 0.25
+# stages faster / smaller than this are too noisy to flag as regressions
+MIN_SECONDS = 0.05
+MIN_RSS_MB = 50.0
+MAX_FIT_ROWS = 200_000
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def parse_size(text: str) -> int:
+    text = text.lower()
+    if text in SIZES:
+        return SIZES[text]
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1])
+    return int(float(text[:-1]) * mult) if mult else int(text)
+
+
+class StageTimer:
+    """Times named stages and samples RSS in a background thread while each one runs."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def stage(self, name: str, rows: int):
+        peak = [rss_mb()]
+        before = peak[0]
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.interval):
+                peak[0] = max(peak[0], rss_mb())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stop.set()
+            sampler.join()
+            peak[0] = max(peak[0], rss_mb())
+            self.stages[name] = {
+                "seconds": round(seconds, 4),
+                "rows": rows,
+                "rows_per_s": round(rows / seconds, 1) if seconds > 0 else None,
+                "peak_rss_mb": round(peak[0], 1),
+                "rss_delta_mb": round(peak[0] - before, 1),
+            }
+            log.info(f"⏱️ {name:<16} {seconds:9.3f}s  {rows:>11,} rows  peak RSS {peak[0]:,.0f} MB "
+                     f"(+{peak[0] - before:,.0f} MB)")
+
+
+def run_size(n: int, seed: int, workdir: Path, max_fit_rows: int = MAX_FIT_ROWS) -> Dict[str, Any]:
+    """Run every stage on an `n`-row synthetic dataset (generated once and reused)."""
+    from sklearn.ensemble import RandomForestRegressor
+
+    from src.Utils import read_processed, write_processed
+    from src.components import data_ingestion
+    from src.components.data_transformation import coerce_and_engineer
+    from src.components.feature_schema import (
+        as_model_input, build_feature_schema, build_matrix, feature_names, source_columns,
+    )
+    from src.components.forest_compiler import load_compiled_forest, save_compiled_forest
+    from src.components.model_evaluation import build_platform_summary, histogram_bins, summarize_predictions
+    from src.components.model_trainer import (
+        DEFAULT_PARAMS, _categorical_feature_candidates, _numeric_feature_candidates,
+    )
+    from src.pipeline.predict_pipeline import score_streaming
+
+    csv_path = DATA_DIR / f"posts_{n}_{seed}.csv"
+    if not csv_path.exists():
+        log.info(f"🧪 Generating {n:,} synthetic posts at {csv_path}")
+        write_synthetic_csv(csv_path, n, seed)
+
+    # ingestion cache and model artifacts live in a throwaway directory
+    data_ingestion.CACHE_DIR = workdir / "cache"
+    timer = StageTimer()
+
+    with timer.stage("ingest", n):
+        df = data_ingestion.load_csv(str(csv_path), use_cache=False)
+    data_ingestion.load_csv(str(csv_path))  # populate the sidecar cache (untimed)
+    with timer.stage("ingest_cached", n):
+        df = data_ingestion.load_csv(str(csv_path))
+
+    with timer.stage("engineer", n):
+        df = coerce_and_engineer(df)
+
+    with timer.stage("encode", n):
+        numeric = _numeric_feature_candidates(df)
+        schema = build_feature_schema(df, numeric, _categorical_feature_candidates(df))
+        X = build_matrix(df, schema)
+    y = df["engagement_rate"].to_numpy()
+
+    # forests do not fit on 10M rows in a benchmark run; fit on a fixed-size sample
+    fit_rows = min(n, max_fit_rows)
+    idx = np.random.default_rng(seed).choice(n, fit_rows, replace=False) if fit_rows < n else slice(None)
+    model = RandomForestRegressor(**DEFAULT_PARAMS, random_state=42, n_jobs=-1)
+    with timer.stage("fit", fit_rows):
+        model.fit(X[idx], y[idx])
+
+    with timer.stage("predict", n):
+        y_pred = model.predict(X)
+
+    compiled_path = save_compiled_forest(model, workdir / "model.npz", feature_names(schema))
+    compiled = load_compiled_forest(compiled_path)
+    with timer.stage("predict_compiled", n):
+        compiled.predict(X)
+
+    with timer.stage("write", n):
+        write_processed(df, str(workdir / "processed"))
+
+    with timer.stage("summary", n):
+        build_platform_summary(df, y_pred)
+
+    # the app's live evaluation without a precomputed summary: read the processed view,
+    # engineer, score, bin the actual ER and fit the actual/predicted trendline
+    with timer.stage("dashboard", n):
+        view = read_processed(str(workdir / "processed"),
+                              columns=list(dict.fromkeys(source_columns(schema) + ["engagement_rate", "platform"])))
+        view = coerce_and_engineer(view)
+        view_pred = model.predict(as_model_input(model, build_matrix(view, schema), schema))
+        histogram_bins(view["engagement_rate"])
+        summarize_predictions(view["engagement_rate"].to_numpy(dtype=float), view_pred, np.random.default_rng(seed))
+
+    # end-to-end batch scoring as run by predict_pipeline (streaming, cached CSV)
+    with timer.stage("batch_score", n):
+        score_streaming(str(csv_path), compiled, str(workdir / "predictions.parquet"), 50_000, schema)
+
+    return timer.stages
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> list:
+    """
+    Stages whose wall time or RSS growth exceeds baseline * (1 + threshold); values under
+    the metric's noise floor (MIN_SECONDS / MIN_RSS_MB) in the baseline are ignored.
+    """
+    regressions = []
+    for size, stages in results["results"].items():
+        for stage, cur in stages.items():
+            base = baseline.get("results", {}).get(size, {}).get(stage)
+            if not base:
+                continue
+            for metric, fmt, floor in (("seconds", "{:9.3f}s", MIN_SECONDS), ("rss_delta_mb", "{:7,.0f} MB", MIN_RSS_MB)):
+                if base.get(metric) is None or cur.get(metric) is None or base[metric] < floor:
+                    continue
+                ratio = cur[metric] / base[metric]
+                status = "REGRESSION" if ratio > 1 + threshold else "ok"
+                log.info(f"{size:>5} {stage:<16} {fmt.format(base[metric])} → {fmt.format(cur[metric])}  "
+                         f"x{ratio:5.2f}  {status}")
+                if status != "ok":
+                    regressions.append({"size": size, "stage": stage, "metric": metric, "baseline": base[metric],
+                                        "current": cur[metric], "ratio": round(ratio, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark training, batch prediction and dashboard stages")
+    parser.add_argument("--sizes", nargs="+", default=["10k"], help="Dataset sizes, e.g. 10k 1m 10m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-fit-rows", type=int, default=MAX_FIT_ROWS, help="Rows sampled for the fit stage")
+    parser.add_argument("--out", default="benchmarks/results/latest.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown / RSS growth vs the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", default=None, help="Also write these results as a new baseline")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "max_fit_rows": args.max_fit_rows,
+        },
+        "results": {},
+    }
+    for size in args.sizes:
+        n = parse_size(size)
+        log.info(f"🏁 Benchmark: {n:,} rows")
+        with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+            results["results"][size.lower()] = run_size(n, args.seed, Path(tmp), args.max_fit_rows)
+
+    for path in filter(None, [args.out, args.save_baseline]):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        log.info(f"📁 Benchmark results saved at: {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            log.error(f"❌ {len(regressions)} stage(s) regressed by more than {args.threshold:.0%}: {regressions}")
+            sys.exit(1)
+        log.info("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
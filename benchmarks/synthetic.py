@@ -0,0 +1,87 @@
+# benchmarks/synthetic.py
+"""Synthetic post datasets with the columns and rough distributions of Notebook/sample_posts.csv."""
+from __future__ import annotations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PLATFORMS = ["instagram", "twitter", "tiktok", "linkedin"]
+PLATFORM_P = [0.355, 0.255, 0.245, 0.145]
+MEDIA_TYPES = ["image", "video", "carousel", "text"]
+MEDIA_P = [0.39, 0.35, 0.16, 0.10]
+TOPICS = ["ai", "travel", "design", "music", "photography", "startup", "coding", "fashion", "food"]
+ADJECTIVES = ["deep", "viral", "amazing", "quick", "catchy", "trending", "fresh", "bold", "fun"]
+EMOJIS = ["💪", "🔥", "✈️", "🎵", "💡", "📸", "🎯", "🍔", "✨"]
+# share of engagement going to likes / comments / shares / saves
+ENGAGEMENT_SPLIT = [0.66, 0.185, 0.115, 0.04]
+CHUNK_ROWS = 1_000_000
+
+
+def generate_posts(n: int, seed: int = 0, start_id: int = 1) -> pd.DataFrame:
+    """`n` synthetic posts; engagement = likes + comments + shares + saves, ER = engagement / followers."""
+    rng = np.random.default_rng(seed)
+    platform = rng.choice(len(PLATFORMS), n, p=PLATFORM_P)
+    media = rng.choice(len(MEDIA_TYPES), n, p=MEDIA_P)
+
+    # posted_at: hourly slots in 2024, each distinct timestamp formatted once
+    slots = pd.date_range("2024-01-01", "2024-12-31 23:00", freq="h")
+    slot = rng.integers(0, len(slots), n)
+    posted_at = np.asarray(slots.strftime("%d-%m-%Y %H:%M"), dtype=object)[slot]
+    weekday = slots.weekday.to_numpy()[slot]
+
+    followers = np.maximum(50, rng.lognormal(np.log(8000), 0.95, n)).astype(np.int64)
+    views = np.maximum(10, followers * rng.lognormal(-0.3, 0.6, n)).astype(np.int64)
+    er = np.clip(rng.normal(0.03 + 0.01 * platform + 0.005 * media, 0.025), 0.002, 0.16)
+    engagement_target = np.maximum(1, np.round(er * followers)).astype(np.int64)
+    parts = rng.multinomial(engagement_target, ENGAGEMENT_SPLIT)
+    engagement = parts.sum(axis=1)
+    engagement_rate = engagement / followers
+
+    # captions and hashtag strings are drawn from small pre-built pools
+    captions = np.array([f"{a} post about {t} {e}" for a in ADJECTIVES for t in TOPICS for e in EMOJIS], dtype=object)
+    tag_pool = np.array([" ".join(f"#{t}" for t in rng.choice(TOPICS, k, replace=False))
+                         for k in rng.integers(1, 5, 512)], dtype=object)
+    q1, q2 = np.quantile(engagement_rate, [1 / 3, 2 / 3])
+
+    return pd.DataFrame({
+        "platform": np.array(PLATFORMS, dtype=object)[platform],
+        "post_id": "post_" + pd.Series(np.arange(start_id, start_id + n)).astype(str),
+        "posted_at": posted_at,
+        "weekday": weekday,
+        "caption": captions[rng.integers(0, len(captions), n)],
+        "hashtags": tag_pool[rng.integers(0, len(tag_pool), n)],
+        "media_type": np.array(MEDIA_TYPES, dtype=object)[media],
+        "followers": followers,
+        "views": views,
+        "likes": parts[:, 0],
+        "comments": parts[:, 1],
+        "shares": parts[:, 2],
+        "saves": parts[:, 3],
+        "engagement": engagement,
+        "engagement_rate": engagement_rate,
+        "popularity_label": np.where(engagement_rate < q1, "low", np.where(engagement_rate < q2, "medium", "high")),
+    })
+
+
+def write_synthetic_csv(path: str | Path, n: int, seed: int = 0) -> Path:
+    """Write `n` posts in chunks of CHUNK_ROWS so 10M-row files never sit in memory at once."""
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    writer = None
+    try:
+        for i, start in enumerate(range(0, n, CHUNK_ROWS)):
+            chunk = generate_posts(min(CHUNK_ROWS, n - start), seed=seed + i, start_id=start + 1)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pv.CSVWriter(tmp, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    tmp.replace(path)
+    return path
@@ -1,12 +1,39 @@
-import joblib, pandas as pd
+import hashlib
+import json
+import shutil
+import threading
+import time
+import pandas as pd
 from pathlib import Path
+from src.logger import get_logger, timed
+
+log = get_logger(__name__)
 
 def save_joblib(obj, path: str):
-    Path(path).parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(obj, path)
+    """
+    Uncompressed dump (NumPy arrays stored raw, so they can be loaded with mmap_mode='r'),
+    written to a temp file and renamed: processes that mapped the old file keep a valid copy.
+    """
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(f"{p.name}.tmp-{time.time_ns()}")
+    import joblib
+
+    joblib.dump(obj, tmp, compress=0)
+    tmp.replace(p)
+
+def load_joblib(path: str, mmap_mode=None):
+    """
+    joblib.load, logging load time and RSS growth. With mmap_mode='r' NumPy arrays stay
+    mapped from the file (shared page cache) unless the unpickled object copies them.
+    """
+    import joblib
 
-def load_joblib(path: str):
-    return joblib.load(path)
+    with timed("model.load_joblib", path=str(path), mmap_mode=mmap_mode) as t:
+        obj = joblib.load(path, mmap_mode=mmap_mode)
+    rss_delta = t.rss_after - t.rss_before
+    log.info(f"📦 Loaded {path} in {t.duration_ms:.0f}ms (mmap_mode={mmap_mode}, RSS {rss_delta:+.1f} MB)")
+    return obj
 
 def write_parquet(df: pd.DataFrame, path: str):
     Path(path).parent.mkdir(parents=True, exist_ok=True)
@@ -14,3 +41,296 @@ def write_parquet(df: pd.DataFrame, path: str):
 
 def read_parquet(path: str):
     return pd.read_parquet(path)
+
+
+# ---------------------------------------------------------
+# PROCESSED DATASETS
+# ---------------------------------------------------------
+# Two layouts are supported:
+#   * '<name>.parquet' — a single file, plus immutable part files appended in '<stem>.parts/'
+#   * '<dir>/'         — a hive-partitioned dataset ('platform=tiktok/...', optionally 'month=2024-03/')
+# Appends never rewrite existing files in either layout.
+DATASET_META = "_dataset.json"
+CATEGORY_COLS = ["platform", "media_type"]
+SMALL_INT_COLS = {"hour", "weekday", "is_weekend"}
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Categorical platform/media_type, downcast integers and float32 rates."""
+    converted = {}
+    for col in df.columns:
+        s = df[col]
+        if col in CATEGORY_COLS:
+            converted[col] = s.astype("category")
+        elif pd.api.types.is_bool_dtype(s):
+            continue
+        elif pd.api.types.is_integer_dtype(s):
+            # fixed widths (not per-batch downcasting) so appended parts share one schema
+            if col in SMALL_INT_COLS:
+                converted[col] = s.astype("int8")
+            elif len(s) == 0 or (s.min() >= INT32_MIN and s.max() <= INT32_MAX):
+                converted[col] = s.astype("int32")
+        elif pd.api.types.is_float_dtype(s) and ("rate" in col or col.endswith("_pred")):
+            converted[col] = s.astype("float32")
+    return df.assign(**converted)
+
+
+def parquet_parts_dir(path: str) -> Path:
+    p = Path(path)
+    return p.with_name(p.stem + ".parts")
+
+
+def _is_dataset_dir(path: str) -> bool:
+    p = Path(path)
+    return p.is_dir() or (not p.exists() and p.suffix.lower() != ".parquet")
+
+
+def _partition_table(df: pd.DataFrame, partition_cols):
+    """Arrow table with partition keys as plain strings (hive directory names)."""
+    import pyarrow as pa
+
+    df = df.assign(**{c: df[c].astype(str) for c in partition_cols})
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_processed(df: pd.DataFrame, path: str, partition_cols=("platform",), by_month: bool = False) -> Path:
+    """
+    Write the processed dataset with compact dtypes. A '.parquet' path gives a single file;
+    any other path gives a dataset directory partitioned by `partition_cols` (+ 'month').
+    The directory is replaced atomically so readers never see a half-written dataset.
+    """
+    import pyarrow.dataset as ds
+
+    p = Path(path)
+    df = compact_dtypes(df)
+    if not _is_dataset_dir(path):
+        write_parquet(df, str(p))
+        clear_parquet_parts(str(p))  # increments belonged to the previous dataset
+        return p
+
+    partition_cols = [c for c in partition_cols if c in df.columns]
+    if by_month and "posted_at" in df.columns:
+        df = df.assign(month=pd.to_datetime(df["posted_at"], errors="coerce").dt.strftime("%Y-%m").fillna("unknown"))
+        partition_cols.append("month")
+
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(f"{p.name}.tmp-{time.time_ns()}")
+    ds.write_dataset(_partition_table(df, partition_cols), str(tmp), format="parquet",
+                     partitioning=partition_cols, partitioning_flavor="hive",
+                     basename_template="part-0-{i}.parquet")
+    (tmp / DATASET_META).write_text(json.dumps({"partition_cols": partition_cols}), encoding="utf-8")
+
+    old = p.with_name(f"{p.name}.old-{time.time_ns()}")
+    if p.exists():
+        p.rename(old)
+    tmp.rename(p)
+    if old.exists():
+        shutil.rmtree(old)
+    return p
+
+
+def append_parquet(df: pd.DataFrame, path: str) -> Path:
+    """Append rows as new part files, cast to the existing dataset's schema."""
+    import pyarrow as pa, pyarrow.dataset as ds, pyarrow.parquet as pq
+
+    p = Path(path)
+    if not p.exists():
+        return write_processed(df, str(p))
+    df = compact_dtypes(df)
+
+    if p.is_dir():
+        meta = json.loads((p / DATASET_META).read_text(encoding="utf-8"))
+        partition_cols = meta["partition_cols"]
+        if "month" in partition_cols and "month" not in df.columns:
+            df = df.assign(month=pd.to_datetime(df["posted_at"], errors="coerce").dt.strftime("%Y-%m").fillna("unknown"))
+        file_schema = ds.dataset(str(p), format="parquet").schema  # data columns only
+        table = _partition_table(df[file_schema.names + partition_cols], partition_cols)
+        table = table.cast(pa.schema(list(file_schema) + [pa.field(c, pa.string()) for c in partition_cols]))
+        stamp = time.time_ns()
+        ds.write_dataset(table, str(p), format="parquet", partitioning=partition_cols, partitioning_flavor="hive",
+                         basename_template=f"part-{stamp}-{{i}}.parquet",
+                         existing_data_behavior="overwrite_or_ignore")
+        return p / f"part-{stamp}-*.parquet"
+
+    schema = pq.read_schema(p)
+    table = pa.Table.from_pandas(df[schema.names], preserve_index=False).cast(schema)
+    parts = parquet_parts_dir(str(p))
+    parts.mkdir(parents=True, exist_ok=True)
+    out = parts / f"part-{time.time_ns()}.parquet"
+    tmp = out.with_suffix(".tmp")
+    pq.write_table(table, tmp)
+    tmp.replace(out)
+    return out
+
+
+def clear_parquet_parts(path: str):
+    parts = parquet_parts_dir(path)
+    if parts.exists():
+        shutil.rmtree(parts)
+
+
+def processed_columns(path: str) -> list:
+    """Column names of the processed dataset (data + partition columns) without reading rows."""
+    import pyarrow.dataset as ds, pyarrow.parquet as pq
+
+    p = Path(path)
+    if p.is_dir():
+        return ds.dataset(str(p), format="parquet", partitioning="hive").schema.names
+    return pq.read_schema(p).names
+
+
+def _processed_dataset(path: str):
+    """pyarrow dataset over either layout (partition columns read as dictionaries)."""
+    import pyarrow.dataset as ds
+
+    p = Path(path)
+    if p.is_dir():
+        return ds.dataset(str(p), format="parquet",
+                          partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+    parts = parquet_parts_dir(path)
+    files = [str(p)] + (sorted(str(f) for f in parts.glob("*.parquet")) if parts.exists() else [])
+    return ds.dataset(files, format="parquet")
+
+
+def read_processed(path: str, columns=None, filters=None) -> pd.DataFrame:
+    """
+    Read the processed dataset in either layout with column and predicate pushdown.
+    `filters` uses the pandas/pyarrow DNF form, e.g. [("platform", "==", "tiktok")];
+    on a partitioned dataset only the matching partition directories are opened.
+    """
+    import pyarrow.parquet as pq
+
+    expr = pq.filters_to_expression(filters) if filters else None
+    return _processed_dataset(path).to_table(columns=columns, filter=expr).to_pandas()
+
+
+def iter_processed(path: str, columns=None, batch_size: int = 250_000):
+    """
+    Stream the processed dataset as DataFrames of at most `batch_size` rows, one Parquet
+    row group (or slice of one) at a time, so memory is bounded by the batch size.
+    """
+    scanner = _processed_dataset(path).scanner(columns=columns, batch_size=batch_size)
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def processed_row_count(path: str) -> int:
+    """Row count from the Parquet footers, without reading any column data."""
+    return _processed_dataset(path).count_rows()
+
+
+# ---------------------------------------------------------
+# PROCESS-WIDE ARTIFACT CACHE
+# ---------------------------------------------------------
+# One entry per (path, loader). An entry is reused while the file keeps the same
+# content hash; the hash is only recomputed when mtime/size change, so a hit costs
+# a single stat() call. Shared by every Streamlit session in the process.
+# _CACHE_LOCK only guards the dicts below and is never held while loading or hashing;
+# each key has its own lock, so a slow load blocks only callers of that same artifact.
+_CACHE_LOCK = threading.Lock()
+_KEY_LOCKS = {}
+_ARTIFACT_CACHE = {}
+_HASH_MEMO = {}
+_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def file_fingerprint(path: str):
+    """
+    Returns (resolved path, mtime_ns, size, [parts listing,] content hash) for an artifact
+    file, or (resolved path, file listing, listing hash) for a dataset directory.
+    The content hash of a file is memoized per stat stamp.
+    """
+    p = Path(path).resolve()
+    if p.is_dir():
+        # dataset directories: files are written once, so the listing identifies the version
+        listing = tuple(sorted((str(f.relative_to(p)), f.stat().st_size, f.stat().st_mtime_ns)
+                               for f in p.rglob("*") if f.is_file()))
+        return (str(p), listing, hashlib.blake2b(repr(listing).encode(), digest_size=16).hexdigest())
+    st = p.stat()
+    stamp = (str(p), st.st_mtime_ns, st.st_size)
+    parts = parquet_parts_dir(str(p))
+    if parts.exists():
+        # appended part files are immutable, so their names and sizes identify the version
+        listing = tuple(sorted((f.name, f.stat().st_size) for f in parts.glob("*.parquet")))
+        stamp = stamp + (listing,)
+    with _CACHE_LOCK:
+        digest = _HASH_MEMO.get(stamp)
+    if digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr(stamp[3:]).encode())
+        with open(p, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with _CACHE_LOCK:
+            _HASH_MEMO[stamp] = digest
+    return stamp + (digest,)
+
+
+_MISS = object()
+
+
+def _cache_hit(key, version, path: str, name: str):
+    """The cached value of `key` when it is at `version`, else _MISS."""
+    with _CACHE_LOCK:
+        entry = _ARTIFACT_CACHE.get(key)
+        if entry is None or entry[0] != version:
+            return _MISS
+        _CACHE_STATS["hits"] += 1
+        stats = dict(_CACHE_STATS)
+    log.info(f"♻️ Artifact cache hit: {path} [{name}] (hits={stats['hits']}, misses={stats['misses']})")
+    return entry[1]
+
+
+def cached_artifact(path: str, loader, name: str = None, depends_on=()):
+    """
+    Load an artifact through the process-wide cache.
+    `loader(path)` runs only on a miss, i.e. on first use or after the file was
+    rewritten (e.g. by the training pipeline). `depends_on` lists other artifacts the
+    loaded value is derived from (e.g. the model that scored a dataset); rewriting,
+    creating or deleting one of them is a miss as well. Callers must treat the result as read-only.
+    """
+    name = name or getattr(loader, "__name__", "loader")
+    key = (str(Path(path).resolve()), name)
+    fingerprint = file_fingerprint(path)
+    version = (fingerprint[-1],) + tuple(file_fingerprint(d)[-1] if Path(d).exists() else None for d in depends_on)
+
+    value = _cache_hit(key, version, path, name)
+    if value is not _MISS:
+        return value
+    with _CACHE_LOCK:
+        key_lock = _KEY_LOCKS.setdefault(key, threading.RLock())  # re-entrant: a loader may reload its own key
+
+    with key_lock:
+        # another caller may have loaded this version while we waited for the key
+        value = _cache_hit(key, version, path, name)
+        if value is not _MISS:
+            return value
+        with _CACHE_LOCK:
+            entry = _ARTIFACT_CACHE.get(key)
+        reason = "first load" if entry is None else "artifact changed"
+        value = loader(path)
+
+        with _CACHE_LOCK:
+            _CACHE_STATS["misses"] += 1
+            _ARTIFACT_CACHE[key] = (version, value)
+            # drop memoized hashes of stale versions of this file
+            for stamp in [s for s in _HASH_MEMO if s[0] == fingerprint[0] and s != fingerprint[:-1]]:
+                del _HASH_MEMO[stamp]
+            stats = dict(_CACHE_STATS)
+        log.info(f"📥 Artifact cache miss ({reason}): {path} [{name}] (hits={stats['hits']}, misses={stats['misses']})")
+        return value
+
+
+def artifact_cache_stats() -> dict:
+    """Returns a copy of the artifact cache hit/miss counters."""
+    with _CACHE_LOCK:
+        return dict(_CACHE_STATS, entries=len(_ARTIFACT_CACHE))
+
+
+def clear_artifact_cache():
+    with _CACHE_LOCK:
+        _ARTIFACT_CACHE.clear()
+        _HASH_MEMO.clear()
@@ -1,13 +1,109 @@
+import hashlib
+import os
+import time
 import pandas as pd
 from pathlib import Path
+from src.Utils import file_fingerprint
+from src.components.data_transformation import POSTED_AT_FORMAT
 from src.logger import get_logger
 
 log = get_logger(__name__)
 
-def load_csv(path: str):
+# explicit schema for the posts export (Notebook/sample_posts.csv)
+POSTS_SCHEMA = {
+    "platform": "string", "post_id": "string", "posted_at": "timestamp",
+    "weekday": "int64", "caption": "string", "hashtags": "string", "media_type": "string",
+    "followers": "int64", "views": "int64", "likes": "int64", "comments": "int64",
+    "shares": "int64", "saves": "int64", "engagement": "int64",
+    "engagement_rate": "float64", "popularity_label": "string",
+}
+
+CACHE_DIR = Path(os.environ.get("INGEST_CACHE_DIR", Path("artifacts") / ".cache"))
+# caption/hashtag features memoized by post_id across runs (see text_features)
+TEXT_CACHE = CACHE_DIR / "text_features.npz"
+
+
+def _arrow_types():
+    import pyarrow as pa
+
+    mapping = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(),
+               "timestamp": pa.timestamp("ms")}  # Parquet stores ms; keeps cache hits identical
+    return {col: mapping[t] for col, t in POSTS_SCHEMA.items()}
+
+
+def _source_prefix(path: str) -> str:
+    """Sidecar name prefix of one source file: its stem plus a hash of its resolved path,
+    so same-named CSVs in different directories never share (or evict) sidecars."""
+    p = Path(path).resolve()
+    return f"{p.stem}-{hashlib.blake2b(str(p).encode(), digest_size=4).hexdigest()}"
+
+
+def cache_path_for(path: str) -> Path:
+    """Sidecar Parquet file keyed on the CSV's resolved path and content hash."""
+    digest = file_fingerprint(path)[-1]
+    return CACHE_DIR / f"{_source_prefix(path)}-{digest[:16]}.parquet"
+
+
+def _read_csv_arrow(p: Path) -> pd.DataFrame:
+    """Multithreaded typed parse; raises if a value does not match the schema."""
+    import pyarrow.csv as pv
+
+    table = pv.read_csv(
+        p,
+        read_options=pv.ReadOptions(use_threads=True),
+        convert_options=pv.ConvertOptions(column_types=_arrow_types(), timestamp_parsers=[POSTED_AT_FORMAT]),
+    )
+    return table.to_pandas()
+
+
+def load_csv(path: str, use_cache: bool = True):
     p = Path(path)
     if not p.exists():
         raise FileNotFoundError(path)
-    df = pd.read_csv(p)
-    log.info(f"Loaded {path} shape={df.shape}")
+
+    start = time.perf_counter()
+    cached = cache_path_for(str(p)) if use_cache else None
+    if cached is not None and cached.exists():
+        df = pd.read_parquet(cached)
+        log.info(f"Loaded {path} from cache {cached} shape={df.shape} in {time.perf_counter() - start:.2f}s")
+        return df
+
+    try:
+        df = _read_csv_arrow(p)
+    except Exception as e:
+        # values outside the schema (e.g. '1,000' or a different date format): let
+        # coerce_and_engineer handle them with pandas' lenient parsing
+        log.warning(f"⚠️ Typed CSV parse failed for {path} ({e}); falling back to pandas")
+        df = pd.read_csv(p, float_precision="round_trip")
+    log.info(f"Loaded {path} shape={df.shape} in {time.perf_counter() - start:.2f}s")
+
+    if cached is not None:
+        try:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_name(f"{cached.name}.tmp-{os.getpid()}-{time.time_ns()}")
+            df.to_parquet(tmp, index=False)
+            tmp.replace(cached)
+            # one sidecar per source file: drop caches of its older versions
+            for old in cached.parent.glob(f"{_source_prefix(str(p))}-*.parquet"):
+                if old != cached:
+                    old.unlink(missing_ok=True)
+        except Exception as e:
+            log.warning(f"Failed to write ingestion cache {cached}: {e}")
     return df
+
+
+def iter_csv_chunks(path: str, chunksize: int):
+    """
+    Row chunks of a posts CSV: batches of the sidecar cache when one exists, otherwise
+    pandas chunks with the text columns pinned to str so every chunk gets the same dtypes
+    (and round-trip float parsing, matching the Arrow reader).
+    """
+    cached = cache_path_for(path)
+    if cached.exists():
+        import pyarrow.parquet as pq
+        log.info(f"Streaming {path} from cache {cached}")
+        for batch in pq.ParquetFile(cached).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+        return
+    text_cols = {col: str for col, t in POSTS_SCHEMA.items() if t == "string"}
+    yield from pd.read_csv(path, chunksize=chunksize, dtype=text_cols, float_precision="round_trip")
@@ -1,10 +1,50 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
+from src.components.feature_store import HISTORY_FEATURES, add_history_features, epoch_days
+from src.components.text_features import (
+    HASHTAG_BUCKET_FEATURES, TEXT_FEATURES, add_text_features, record_hashtag_buckets, record_text_stats,
+)
 
-def coerce_and_engineer(df: pd.DataFrame) -> pd.DataFrame:
+# format of the posts export, e.g. '05-07-2024 14:00' (day first)
+POSTED_AT_FORMAT = "%d-%m-%Y %H:%M"
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def parse_posted_at(values) -> pd.Series:
+    """
+    Parse posted_at with the explicit export format; values in another layout
+    (e.g. ISO timestamps sent to the API) get a second, ISO 8601 pass. Unparseable -> NaT.
+    """
+    s = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    parsed = pd.to_datetime(s, format=POSTED_AT_FORMAT, errors='coerce')
+    retry = parsed.isna() & s.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(s[retry].astype(str), format='ISO8601', errors='coerce')
+    return parsed
+
+
+def _parse_posted_at_scalar(value):
+    """Scalar parse_posted_at via strptime; returns None when unparseable."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(str(value), POSTED_AT_FORMAT)
+    except ValueError:
+        t = pd.to_datetime(str(value), format='ISO8601', errors='coerce')
+        return None if pd.isna(t) else t
+
+
+def coerce_and_engineer(df: pd.DataFrame, text_cache=None, feature_store=None) -> pd.DataFrame:
     """
     Perform safe feature engineering, preserving platform/media_type columns.
-    Ensures numeric conversions, engagement metrics, and temporal features.
+    Ensures numeric conversions, engagement metrics, temporal and caption/hashtag features.
+    `text_cache` is an optional on-disk cache for the text features (see text_features).
+    With a `feature_store` the trailing-window history features are joined as well.
     """
     df = df.copy()
 
@@ -17,10 +57,15 @@ def coerce_and_engineer(df: pd.DataFrame) -> pd.DataFrame:
     df['platform'] = df['platform'].astype(str).str.strip().str.lower()
     df['media_type'] = df['media_type'].astype(str).str.strip().str.lower()
 
+    # --- Caption / hashtag statistics (also derives caption_length) ---
+    df = add_text_features(df, cache_path=text_cache)
+
     # --- Coerce numeric columns ---
     for col in ['likes', 'comments', 'shares', 'followers', 'views', 'saves', 'caption_length']:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+            if not pd.api.types.is_numeric_dtype(df[col]):  # typed ingestion already did this
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            df[col] = df[col].fillna(0)
         else:
             df[col] = 0
 
@@ -35,11 +80,11 @@ def coerce_and_engineer(df: pd.DataFrame) -> pd.DataFrame:
     # --- Temporal features ---
     if 'posted_at' in df.columns:
         try:
-            df['posted_at'] = pd.to_datetime(df['posted_at'], errors='coerce')
+            df['posted_at'] = parse_posted_at(df['posted_at'])
             df['hour'] = df['posted_at'].dt.hour.fillna(19).astype(int)
         except Exception:
             df['hour'] = 19
-    else:
+    elif 'hour' not in df.columns:
         df['hour'] = 19
 
     # --- Day of week and weekend flag ---
@@ -47,6 +92,10 @@ def coerce_and_engineer(df: pd.DataFrame) -> pd.DataFrame:
         df['weekday'] = df['posted_at'].dt.weekday.fillna(2).astype(int) if 'posted_at' in df.columns else 2
     df['is_weekend'] = df['weekday'].isin([5, 6]).astype(int)
 
+    # --- Historical engagement of platform × media_type × hour (see feature_store) ---
+    if feature_store is not None:
+        df = add_history_features(df, feature_store)
+
     return df
 
 
@@ -58,5 +107,129 @@ def get_feature_sets(df=None):
     num_cols = [
         'likes', 'comments', 'shares', 'followers',
         'views', 'saves', 'caption_length', 'hour', 'is_weekend'
-    ]
+    ] + [c for c in TEXT_FEATURES if c != 'caption_length'] + HASHTAG_BUCKET_FEATURES
     return cat_cols, num_cols
+
+
+# ---------------------------------------------------------
+# FAST PATH — records (list of dicts) straight to a feature matrix
+# ---------------------------------------------------------
+NUMERIC_COLS = ['likes', 'comments', 'shares', 'followers', 'views', 'saves', 'caption_length']
+CATEGORICAL_COLS = ['platform', 'media_type']
+
+
+def _to_float(value) -> float:
+    """Scalar equivalent of pd.to_numeric(errors='coerce').fillna(0)."""
+    if value is None:
+        return 0.0
+    try:
+        out = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if out != out else out
+
+
+def _coerce_numeric(records, col) -> np.ndarray:
+    """pd.to_numeric(errors='coerce') of one column of the records; NaN is left for the schema default."""
+    values = pd.Series([r.get(col) for r in records], dtype=object)
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def _category_values(records, col):
+    """
+    Normalized category per record; mirrors astype(str).str.strip().str.lower().
+    Missing/None values stay missing (no dummy column), as with pandas' string dtype.
+    """
+    if not any(col in r for r in records):
+        return ['unknown'] * len(records)
+    return [None if r.get(col) is None else str(r[col]).strip().lower() for r in records]
+
+
+def engineer_records(records, feature_names, feature_store=None) -> np.ndarray:
+    """
+    Build the model feature matrix for a few records without constructing a DataFrame.
+    Produces the same values as coerce_and_engineer followed by one-hot encoding and
+    reindexing to `feature_names` (dummy columns are named '<col>_<value>').
+    """
+    n = len(records)
+    has = lambda key: any(key in r for r in records)
+    X = np.zeros((n, len(feature_names)), dtype=float)
+
+    # temporal features are parsed once for the whole batch, like the DataFrame path
+    hours = weekdays = days = None
+    if has('posted_at'):
+        try:
+            if n == 1:
+                # scalar parse with strptime, without building a Series
+                t = _parse_posted_at_scalar(records[0].get('posted_at'))
+                hours = np.array([19.0 if t is None else float(t.hour)])
+                weekdays = np.array([2.0 if t is None else float(t.weekday())])
+                days = np.array([np.nan if t is None else float(t.toordinal() - _EPOCH_ORDINAL)])
+            else:
+                ts = parse_posted_at(pd.Series([r.get('posted_at') for r in records], dtype=object))
+                hours = ts.dt.hour.fillna(19).to_numpy(dtype=float)
+                weekdays = ts.dt.weekday.fillna(2).to_numpy(dtype=float)
+                days = epoch_days(ts)
+        except Exception:
+            hours = np.full(n, 19.0)
+            weekdays = days = None
+    if hours is None:
+        # without posted_at a supplied hour is kept (unparseable -> schema default)
+        hours = _coerce_numeric(records, 'hour') if has('hour') else np.full(n, 19.0)
+    weekend = None
+    if has('weekday'):
+        weekdays = _coerce_numeric(records, 'weekday')
+        # isin([5, 6]) on the raw column: numeric 5/6 only, never the strings '5'/'6'
+        weekend = np.array([not isinstance(r.get('weekday'), str) and r.get('weekday') in (5, 6)
+                            for r in records])
+    elif weekdays is None:
+        weekdays = np.full(n, 2.0)
+    if weekend is None:
+        weekend = np.isin(weekdays, [5, 6])
+
+    categories = {}
+    numeric = {c: np.array([_to_float(r.get(c)) for r in records]) for c in NUMERIC_COLS
+               if c in feature_names or c in ('likes', 'comments', 'shares', 'followers')}
+    text = [name for name in TEXT_FEATURES if name in feature_names and not (name == 'caption_length' and has(name))]
+    if text:
+        stats = np.array([record_text_stats(r.get('caption'), r.get('hashtags')) for r in records], dtype=np.float32)
+        numeric.update({name: stats[:, TEXT_FEATURES.index(name)] for name in text})
+    if any(name in feature_names for name in HASHTAG_BUCKET_FEATURES):
+        buckets = np.array([record_hashtag_buckets(r.get('hashtags')) for r in records], dtype=np.float32)
+        numeric.update({name: buckets[:, j] for j, name in enumerate(HASHTAG_BUCKET_FEATURES)})
+    if feature_store is not None and any(name in feature_names for name in HISTORY_FEATURES):
+        history = feature_store.lookup(_category_values(records, 'platform'), _category_values(records, 'media_type'),
+                                       np.where(np.isnan(hours), 19.0, hours), days)
+        numeric.update({name: history[:, j] for j, name in enumerate(HISTORY_FEATURES)})
+
+    for j, name in enumerate(feature_names):
+        if name in numeric:
+            X[:, j] = numeric[name]
+        elif name == 'hour':
+            X[:, j] = hours
+        elif name == 'weekday':
+            X[:, j] = weekdays
+        elif name == 'is_weekend':
+            X[:, j] = weekend
+        elif name in ('engagement', 'engagement_rate'):
+            if has(name):
+                X[:, j] = [np.nan if r.get(name) is None else r.get(name) for r in records]
+            else:
+                engagement = numeric['likes'] + numeric['comments'] + numeric['shares']
+                X[:, j] = engagement if name == 'engagement' else engagement / np.where(numeric['followers'] == 0, 1, numeric['followers'])
+        else:
+            for col in CATEGORICAL_COLS:
+                if name.startswith(col + '_'):
+                    if col not in categories:
+                        categories[col] = np.array(_category_values(records, col), dtype=object)
+                    X[:, j] = categories[col] == name[len(col) + 1:]
+                    break
+            else:
+                if has(name):
+                    X[:, j] = [_to_float(r.get(name)) for r in records]
+    return X
+
+
+def engineer_record(record: dict, feature_names, feature_store=None) -> np.ndarray:
+    """Single-record convenience wrapper around engineer_records; returns a 1-D vector."""
+    return engineer_records([record], feature_names, feature_store)[0]
@@ -0,0 +1,164 @@
+# src/components/feature_schema.py
+from __future__ import annotations
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.components.data_transformation import engineer_records
+from src.logger import get_logger
+
+log = get_logger(__name__)
+
+SCHEMA_VERSION = 1
+SCHEMA_SUFFIX = ".schema.json"
+
+# defaults mirror coerce_and_engineer's fallbacks
+DEFAULTS = {"hour": 19.0, "weekday": 2.0}
+
+
+def build_feature_schema(df: pd.DataFrame, numeric_cols: List[str], categorical_cols: List[str],
+                         categories: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    """
+    Describe the model input: column order, source dtypes, defaults and the category
+    vocabularies used for one-hot columns (named '<col>_<value>', like get_dummies).
+    `categories` supplies vocabularies collected elsewhere (e.g. over a streamed dataset,
+    when `df` is only its first chunk) instead of reading them from `df`.
+    """
+    columns = []
+    for col in numeric_cols:
+        columns.append({
+            "name": col, "kind": "numeric", "source": col,
+            "dtype": str(df[col].dtype) if col in df.columns else "float32",
+            "default": DEFAULTS.get(col, 0.0),
+        })
+
+    given = categories or {}
+    categories = {}
+    for col in categorical_cols:
+        if col in given:
+            categories[col] = sorted(given[col])
+        elif col in df.columns:
+            values = df[col].dropna().astype(str).str.strip().str.lower()
+            categories[col] = sorted(values.unique().tolist())
+        else:
+            continue
+        for value in categories[col]:
+            columns.append({"name": f"{col}_{value}", "kind": "onehot", "source": col,
+                            "value": value, "dtype": "bool", "default": 0.0})
+
+    return {
+        "version": SCHEMA_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "columns": columns,
+        "categories": categories,
+    }
+
+
+def schema_from_feature_names(names: List[str]) -> Dict[str, Any]:
+    """Fallback schema for models trained before schemas existed (numeric columns only)."""
+    return {
+        "version": SCHEMA_VERSION,
+        "columns": [{"name": n, "kind": "numeric", "source": n, "dtype": "float32",
+                     "default": DEFAULTS.get(n, 0.0)} for n in names],
+        "categories": {},
+    }
+
+
+def feature_names(schema: Dict[str, Any]) -> List[str]:
+    return [c["name"] for c in schema["columns"]]
+
+
+def source_columns(schema: Dict[str, Any]) -> List[str]:
+    """Dataset columns the schema reads from, in first-use order."""
+    return list(dict.fromkeys(c["source"] for c in schema["columns"]))
+
+
+def schema_path_for(model_path: str | Path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + SCHEMA_SUFFIX)
+
+
+def save_feature_schema(schema: Dict[str, Any], path: str | Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(schema, indent=2), encoding="utf-8")
+    tmp.replace(path)
+    log.info(f"🗂️ Feature schema v{schema['version']} saved at: {path}")
+    return path
+
+
+def load_feature_schema(path: str | Path) -> Dict[str, Any]:
+    schema = json.loads(Path(path).read_text(encoding="utf-8"))
+    if schema.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported feature schema version {schema.get('version')} in {path}")
+    return schema
+
+
+def resolve_schema(model_path: str | Path, model=None) -> Dict[str, Any]:
+    """Schema written next to the model, or one derived from model.feature_names_in_."""
+    path = schema_path_for(model_path)
+    if path.exists():
+        return load_feature_schema(path)
+    if model is None:
+        from src.components.forest_compiler import load_predictor
+        model = load_predictor(model_path)
+    names = list(getattr(model, "feature_names_in_", []))
+    if not names:
+        raise FileNotFoundError(f"No feature schema at {path} and the model carries no feature names")
+    log.warning(f"⚠️ No feature schema at {path}; deriving one from the model's feature names")
+    return schema_from_feature_names(names)
+
+
+def build_matrix(df: pd.DataFrame, schema: Dict[str, Any]) -> np.ndarray:
+    """
+    Fill a pre-allocated float32 matrix in schema order in one pass over the columns.
+    Missing source columns are filled with the schema default and reported in the log.
+    """
+    cols = schema["columns"]
+    X = np.empty((len(df), len(cols)), dtype=np.float32)
+    normalized: Dict[str, np.ndarray] = {}
+    missing = []
+
+    for j, col in enumerate(cols):
+        source = col["source"]
+        if source not in df.columns:
+            X[:, j] = col["default"]
+            missing.append(source)
+            continue
+        if col["kind"] == "onehot":
+            if source not in normalized:
+                normalized[source] = df[source].astype(str).str.strip().str.lower().to_numpy()
+            X[:, j] = normalized[source] == col["value"]
+        else:
+            values = df[source]
+            if not pd.api.types.is_numeric_dtype(values):
+                values = pd.to_numeric(values, errors="coerce")
+            # fill NaN in X, not in the array from to_numpy (a read-only view for float32 columns)
+            X[:, j] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+            column = X[:, j]
+            column[np.isnan(column)] = col["default"]
+
+    if missing:
+        log.warning(f"⚠️ Columns missing from input, filled with schema defaults: {sorted(set(missing))}")
+    return X
+
+
+def records_matrix(records: List[dict], schema: Dict[str, Any], feature_store=None) -> np.ndarray:
+    """Dict fast path (see engineer_records) producing the same matrix as build_matrix."""
+    X = engineer_records(records, feature_names(schema), feature_store).astype(np.float32)
+    defaults = np.array([c["default"] for c in schema["columns"]], dtype=np.float32)
+    nan_rows, nan_cols = np.nonzero(np.isnan(X))
+    X[nan_rows, nan_cols] = defaults[nan_cols]
+    return X
+
+
+def as_model_input(model, X: np.ndarray, schema: Dict[str, Any]):
+    """Wrap X in a DataFrame only for legacy sklearn models fitted with feature names."""
+    if hasattr(model, "feature_names_in_") and hasattr(model, "estimators_"):
+        return pd.DataFrame(X, columns=feature_names(schema))
+    return X
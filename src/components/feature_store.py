@@ -0,0 +1,237 @@
+# src/components/feature_store.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+
+log = get_logger(__name__)
+
+STORE_VERSION = 1
+STORE_SUFFIX = ".store.npz"
+# trailing windows (days) of the historical engagement features
+HISTORY_WINDOWS = (7, 30)
+HISTORY_FEATURES = [f"er_mean_{w}d" for w in HISTORY_WINDOWS]
+# cells with fewer posts in the window back off to platform × media_type, then all posts
+MIN_POSTS = 3
+N_HOURS = 24
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def epoch_days(posted_at: pd.Series) -> np.ndarray:
+    """Days since 1970-01-01 as float (NaN for missing timestamps)."""
+    values = pd.to_datetime(posted_at, errors="coerce").to_numpy(dtype="datetime64[D]")
+    days = (values - _EPOCH).astype(np.float64)
+    days[np.isnat(values)] = np.nan
+    return days
+
+
+def _codes(values, vocab: Sequence[str]) -> np.ndarray:
+    """Index of each normalized value in `vocab` (-1 when missing or unseen)."""
+    keys = pd.Series(values, dtype=object).astype(str).str.strip().str.lower()
+    return pd.Index(list(vocab), dtype=object).get_indexer(keys).astype(np.int64)
+
+
+class FeatureStore:
+    """
+    Daily engagement-rate sums and post counts per platform × media_type × posting hour,
+    held as dense (day, platform, media_type, hour) arrays starting at `day0`.
+
+    Trailing-window means come from prefix sums over the day axis, so the history features
+    of any row are a constant number of array lookups. A row's window covers the days
+    before its posting day, never the day itself, so a post never sees its own target.
+    New posts are added with `update`; post ids already counted are skipped.
+
+    `seen` holds one 8-byte hash per counted post id (sorted, saved with the store) so
+    re-ingested posts are not counted twice. It grows with the number of distinct posts,
+    about 8 MB per million, the same order as the posts' own share of the training data;
+    posts without a post_id are not tracked and count every time they are added.
+    """
+
+    def __init__(self, platforms: Sequence[str] = (), media_types: Sequence[str] = (), day0: int = 0,
+                 sums: Optional[np.ndarray] = None, counts: Optional[np.ndarray] = None,
+                 seen: Optional[np.ndarray] = None):
+        self.platforms = list(platforms)
+        self.media_types = list(media_types)
+        self.day0 = int(day0)
+        shape = (0, len(self.platforms), len(self.media_types), N_HOURS)
+        self.sums = np.zeros(shape, dtype=np.float64) if sums is None else sums
+        self.counts = np.zeros(shape, dtype=np.int32) if counts is None else counts
+        self.seen = np.empty(0, dtype=np.uint64) if seen is None else seen  # sorted post_id hashes
+        self._prefix = None
+
+    @property
+    def n_days(self) -> int:
+        return self.sums.shape[0]
+
+    @property
+    def n_posts(self) -> int:
+        return int(self.counts.sum())
+
+    def _grow(self, platforms: List[str], media_types: List[str], first_day: int, last_day: int):
+        """Extend the vocabularies (new values appended, indices stay stable) and the day range."""
+        new_p = [p for p in dict.fromkeys(platforms) if p not in self.platforms]
+        new_m = [m for m in dict.fromkeys(media_types) if m not in self.media_types]
+        if self.n_days == 0:
+            self.day0 = first_day
+        before = max(0, self.day0 - first_day)
+        after = max(0, last_day - (self.day0 + self.n_days - 1)) if self.n_days else last_day - first_day + 1
+        if new_p or new_m or before or after:
+            pad = ((before, after), (0, len(new_p)), (0, len(new_m)), (0, 0))
+            self.sums = np.pad(self.sums, pad)
+            self.counts = np.pad(self.counts, pad)
+            self.platforms += new_p
+            self.media_types += new_m
+            self.day0 -= before
+
+    def update(self, df: pd.DataFrame) -> int:
+        """
+        Add engineered posts (platform, media_type, posted_at, engagement_rate; post_id when
+        present) to the daily aggregates. Rows without a timestamp or ER, and post ids already
+        counted, are skipped. Returns the number of posts added.
+        """
+        needed = ["platform", "media_type", "posted_at", "engagement_rate"]
+        missing = [c for c in needed if c not in df.columns]
+        if missing:
+            raise ValueError(f"Feature store update needs columns {missing}")
+
+        days = epoch_days(df["posted_at"])
+        er = pd.to_numeric(df["engagement_rate"], errors="coerce").to_numpy(dtype=float)
+        keep = ~np.isnan(days) & ~np.isnan(er)
+        if "post_id" in df.columns:
+            # only rows with an id can be recognized again; rows without one are always counted
+            has_id = df["post_id"].notna().to_numpy()
+            ids = pd.util.hash_pandas_object(df["post_id"][has_id].astype(str), index=False).to_numpy(dtype=np.uint64)
+            keep[has_id] &= ~pd.Series(ids).duplicated().to_numpy() & ~np.isin(ids, self.seen)
+            self.seen = np.union1d(self.seen, ids[keep[has_id]])
+        if not keep.any():
+            return 0
+
+        platforms = df["platform"].astype(str).str.strip().str.lower().to_numpy()[keep]
+        media = df["media_type"].astype(str).str.strip().str.lower().to_numpy()[keep]
+        days, er = days[keep].astype(np.int64), er[keep]
+        hours = pd.to_datetime(df["posted_at"], errors="coerce").dt.hour.to_numpy()[keep].astype(np.int64)
+        self._grow(sorted(set(platforms)), sorted(set(media)), int(days.min()), int(days.max()))
+
+        # scatter-add every post into its (day, platform, media_type, hour) cell in one pass
+        cell = np.ravel_multi_index((days - self.day0, _codes(platforms, self.platforms),
+                                     _codes(media, self.media_types), hours), self.sums.shape)
+        self.sums += np.bincount(cell, weights=er, minlength=self.sums.size).reshape(self.sums.shape)
+        self.counts += np.bincount(cell, minlength=self.counts.size).reshape(self.counts.shape).astype(np.int32)
+        self._prefix = None
+        return int(keep.sum())
+
+    def _prefix_sums(self) -> Dict[str, np.ndarray]:
+        """Cumulative sums over days (row d = days before d) at cell, platform×media and global level."""
+        if self._prefix is None:
+            def cumulative(a):
+                out = np.zeros((a.shape[0] + 1,) + a.shape[1:], dtype=np.float64)
+                np.cumsum(a, axis=0, out=out[1:])
+                return out
+            sums, counts = cumulative(self.sums), cumulative(self.counts)
+            self._prefix = {
+                "cell": (sums, counts),
+                "pm": (sums.sum(axis=3), counts.sum(axis=3)),
+                "all": (sums.sum(axis=(1, 2, 3)), counts.sum(axis=(1, 2, 3))),
+            }
+        return self._prefix
+
+    def lookup(self, platforms, media_types, hours, days=None) -> np.ndarray:
+        """
+        Trailing-window mean ER for each row, one column per HISTORY_WINDOWS entry.
+        `days` are days since the epoch (NaN/None = the latest window); days past the end
+        of the store use the latest window. Sparse cells back off to platform × media_type,
+        then to every post in the window, then to the all-time mean.
+        """
+        n = len(hours)
+        out = np.full((n, len(HISTORY_WINDOWS)), np.nan)
+        if self.n_posts == 0:
+            return out
+        prefix = self._prefix_sums()
+        p = _codes(platforms, self.platforms)
+        m = _codes(media_types, self.media_types)
+        h = np.clip(np.asarray(hours, dtype=np.int64), 0, N_HOURS - 1)
+        known = (p >= 0) & (m >= 0)
+        p, m = np.where(known, p, 0), np.where(known, m, 0)
+        if days is None:
+            t = np.full(n, self.n_days)
+        else:
+            days = np.asarray(days, dtype=np.float64)
+            t = np.where(np.isnan(days), self.n_days, np.nan_to_num(days) - self.day0)
+            t = np.clip(t, 0, self.n_days).astype(np.int64)
+
+        overall = self.sums.sum() / self.n_posts
+        for j, window in enumerate(HISTORY_WINDOWS):
+            lo = np.maximum(t - window, 0)
+            value = np.full(n, overall)
+            # coarsest level first; finer levels overwrite where they have enough posts
+            for level, index in (("all", ()), ("pm", (p, m)), ("cell", (p, m, h))):
+                sums, counts = prefix[level]
+                s = sums[(t,) + index] - sums[(lo,) + index]
+                c = counts[(t,) + index] - counts[(lo,) + index]
+                ok = c >= (1 if level == "all" else MIN_POSTS)
+                if level != "all":
+                    ok &= known
+                value = np.where(ok, s / np.maximum(c, 1), value)
+            out[:, j] = value
+        return out
+
+    # ---------------------------------------------------------
+    # PERSISTENCE — compressed .npz (dense arrays compress well: most cells are empty)
+    # ---------------------------------------------------------
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(tmp, version=np.array([STORE_VERSION]), day0=np.array([self.day0]),
+                            platforms=np.array(self.platforms, dtype=str),
+                            media_types=np.array(self.media_types, dtype=str),
+                            sums=self.sums, counts=self.counts, seen=self.seen)
+        tmp.replace(path)
+        log.info(f"🗃️ Feature store saved at: {path} ({self.n_posts} posts, {self.n_days} days, "
+                 f"{len(self.platforms)}×{len(self.media_types)}×{N_HOURS} cells)")
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "FeatureStore":
+        with np.load(path) as data:
+            if int(data["version"][0]) != STORE_VERSION:
+                raise ValueError(f"Unsupported feature store version {int(data['version'][0])} in {path}")
+            return cls([str(p) for p in data["platforms"]], [str(m) for m in data["media_types"]],
+                       int(data["day0"][0]), data["sums"], data["counts"], data["seen"])
+
+
+def store_path_for(model_path: str | Path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + STORE_SUFFIX)
+
+
+def uses_history(schema: Dict[str, Any]) -> bool:
+    return any(c["name"] in HISTORY_FEATURES for c in schema["columns"])
+
+
+def load_store_for(model_path: str | Path, schema: Dict[str, Any]) -> Optional[FeatureStore]:
+    """The store saved next to the model when its schema uses history features, else None."""
+    if not uses_history(schema):
+        return None
+    path = store_path_for(model_path)
+    if not path.exists():
+        log.warning(f"⚠️ Model uses {HISTORY_FEATURES} but no feature store at {path}; schema defaults apply")
+        return None
+    return FeatureStore.load(path)
+
+
+def add_history_features(df: pd.DataFrame, store: FeatureStore) -> pd.DataFrame:
+    """Set the HISTORY_FEATURES columns in place from the store (posted_at/hour/platform/media_type)."""
+    n = len(df)
+    column = lambda name, default: df[name] if name in df.columns else pd.Series([default] * n, index=df.index)
+    days = epoch_days(df["posted_at"]) if "posted_at" in df.columns else None
+    hours = pd.to_numeric(column("hour", 19), errors="coerce").fillna(19).to_numpy()
+    values = store.lookup(column("platform", "unknown").to_numpy(), column("media_type", "unknown").to_numpy(),
+                          hours, days)
+    for j, name in enumerate(HISTORY_FEATURES):
+        df[name] = values[:, j]
+    return df
@@ -0,0 +1,153 @@
+# src/components/model_evaluation.py
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+
+log = get_logger(__name__)
+
+ALL_PLATFORMS = "All"
+HIST_BINS = 50
+MAX_SCATTER_POINTS = 2000
+DENSITY_BINS = 40
+ER_QUANTILES = [0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0]
+
+
+# ---------------------------------------------------------
+# CHART AGGREGATES — constant-size payloads regardless of row count
+# ---------------------------------------------------------
+def histogram_bins(values, bins: int = HIST_BINS):
+    """Counts and edges of the finite values (np.histogram), for a pre-binned bar chart."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    return np.histogram(values, bins=bins)
+
+
+def sample_indices(n: int, max_points: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Sorted indices of a uniform sample of at most `max_points` rows (every row when n fits),
+    the same distribution a reservoir sample over a stream of `n` rows would have.
+    """
+    if n <= max_points:
+        return np.arange(n)
+    return np.sort(rng.choice(n, size=max_points, replace=False))
+
+
+def density_grid(x, y, bins: int = DENSITY_BINS):
+    """2D counts (x bins by y bins) and edges of the finite (x, y) pairs, for a heatmap."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not keep.any():
+        return np.zeros((0, 0), dtype=np.int64), np.zeros(0), np.zeros(0)
+    counts, x_edges, y_edges = np.histogram2d(x[keep], y[keep], bins=bins)
+    return counts.astype(np.int64), x_edges, y_edges
+
+
+def least_squares_line(x, y):
+    """Closed-form ordinary least squares fit y ~ slope * x + intercept, from the centred moments."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if not len(x):
+        return 0.0, float("nan")
+    x_mean, y_mean = x.mean(), y.mean()
+    dx = x - x_mean
+    sxx = float(dx @ dx)
+    if len(x) < 2 or sxx == 0:
+        return 0.0, float(y_mean)
+    slope = float(dx @ (y - y_mean)) / sxx
+    return slope, float(y_mean - slope * x_mean)
+
+
+def summarize_predictions(y_true: np.ndarray, y_pred: np.ndarray, rng: np.random.Generator,
+                          max_points: int = MAX_SCATTER_POINTS) -> Dict[str, Any]:
+    """
+    Compact evaluation summary for one slice of the dataset: metrics and quantiles, histogram
+    bins, an actual/predicted density grid, a point sample and the trendline of the full slice.
+    """
+    # imported on first use: sklearn.metrics pulls in scipy.stats (~1s), too slow for app start-up
+    from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    counts, edges = histogram_bins(y_true)
+    quantiles = np.quantile(y_true, ER_QUANTILES)
+    density, x_edges, y_edges = density_grid(y_true, y_pred)
+    idx = sample_indices(len(y_true), max_points, rng)
+    slope, intercept = least_squares_line(y_true, y_pred)
+
+    return {
+        "n": int(len(y_true)),
+        "r2": float(r2_score(y_true, y_pred)) if len(y_true) > 1 else float("nan"),
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "er_mean": float(np.mean(y_true)),
+        "er_quantiles": {str(q): float(v) for q, v in zip(ER_QUANTILES, quantiles)},
+        "hist_counts": counts.tolist(),
+        "hist_edges": edges.tolist(),
+        "density_counts": density.tolist(),
+        "density_x_edges": x_edges.tolist(),
+        "density_y_edges": y_edges.tolist(),
+        "sample_actual": y_true[idx].tolist(),
+        "sample_pred": y_pred[idx].tolist(),
+        "trend_slope": slope,
+        "trend_intercept": intercept,
+    }
+
+
+def build_platform_summary(df: pd.DataFrame, y_pred: np.ndarray, seed: int = 42) -> Dict[str, Any]:
+    """
+    Precompute everything the dashboard shows per platform selection:
+    R²/RMSE/MAE, ER quantiles, histogram bins, density grid and downsampled actual/predicted pairs.
+    `df` must contain 'engagement_rate' and optionally 'platform'; `y_pred` aligns with its rows.
+    """
+    y_true = df["engagement_rate"].to_numpy(dtype=float)
+    codes, names = None, []
+    if "platform" in df.columns:
+        keys = df["platform"].astype(str).str.strip().str.lower().to_numpy()
+        codes, names = pd.factorize(keys, sort=True)
+    return summary_from_codes(y_true, y_pred, codes, list(names), seed)
+
+
+def summary_from_codes(y_true: np.ndarray, y_pred: np.ndarray, codes: Optional[np.ndarray],
+                       names: List[str], seed: int = 42) -> Dict[str, Any]:
+    """
+    build_platform_summary over plain arrays: `codes[i]` indexes `names` (the sorted
+    platform names) for row i, -1 meaning unknown (counted under 'All' only).
+    """
+    rng = np.random.default_rng(seed)
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+
+    platforms: Dict[str, Any] = {ALL_PLATFORMS: summarize_predictions(y_true, y_pred, rng)}
+    if codes is not None:
+        codes = np.asarray(codes)
+        for code, platform in enumerate(names):
+            mask = codes == code
+            if mask.any():
+                platforms[platform] = summarize_predictions(y_true[mask], y_pred[mask], rng)
+
+    return {"version": 1, "platforms": platforms}
+
+
+def save_platform_summary(summary: Dict[str, Any], path: str | Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(summary), encoding="utf-8")
+    tmp.replace(path)
+    log.info(f"📦 Platform summary saved at: {path}")
+
+
+def load_platform_summary(path: str | Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def summary_platforms(summary: Dict[str, Any]) -> List[str]:
+    """Platform keys in the summary, excluding the 'All' aggregate."""
+    return [p for p in summary.get("platforms", {}) if p != ALL_PLATFORMS]
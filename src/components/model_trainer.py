@@ -1,17 +1,40 @@
 # src/components/model_trainer.py
 from __future__ import annotations
-import logging
+import json
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import joblib
 import numpy as np
 import pandas as pd
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, Optional
 
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import KFold, ParameterSampler, train_test_split, cross_val_score
 from sklearn.metrics import mean_squared_error
 
-log = logging.getLogger(__name__)
+from src.Utils import (
+    append_parquet, iter_processed, load_joblib, processed_row_count, read_processed, save_joblib, write_processed,
+)
+from src.components.feature_schema import (
+    build_feature_schema, build_matrix, feature_names, load_feature_schema, save_feature_schema,
+    schema_path_for, source_columns,
+)
+from src.components.feature_store import (
+    HISTORY_FEATURES, FeatureStore, add_history_features, load_store_for, store_path_for,
+)
+from src.components.forest_compiler import compiled_path_for, save_compiled_forest
+from src.components.prediction_cache import clear_prediction_cache
+from src.components.model_evaluation import build_platform_summary, save_platform_summary, summary_from_codes
+from src.components.text_features import HASHTAG_BUCKET_FEATURES, TEXT_FEATURES
+from src.logger import get_logger
+
+log = get_logger(__name__)
+
+# forest used when no search is run
+DEFAULT_PARAMS = {"n_estimators": 200, "max_depth": 10, "min_samples_leaf": 1, "max_features": 1.0}
 
 
 def _numeric_feature_candidates(df: pd.DataFrame) -> List[str]:
@@ -20,53 +43,95 @@ def _numeric_feature_candidates(df: pd.DataFrame) -> List[str]:
     """
     candidates = [
         "followers", "views", "likes", "comments", "shares",
-        "saves", "weekday", "caption_length"
-    ]
+        "saves", "weekday", "caption_length", "hour", "is_weekend"
+    ] + [c for c in TEXT_FEATURES if c != "caption_length"] + HASHTAG_BUCKET_FEATURES + HISTORY_FEATURES
     return [c for c in candidates if c in df.columns]
 
 
-def train_and_save(df: pd.DataFrame, model_out: str | Path, processed_out: str | Path) -> Dict[str, Any]:
+def _has_history_inputs(df: pd.DataFrame) -> bool:
+    return all(c in df.columns for c in ["platform", "media_type", "posted_at", "engagement_rate"])
+
+
+def _categorical_feature_candidates(df: pd.DataFrame) -> List[str]:
     """
-    Train a RandomForestRegressor on numeric features and save model + processed data.
-    Ensures 'platform' and 'media_type' columns are preserved for visualization.
-    Returns training statistics with RMSE for model evaluation.
+    Categorical columns one-hot encoded through the feature schema.
     """
-    model_out = Path(model_out)
-    processed_out = Path(processed_out)
+    return [c for c in ["platform", "media_type"] if c in df.columns]
 
-    df = df.copy()
 
-    # --- Ensure engagement_rate exists ---
+def prepare_training_frame(df: pd.DataFrame):
+    """
+    Rows and columns a model is trained on: the numeric features, the target and the columns
+    kept for visualization (platform, media_type, ...), dropping rows with NaN features/target.
+    Returns (df_clean, features, extra_cols).
+    """
     if "engagement_rate" not in df.columns:
         raise ValueError("Dataset must contain 'engagement_rate' column")
 
-    # --- Identify usable numeric features ---
     features = _numeric_feature_candidates(df)
     if not features:
         raise ValueError(f"No numeric features found for training. Found columns: {', '.join(df.columns)}")
 
-    # --- Keep platform/media_type for downstream visualization ---
-    extra_cols = [c for c in ["platform", "media_type"] if c in df.columns]
-
-    # --- Clean data ---
+    extra_cols = [c for c in ["platform", "media_type", "post_id", "posted_at"] if c in df.columns]
     required_cols = features + ["engagement_rate"]
-    df_clean = df[required_cols + extra_cols].dropna(subset=required_cols)
+    return df[required_cols + extra_cols].dropna(subset=required_cols), features, extra_cols
+
+
+def train_and_save(df: pd.DataFrame, model_out: str | Path, processed_out: str | Path,
+                   summary_out: str | Path | None = None, partition_month: bool = False,
+                   search: Optional[Dict[str, Any]] = None, history: bool = True) -> Dict[str, Any]:
+    """
+    Train a RandomForestRegressor on numeric + one-hot categorical features and save
+    model + processed data. The feature schema (column order, dtypes, vocabularies) is
+    saved next to the model and used by every consumer to build the input matrix.
+    Ensures 'platform' and 'media_type' columns are preserved for visualization.
+    Also writes the per-platform evaluation summary used by the dashboard
+    (defaults to platform_summary.json next to the model).
+    `processed_out` without a .parquet/.csv suffix is written as a dataset partitioned
+    by platform (and posting month with `partition_month`).
+    `search` (keyword arguments for search_hyperparameters, possibly empty) replaces
+    DEFAULT_PARAMS with the best searched configuration; results go to '<model>.search.json'.
+    With `history` and timestamped rows, a feature store of trailing-window ER means is built
+    from the dataset, joined as features and saved as '<model>.store.npz'.
+    Returns training statistics with RMSE, fit time and predict latency for model evaluation.
+    """
+    model_out = Path(model_out)
+    processed_out = Path(processed_out)
+    summary_out = Path(summary_out) if summary_out else model_out.parent / "platform_summary.json"
+    schema_out = schema_path_for(model_out)
+
+    # --- Historical engagement features (a shallow copy: the input is not modified) ---
+    feature_store = None
+    if history and _has_history_inputs(df):
+        feature_store = FeatureStore()
+        feature_store.update(df)
+        df = add_history_features(df.copy(deep=False), feature_store)
+
+    # --- Select features and clean data (a new frame; the input is not modified) ---
+    df_clean, features, extra_cols = prepare_training_frame(df)
     if df_clean.empty:
         raise ValueError("No data available after dropping NaNs from target/features")
 
-    # --- Prepare features/target ---
-    X = df_clean[features]
-    y = df_clean["engagement_rate"]
+    # --- Prepare features/target (single pass into a float32 matrix) ---
+    schema = build_feature_schema(df_clean, features, _categorical_feature_candidates(df_clean))
+    X = build_matrix(df_clean, schema)
+    y = df_clean["engagement_rate"].to_numpy()
 
     # --- Split data ---
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42, shuffle=True
     )
 
+    # --- Pick hyperparameters ---
+    params = dict(DEFAULT_PARAMS)
+    search_out = None
+    if search is not None:
+        results = search_hyperparameters(X_train, y_train, **search)
+        params = results["best_params"]
+        search_out = save_search_results(results, search_path_for(model_out))
+
     # --- Initialize model ---
-    model = RandomForestRegressor(
-        n_estimators=200, max_depth=10, random_state=42, n_jobs=-1
-    )
+    model = RandomForestRegressor(**params, random_state=42, n_jobs=-1)
 
     # --- Cross-validation RMSE ---
     try:
@@ -79,29 +144,49 @@ def train_and_save(df: pd.DataFrame, model_out: str | Path, processed_out: str |
         rmse_cv = float("nan")
 
     # --- Train model ---
+    t0 = time.perf_counter()
     model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
 
     # --- Evaluate model ---
     y_pred = model.predict(X_test)
     mse_test = mean_squared_error(y_test, y_pred)
     rmse_test = float(np.sqrt(mse_test))
+    latency_ms = _single_row_latency_ms(model, X_test[:1])
 
     # --- Save model ---
     model_out.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(model, str(model_out))
+    save_joblib(model, str(model_out))
+    clear_prediction_cache(model_out)  # cached predictions belong to the replaced model
+    save_feature_schema(schema, schema_out)
+    store_out = feature_store.save(store_path_for(model_out)) if feature_store is not None else None
+    compiled_out = compiled_path_for(model_out)
+    try:
+        save_compiled_forest(model, compiled_out, feature_names(schema))
+    except Exception as e:
+        log.warning(f"Failed to export compiled forest {compiled_out}: {e}")
 
     # --- Save processed dataset ---
     processed_out.parent.mkdir(parents=True, exist_ok=True)
     try:
-        if str(processed_out).lower().endswith(".parquet"):
-            df_clean.to_parquet(processed_out, index=False)
-        else:
+        if str(processed_out).lower().endswith(".csv"):
             df_clean.to_csv(processed_out, index=False)
+        else:
+            # single .parquet file, or a platform-partitioned dataset directory
+            write_processed(df_clean, str(processed_out), by_month=partition_month)
     except Exception as e:
         log.warning(f"Failed to write processed file {processed_out}: {e}")
 
+    # --- Precompute per-platform evaluation for the dashboard ---
+    try:
+        summary = build_platform_summary(df_clean, model.predict(X))
+        save_platform_summary(summary, summary_out)
+    except Exception as e:
+        log.warning(f"Failed to write platform summary {summary_out}: {e}")
+
     # --- Logging ---
-    log.info(f"✅ Model trained successfully — RMSE={rmse_test:.6f}, Features used: {features}")
+    log.info(f"✅ Model trained successfully — RMSE={rmse_test:.6f}, fit={fit_s:.1f}s, "
+             f"latency={latency_ms:.2f}ms, Features used: {feature_names(schema)}")
     log.info(f"📁 Model saved at: {model_out}")
     log.info(f"📊 Processed dataset saved at: {processed_out}")
 
@@ -109,12 +194,491 @@ def train_and_save(df: pd.DataFrame, model_out: str | Path, processed_out: str |
     stats = {
         "rmse_cv": rmse_cv,
         "rmse_test": rmse_test,
+        "fit_s": fit_s,
+        "latency_ms": latency_ms,
+        "params": params,
+        "search": str(search_out) if search_out else None,
         "model": str(model_out),
+        "compiled_model": str(compiled_out),
         "processed": str(processed_out),
-        "features_used": features,
+        "summary": str(summary_out),
+        "features_used": feature_names(schema),
+        "schema": str(schema_out),
+        "feature_store": str(store_out) if store_out else None,
         "extra_cols": extra_cols,
         "n_train": len(X_train),
         "n_test": len(X_test),
     }
 
     return stats
+
+
+def train_incremental(df_new: pd.DataFrame, model_path: str | Path, processed_out: str | Path,
+                      n_new_trees: int = 50, summary_out: str | Path | None = None,
+                      refresh_summary: bool = True) -> Dict[str, Any]:
+    """
+    Grow an existing forest with `n_new_trees` trees fitted on the new rows only (warm start)
+    and append those rows to the processed dataset as a new part file.
+    The feature schema of the existing model is reused unchanged; 20% of the new rows are
+    held out to measure how holdout RMSE drifts between the old and the grown model.
+    """
+    start = time.perf_counter()
+    model_path = Path(model_path)
+    processed_out = Path(processed_out)
+    summary_out = Path(summary_out) if summary_out else model_path.parent / "platform_summary.json"
+
+    if "engagement_rate" not in df_new.columns:
+        raise ValueError("Dataset must contain 'engagement_rate' column")
+    if not model_path.exists():
+        raise FileNotFoundError(f"No model to update at {model_path}; run a full training first")
+
+    model = load_joblib(str(model_path))  # private copy: the forest is grown in place
+    schema = load_feature_schema(schema_path_for(model_path))
+
+    # --- New posts enter the feature store first; their own windows end the day before ---
+    feature_store = load_store_for(model_path, schema)
+    if feature_store is not None:
+        added = feature_store.update(df_new)
+        df_new = add_history_features(df_new.copy(deep=False), feature_store)
+        log.info(f"🗃️ Feature store: +{added} posts ({feature_store.n_posts} total)")
+
+    # --- Clean new rows with the same columns as the stored dataset ---
+    cols = list(dict.fromkeys(source_columns(schema) + ["engagement_rate"]))
+    cols += [c for c in ["post_id", "posted_at"] if c in df_new.columns and c not in cols]
+    missing = [c for c in cols if c not in df_new.columns]
+    if missing:
+        raise ValueError(f"New rows are missing columns required by the feature schema: {missing}")
+    df_clean = df_new[cols].dropna(subset=["engagement_rate"])
+    if df_clean.empty:
+        raise ValueError("No new rows available after dropping NaNs from target")
+
+    for col, vocab in schema["categories"].items():
+        unseen = set(df_clean[col].astype(str).str.strip().str.lower()) - set(vocab)
+        if unseen:
+            log.warning(f"⚠️ Unseen {col} values {sorted(unseen)} — encoded as all-zero until a full retrain")
+
+    X = build_matrix(df_clean, schema)
+    y = df_clean["engagement_rate"].to_numpy()
+    if len(X) >= 10:
+        X_train, X_hold, y_train, y_hold = train_test_split(X, y, test_size=0.2, random_state=42, shuffle=True)
+    else:
+        X_train, X_hold, y_train, y_hold = X, X, y, y
+
+    # --- Warm start: keep existing trees, fit only the additional ones on recent data ---
+    trees_before = len(model.estimators_)
+    rmse_before = float(np.sqrt(mean_squared_error(y_hold, model.predict(X_hold))))
+    model.set_params(warm_start=True, n_estimators=trees_before + n_new_trees)
+    model.fit(X_train, y_train)
+    model.set_params(warm_start=False)
+    rmse_after = float(np.sqrt(mean_squared_error(y_hold, model.predict(X_hold))))
+
+    # --- Save model artifacts (schema is unchanged) ---
+    save_joblib(model, str(model_path))
+    clear_prediction_cache(model_path)  # cached predictions belong to the replaced model
+    if feature_store is not None:
+        feature_store.save(store_path_for(model_path))
+    compiled_out = compiled_path_for(model_path)
+    try:
+        save_compiled_forest(model, compiled_out, feature_names(schema))
+    except Exception as e:
+        log.warning(f"Failed to export compiled forest {compiled_out}: {e}")
+
+    # --- Append new rows without rewriting the stored dataset ---
+    part = append_parquet(df_clean, str(processed_out))
+
+    # --- Refresh dashboard summary over the full dataset ---
+    if refresh_summary:
+        try:
+            df_all = read_processed(str(processed_out))
+            summary = build_platform_summary(df_all, model.predict(build_matrix(df_all, schema)))
+            save_platform_summary(summary, summary_out)
+        except Exception as e:
+            log.warning(f"Failed to refresh platform summary {summary_out}: {e}")
+
+    elapsed = time.perf_counter() - start
+    log.info(f"🌱 Incremental training: +{n_new_trees} trees ({trees_before} → {len(model.estimators_)}) "
+             f"on {len(X_train)} new rows in {elapsed:.1f}s")
+    log.info(f"📉 Holdout RMSE drift: {rmse_before:.6f} → {rmse_after:.6f} ({rmse_after - rmse_before:+.6f})")
+    log.info(f"📊 Appended {len(df_clean)} rows to {processed_out} ({part})")
+
+    return {
+        "mode": "incremental",
+        "model": str(model_path),
+        "compiled_model": str(compiled_out),
+        "processed_part": str(part),
+        "n_new_rows": len(df_clean),
+        "n_train": len(X_train),
+        "n_holdout": len(X_hold),
+        "trees_before": trees_before,
+        "trees_after": len(model.estimators_),
+        "rmse_holdout_before": rmse_before,
+        "rmse_holdout_after": rmse_after,
+        "rmse_drift": rmse_after - rmse_before,
+        "wall_time_s": elapsed,
+    }
+
+
+# ---------------------------------------------------------
+# OUT-OF-CORE TRAINING — Parquet row groups → memory-mapped float32 matrix
+# ---------------------------------------------------------
+OOC_BATCH_ROWS = 250_000
+OOC_CHUNK_ROWS = 1_000_000
+TEST_FRACTION = 0.2
+FIT_MODES = ("mmap", "chunked")
+
+
+def merge_forests(forests: List[RandomForestRegressor]) -> RandomForestRegressor:
+    """One forest averaging every tree of `forests` (all fitted on the same feature columns)."""
+    merged = forests[0]
+    for forest in forests[1:]:
+        merged.estimators_ += forest.estimators_
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+
+def _fit_chunked(X: np.ndarray, y: np.ndarray, params: Dict[str, Any], chunk_rows: int,
+                 seed: int = 42) -> RandomForestRegressor:
+    """
+    Split the rows into disjoint random chunks of about `chunk_rows`, fit a share of the
+    trees on each (one chunk is read from the memmap into memory at a time) and merge them.
+    The shares differ by at most one tree and add up to n_estimators; there are never more
+    chunks than trees, so with very many rows the chunks grow beyond `chunk_rows`.
+    """
+    n_trees = params["n_estimators"]
+    n_chunks = max(1, min(math.ceil(len(X) / chunk_rows), n_trees))
+    base, extra = divmod(n_trees, n_chunks)
+    perm = np.random.default_rng(seed).permutation(len(X))
+    forests = []
+    for i, idx in enumerate(np.array_split(perm, n_chunks)):
+        idx = np.sort(idx)  # read the memmap front to back
+        trees = base + (i < extra)
+        forest = RandomForestRegressor(**dict(params, n_estimators=trees), random_state=seed + i, n_jobs=-1)
+        forest.fit(X[idx], y[idx])
+        forests.append(forest)
+        log.info(f"🧩 Chunk {i + 1}/{n_chunks}: {trees} trees on {len(idx)} rows")
+    return merge_forests(forests)
+
+
+def _predict_batched(model, X: np.ndarray, batch_rows: int) -> np.ndarray:
+    out = np.empty(len(X), dtype=float)
+    for start in range(0, len(X), batch_rows):
+        out[start:start + batch_rows] = model.predict(X[start:start + batch_rows])
+    return out
+
+
+def _platform_codes(df: pd.DataFrame, platforms: Optional[List[str]]) -> np.ndarray:
+    """Index of each row's platform in the schema vocabulary (-1 when unknown)."""
+    if not platforms or "platform" not in df.columns:
+        return np.full(len(df), -1, dtype=np.int16)
+    keys = df["platform"].astype(str).str.strip().str.lower()
+    return pd.Categorical(keys, categories=platforms).codes.astype(np.int16)
+
+
+def train_out_of_core(processed_path: str | Path, model_out: str | Path, summary_out: str | Path | None = None,
+                      fit_mode: str = "mmap", search: Optional[Dict[str, Any]] = None,
+                      batch_rows: int = OOC_BATCH_ROWS, chunk_rows: int = OOC_CHUNK_ROWS,
+                      workdir: str | Path | None = None, history: bool = True) -> Dict[str, Any]:
+    """
+    Train from a processed Parquet dataset (either layout) without loading it into memory.
+    Row groups are streamed in batches of `batch_rows`: a first pass over the categorical
+    columns collects the vocabularies, a second encodes every batch into memory-mapped float32
+    train/test matrices (a seeded TEST_FRACTION split) in a temporary directory under
+    `workdir` — next to the model by default, as /tmp may be RAM-backed.
+    `fit_mode` 'mmap' fits one forest directly on the memmap (sklearn reads it in place, so
+    pages come from the OS page cache rather than a private copy); 'chunked' fits forests on
+    disjoint random chunks of `chunk_rows` and merges their trees, bounding peak memory by
+    one chunk. Writes the same model, schema, compiled forest, feature store and summary as
+    train_and_save; the processed dataset is the input and is left unchanged (history features
+    are joined per batch). No cross-validation is run.
+    """
+    if fit_mode not in FIT_MODES:
+        raise ValueError(f"Unknown fit_mode {fit_mode!r}; expected one of {FIT_MODES}")
+    start = time.perf_counter()
+    processed_path = str(processed_path)
+    model_out = Path(model_out)
+    summary_out = Path(summary_out) if summary_out else model_out.parent / "platform_summary.json"
+    schema_out = schema_path_for(model_out)
+
+    # --- Pass 1: category vocabularies and the history feature store over every row ---
+    first = next(iter_processed(processed_path, batch_size=batch_rows), None)
+    if first is None:
+        raise ValueError(f"No rows in processed dataset {processed_path}")
+    cat_cols = _categorical_feature_candidates(first)
+    feature_store = FeatureStore() if history and _has_history_inputs(first) else None
+    scan_cols = cat_cols + (["platform", "media_type", "posted_at", "engagement_rate"] if feature_store is not None else [])
+    scan_cols += [c for c in ["post_id"] if feature_store is not None and c in first.columns]
+    vocab = {c: set() for c in cat_cols}
+    if scan_cols:
+        for chunk in iter_processed(processed_path, columns=list(dict.fromkeys(scan_cols)), batch_size=batch_rows):
+            for c in cat_cols:
+                vocab[c].update(chunk[c].dropna().astype(str).str.strip().str.lower().unique())
+            if feature_store is not None:
+                feature_store.update(chunk)
+    if feature_store is not None:
+        first = add_history_features(first, feature_store)
+    _, features, _ = prepare_training_frame(first)
+    schema = build_feature_schema(first, features, cat_cols, {c: sorted(v) for c, v in vocab.items()})
+    platforms = schema["categories"].get("platform")
+    del first
+
+    # --- Pass 2: encode batches into on-disk train/test matrices ---
+    n_total = processed_row_count(processed_path)
+    n_cols = len(schema["columns"])
+    required_cols = features + ["engagement_rate"]
+    workdir = Path(workdir) if workdir else model_out.parent
+    workdir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(42)
+
+    with tempfile.TemporaryDirectory(prefix="ooc-", dir=workdir) as tmp:
+        mm = {}
+        for part in ("train", "test"):
+            mm[part] = {
+                "X": np.lib.format.open_memmap(os.path.join(tmp, f"X_{part}.npy"), mode="w+",
+                                               dtype=np.float32, shape=(n_total, n_cols)),
+                "y": np.lib.format.open_memmap(os.path.join(tmp, f"y_{part}.npy"), mode="w+",
+                                               dtype=np.float64, shape=(n_total,)),
+                "platform": np.lib.format.open_memmap(os.path.join(tmp, f"platform_{part}.npy"), mode="w+",
+                                                      dtype=np.int16, shape=(n_total,)),
+            }
+        filled = {"train": 0, "test": 0}
+        read_cols = [c for c in required_cols if c not in HISTORY_FEATURES] + cat_cols
+        read_cols += ["posted_at", "hour", "platform", "media_type"] if feature_store is not None else []
+        for chunk in iter_processed(processed_path, columns=list(dict.fromkeys(read_cols)), batch_size=batch_rows):
+            if feature_store is not None:
+                chunk = add_history_features(chunk, feature_store)
+            chunk = chunk.dropna(subset=required_cols)
+            if chunk.empty:
+                continue
+            arrays = {"X": build_matrix(chunk, schema), "y": chunk["engagement_rate"].to_numpy(dtype=float),
+                      "platform": _platform_codes(chunk, platforms)}
+            is_test = rng.random(len(chunk)) < TEST_FRACTION
+            for part, mask in (("train", ~is_test), ("test", is_test)):
+                lo = filled[part]
+                filled[part] = lo + int(mask.sum())
+                for key, values in arrays.items():
+                    mm[part][key][lo:filled[part]] = values[mask]
+
+        n_train, n_test = filled["train"], filled["test"]
+        if n_train == 0:
+            raise ValueError("No data available after dropping NaNs from target/features")
+        X_train, y_train = mm["train"]["X"][:n_train], mm["train"]["y"][:n_train]
+        X_test, y_test = mm["test"]["X"][:n_test], mm["test"]["y"][:n_test]
+        if n_test == 0:
+            log.warning("⚠️ Too few rows for a holdout split; evaluating on the training rows")
+            X_test, y_test = X_train, y_train
+        log.info(f"🗄️ Encoded {n_train + n_test} rows into memory-mapped matrices ({n_cols} features) in {tmp}")
+
+        # --- Pick hyperparameters ---
+        params = dict(DEFAULT_PARAMS)
+        search_out = None
+        if search is not None:
+            results = search_hyperparameters(X_train, y_train, **search)
+            params = results["best_params"]
+            search_out = save_search_results(results, search_path_for(model_out))
+
+        # --- Train model ---
+        t0 = time.perf_counter()
+        if fit_mode == "mmap":
+            model = RandomForestRegressor(**params, random_state=42, n_jobs=-1)
+            model.fit(X_train, y_train)
+        else:
+            model = _fit_chunked(X_train, y_train, params, chunk_rows)
+        fit_s = time.perf_counter() - t0
+
+        # --- Evaluate model ---
+        pred_test = _predict_batched(model, X_test, batch_rows)
+        rmse_test = float(np.sqrt(mean_squared_error(y_test, pred_test)))
+        latency_ms = _single_row_latency_ms(model, np.asarray(X_test[:1]))
+
+        # --- Actual/predicted pairs for the dashboard summary (a few bytes per row) ---
+        y_true = np.concatenate([y_train, mm["test"]["y"][:n_test]])
+        y_pred = np.concatenate([_predict_batched(model, X_train, batch_rows), pred_test[:n_test]])
+        codes = np.concatenate([mm["train"]["platform"][:n_train], mm["test"]["platform"][:n_test]])
+        del mm, X_train, y_train, X_test, y_test  # close the memmaps before the directory is removed
+
+    # --- Save model ---
+    model_out.parent.mkdir(parents=True, exist_ok=True)
+    save_joblib(model, str(model_out))
+    clear_prediction_cache(model_out)  # cached predictions belong to the replaced model
+    save_feature_schema(schema, schema_out)
+    store_out = feature_store.save(store_path_for(model_out)) if feature_store is not None else None
+    compiled_out = compiled_path_for(model_out)
+    try:
+        save_compiled_forest(model, compiled_out, feature_names(schema))
+    except Exception as e:
+        log.warning(f"Failed to export compiled forest {compiled_out}: {e}")
+
+    # --- Precompute per-platform evaluation for the dashboard ---
+    try:
+        save_platform_summary(summary_from_codes(y_true, y_pred, codes, platforms or []), summary_out)
+    except Exception as e:
+        log.warning(f"Failed to write platform summary {summary_out}: {e}")
+
+    elapsed = time.perf_counter() - start
+    log.info(f"✅ Out-of-core model trained ({fit_mode}) — RMSE={rmse_test:.6f}, fit={fit_s:.1f}s, "
+             f"latency={latency_ms:.2f}ms, trees={len(model.estimators_)}, total={elapsed:.1f}s")
+    log.info(f"📁 Model saved at: {model_out}")
+
+    return {
+        "mode": "out_of_core",
+        "fit_mode": fit_mode,
+        "rmse_cv": float("nan"),
+        "rmse_test": rmse_test,
+        "fit_s": fit_s,
+        "latency_ms": latency_ms,
+        "params": params,
+        "search": str(search_out) if search_out else None,
+        "model": str(model_out),
+        "compiled_model": str(compiled_out),
+        "processed": processed_path,
+        "summary": str(summary_out),
+        "features_used": feature_names(schema),
+        "schema": str(schema_out),
+        "feature_store": str(store_out) if store_out else None,
+        "n_train": n_train,
+        "n_test": n_test,
+        "n_trees": len(model.estimators_),
+        "wall_time_s": elapsed,
+    }
+
+
+# ---------------------------------------------------------
+# HYPERPARAMETER SEARCH — successive halving over a process pool
+# ---------------------------------------------------------
+SEARCH_SPACE = {
+    "n_estimators": [50, 100, 200, 400],
+    "max_depth": [6, 10, 16, None],
+    "min_samples_leaf": [1, 2, 5, 10],
+    "max_features": [1.0, 0.5, "sqrt"],
+}
+LATENCY_REPEATS = 20
+_search_data: Dict[str, np.ndarray] = {}
+
+
+def _init_search_worker(x_path: str, y: np.ndarray):
+    """Each worker memory-maps the shared feature matrix once instead of receiving it per task."""
+    _search_data["X"] = np.load(x_path, mmap_mode="r")
+    _search_data["y"] = y
+
+
+def _evaluate_candidate(params: Dict[str, Any], folds) -> Dict[str, float]:
+    """
+    Cross-validated RMSE (pooled over folds) plus mean fit time, batch predict cost per row
+    and median single-row predict latency (the serving case) of the last fold's model.
+    """
+    X, y = _search_data["X"], _search_data["y"]
+    sq_err, n_val, fit_s, predict_s = 0.0, 0, 0.0, 0.0
+    for train_idx, val_idx in folds:
+        model = RandomForestRegressor(**params, random_state=42, n_jobs=1)
+        t0 = time.perf_counter()
+        model.fit(X[train_idx], y[train_idx])
+        t1 = time.perf_counter()
+        pred = model.predict(X[val_idx])
+        predict_s += time.perf_counter() - t1
+        fit_s += t1 - t0
+        sq_err += float(((pred - y[val_idx]) ** 2).sum())
+        n_val += len(val_idx)
+
+    return {
+        "rmse": math.sqrt(sq_err / n_val),
+        "fit_s": fit_s / len(folds),
+        "predict_us_per_row": predict_s / n_val * 1e6,
+        "latency_ms": _single_row_latency_ms(model, np.asarray(X[val_idx[:1]])),
+    }
+
+
+def _single_row_latency_ms(model, row: np.ndarray) -> float:
+    """Median wall time of LATENCY_REPEATS single-row predictions (the serving case)."""
+    timings = []
+    for _ in range(LATENCY_REPEATS):
+        t0 = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - t0)
+    return float(np.median(timings)) * 1000
+
+
+def _candidates(n_candidates: int, seed: int) -> List[Dict[str, Any]]:
+    """DEFAULT_PARAMS first (the baseline to beat), then distinct random draws from SEARCH_SPACE."""
+    out = [dict(DEFAULT_PARAMS)]
+    for params in ParameterSampler(SEARCH_SPACE, n_iter=n_candidates, random_state=seed):
+        if params not in out and len(out) < n_candidates:
+            out.append(params)
+    return out
+
+
+def search_hyperparameters(X: np.ndarray, y: np.ndarray, n_candidates: int = 24, factor: int = 3,
+                           min_rows: int = 500, cv: int = 3, workers: Optional[int] = None,
+                           latency_budget_ms: Optional[float] = None, seed: int = 42) -> Dict[str, Any]:
+    """
+    Successive halving: every candidate is cross-validated on a small row subset, the best
+    1/`factor` survive to a `factor`-times larger subset, until one candidate is left or the
+    full data is used. Candidates are scored in a process pool; the feature matrix is written
+    once to a memory-mapped .npy shared by the workers and fold splits are computed once per
+    rung. Candidates whose single-row latency exceeds `latency_budget_ms` rank behind every
+    candidate within budget.
+    """
+    n = len(X)
+    candidates = _candidates(n_candidates, seed)
+    n_rungs = max(1, math.ceil(math.log(len(candidates), factor)) + 1) if len(candidates) > 1 else 1
+    rows = max(min(min_rows, n), n // factor ** (n_rungs - 1))
+    order = np.random.default_rng(seed).permutation(n)  # subsets are prefixes of one shuffle
+    workers = workers or os.cpu_count() or 1
+    over_budget = lambda r: latency_budget_ms is not None and r["latency_ms"] > latency_budget_ms
+
+    start = time.perf_counter()
+    history: List[Dict[str, Any]] = []
+    alive = list(range(len(candidates)))
+    with tempfile.TemporaryDirectory(prefix="hpsearch-") as tmp:
+        x_path = os.path.join(tmp, "X.npy")
+        np.save(x_path, np.ascontiguousarray(X, dtype=np.float32))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_search_worker,
+                                 initargs=(x_path, np.asarray(y))) as pool:
+            rung = 0
+            while True:
+                rows = min(rows, n)
+                subset = order[:rows]
+                folds = [(subset[tr], subset[va]) for tr, va in KFold(cv).split(subset)]
+                futures = {i: pool.submit(_evaluate_candidate, candidates[i], folds) for i in alive}
+                results = []
+                for i, fut in futures.items():
+                    res = dict(fut.result(), candidate=i, rung=rung, rows=rows, params=candidates[i])
+                    res["within_budget"] = not over_budget(res)
+                    results.append(res)
+                history.extend(results)
+                results.sort(key=lambda r: (over_budget(r), r["rmse"]))
+                best = results[0]
+                log.info(f"🔎 Rung {rung}: {len(results)} candidates on {rows} rows — best RMSE={best['rmse']:.6f} "
+                         f"latency={best['latency_ms']:.2f}ms {best['params']}")
+                if len(results) == 1 or rows >= n:
+                    break
+                alive = [r["candidate"] for r in results[:max(1, len(results) // factor)]]
+                rung += 1
+                rows = n if rung >= n_rungs - 1 else rows * factor  # last rung always sees all rows
+
+    if not best["within_budget"]:
+        log.warning(f"⚠️ No candidate meets the {latency_budget_ms}ms latency budget; using the most accurate one")
+    elapsed = time.perf_counter() - start
+    log.info(f"🏁 Search finished in {elapsed:.1f}s ({len(history)} evaluations): {best['params']}")
+    return {
+        "best_params": best["params"],
+        "best": best,
+        "latency_budget_ms": latency_budget_ms,
+        "n_candidates": len(candidates),
+        "factor": factor,
+        "cv": cv,
+        "wall_time_s": elapsed,
+        "history": history,
+    }
+
+
+def search_path_for(model_path: str | Path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + ".search.json")
+
+
+def save_search_results(results: Dict[str, Any], path: str | Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, default=str), encoding="utf-8")
+    log.info(f"🔎 Search results saved at: {path}")
+    return path
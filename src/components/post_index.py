@@ -0,0 +1,198 @@
+# src/components/post_index.py
+from __future__ import annotations
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.components.data_transformation import parse_posted_at
+from src.components.model_evaluation import ALL_PLATFORMS
+from src.logger import get_logger
+
+log = get_logger(__name__)
+
+# metrics with a sorted index per partition; posted_at is indexed as epoch seconds
+SORT_KEYS = ["engagement_rate", "predicted_er"]
+TIME_KEY = "posted_at"
+# columns kept for the result table (whichever the dataset has)
+DISPLAY_COLUMNS = ["post_id", "platform", "media_type", "posted_at", "followers", "likes", "comments",
+                   "shares", "engagement_rate", "predicted_er"]
+SCORE_BATCH_ROWS = 250_000
+
+
+def _epoch_seconds(posted_at: pd.Series) -> np.ndarray:
+    """Seconds since the epoch as float (NaN for missing timestamps, which sort last)."""
+    values = parse_posted_at(posted_at).to_numpy(dtype="datetime64[s]")
+    seconds = values.astype(np.int64).astype(np.float64)
+    seconds[np.isnat(values)] = np.nan
+    return seconds
+
+
+def _bound(value) -> Optional[float]:
+    """A time bound (date, string or Timestamp) as epoch seconds; None stays open."""
+    if value is None:
+        return None
+    return float(pd.Timestamp(value).to_datetime64().astype("datetime64[s]").astype(np.int64))
+
+
+class PostIndex:
+    """
+    Read-only index over scored posts for top-K and range queries.
+
+    Rows are stored grouped by platform, so each platform is a contiguous slice and
+    "All" is the whole table. For every slice and every key in SORT_KEYS (plus posted_at)
+    it holds the row order sorted ascending by that key, the sorted values, and each
+    row's rank in that order. A value range is two binary searches into the sorted
+    values; a top-K without other filters is the tail of the order; a top-K that also
+    filters on time uses argpartition over ranks, which are unique, so ties always break
+    the same way as the full sort (by row position).
+    """
+
+    def __init__(self, rows: pd.DataFrame, values: Dict[str, np.ndarray], slices: Dict[str, tuple]):
+        self.rows = rows
+        self.values = values
+        self.slices = slices
+        self.keys = [k for k in SORT_KEYS + [TIME_KEY] if k in values]
+        self._order: Dict[tuple, np.ndarray] = {}
+        self._sorted: Dict[tuple, np.ndarray] = {}
+        self._rank: Dict[tuple, np.ndarray] = {}
+        for name, (start, stop) in slices.items():
+            for key in self.keys:
+                part = values[key][start:stop]
+                order = np.argsort(part, kind="stable").astype(np.int32)
+                rank = np.empty(len(order), dtype=np.int32)
+                rank[order] = np.arange(len(order), dtype=np.int32)
+                self._order[name, key], self._sorted[name, key], self._rank[name, key] = order, part[order], rank
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, predictions: Optional[np.ndarray] = None) -> "PostIndex":
+        """Index a processed frame (engagement_rate, platform, posted_at, ...) and optional model predictions."""
+        start = time.perf_counter()
+        df = df.reset_index(drop=True)
+        if predictions is not None:
+            df["predicted_er"] = np.asarray(predictions, dtype=float)
+        platform = (df["platform"].astype(str).str.strip().str.lower() if "platform" in df.columns
+                    else pd.Series(["unknown"] * len(df)))
+        codes, names = pd.factorize(platform, sort=True)
+        grouped = np.argsort(codes, kind="stable")
+        rows = df.iloc[grouped].reset_index(drop=True)
+        rows["platform"] = platform.to_numpy()[grouped]
+
+        values = {key: pd.to_numeric(rows[key], errors="coerce").to_numpy(dtype=float)
+                  for key in SORT_KEYS if key in rows.columns}
+        if TIME_KEY in rows.columns:
+            values[TIME_KEY] = _epoch_seconds(rows[TIME_KEY])
+        bounds = np.searchsorted(codes[grouped], np.arange(len(names) + 1))
+        slices = {ALL_PLATFORMS: (0, len(rows))}
+        slices.update({name: (int(bounds[i]), int(bounds[i + 1])) for i, name in enumerate(names)})
+
+        index = cls(rows[[c for c in DISPLAY_COLUMNS if c in rows.columns]], values, slices)
+        log.info(f"🗂️ Post index built: {len(rows)} rows, {len(names)} platforms, keys={index.keys} "
+                 f"in {time.perf_counter() - start:.2f}s")
+        return index
+
+    @property
+    def platforms(self) -> List[str]:
+        return [name for name in self.slices if name != ALL_PLATFORMS]
+
+    def _range(self, name: str, key: str, lo, hi, include_hi: bool = True) -> tuple:
+        """[a, b) positions in the sorted order of `key` with lo <= value <= hi (< hi unless include_hi; NaN never matches)."""
+        sorted_values = self._sorted[name, key]
+        a = 0 if lo is None else int(np.searchsorted(sorted_values, lo, side="left"))
+        if hi is None:
+            b = len(sorted_values) - int(np.isnan(sorted_values).sum())
+        else:
+            b = int(np.searchsorted(sorted_values, hi, side="right" if include_hi else "left"))
+        return a, max(a, b)
+
+    def query(self, platform: str = ALL_PLATFORMS, key: str = "predicted_er", lo: float = None, hi: float = None,
+              start=None, end=None, k: int = None, descending: bool = True) -> np.ndarray:
+        """
+        Row positions (into `rows`) with lo <= key <= hi and start <= posted_at < end on one
+        platform (or "All"), ordered by `key` (descending by default), at most `k` of them.
+        """
+        if key not in self.values:
+            raise ValueError(f"Unknown sort key {key!r}; indexed keys are {self.keys}")
+        if platform not in self.slices:
+            return np.zeros(0, dtype=np.int64)
+        offset = self.slices[platform][0]
+        a, b = self._range(platform, key, lo, hi)
+        by_time = (start is not None or end is not None) and TIME_KEY in self.values
+
+        if not by_time:
+            # already in key order: a slice of the pre-sorted positions
+            if k is not None:
+                a, b = (max(a, b - k), b) if descending else (a, min(b, a + k))
+            ranks = np.arange(a, b)
+        else:
+            ta, tb = self._range(platform, TIME_KEY, _bound(start), _bound(end), include_hi=False)
+            # filter whichever candidate set is smaller, then rank the survivors by `key`
+            if tb - ta < b - a:
+                ranks = self._rank[platform, key][self._order[platform, TIME_KEY][ta:tb]]
+                ranks = ranks[(ranks >= a) & (ranks < b)]
+            else:
+                t = self._rank[platform, TIME_KEY][self._order[platform, key][a:b]]
+                ranks = np.arange(a, b)[(t >= ta) & (t < tb)]
+            if k is not None and k < len(ranks):
+                ranks = ranks[np.argpartition(-ranks if descending else ranks, k - 1)[:k]]
+            ranks = np.sort(ranks)
+
+        if descending:
+            ranks = ranks[::-1]
+        return offset + self._order[platform, key][ranks].astype(np.int64)
+
+    def top_k(self, k: int, platform: str = ALL_PLATFORMS, key: str = "predicted_er", **filters) -> pd.DataFrame:
+        """The `k` posts with the highest `key`, e.g. top_k(50, "tiktok", start="2024-03-01", end="2024-04-01")."""
+        return self.frame(self.query(platform, key, k=k, **filters))
+
+    def between(self, lo: float, hi: float, platform: str = ALL_PLATFORMS, key: str = "engagement_rate",
+                **filters) -> pd.DataFrame:
+        """Posts with lo <= key <= hi, highest first, e.g. between(0.02, 0.05)."""
+        return self.frame(self.query(platform, key, lo=lo, hi=hi, **filters))
+
+    def frame(self, positions: np.ndarray) -> pd.DataFrame:
+        return self.rows.iloc[positions]
+
+
+def page(positions: np.ndarray, number: int, size: int) -> np.ndarray:
+    """Positions of 1-based page `number` of `size` rows."""
+    start = max(0, (int(number) - 1) * int(size))
+    return positions[start:start + int(size)]
+
+
+def score_processed(processed_path: str | Path, model, schema: Dict[str, Any],
+                    batch_rows: int = SCORE_BATCH_ROWS) -> pd.DataFrame:
+    """
+    The display columns of the processed dataset plus `predicted_er`, scored batch by
+    batch so only the feature matrix of one batch is in memory at a time.
+    """
+    from src.Utils import iter_processed, processed_columns
+    from src.components.feature_schema import as_model_input, build_matrix, source_columns
+
+    available = processed_columns(str(processed_path))
+    wanted = [c for c in dict.fromkeys(source_columns(schema) + DISPLAY_COLUMNS) if c in available]
+    frames = []
+    for batch in iter_processed(str(processed_path), columns=wanted, batch_size=batch_rows):
+        pred = model.predict(as_model_input(model, build_matrix(batch, schema), schema))
+        batch = batch[[c for c in DISPLAY_COLUMNS if c in batch.columns]].copy()
+        batch["predicted_er"] = np.asarray(pred, dtype=float)
+        frames.append(batch)
+    if not frames:
+        return pd.DataFrame(columns=[c for c in DISPLAY_COLUMNS if c in available] + ["predicted_er"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_post_index(processed_path: str | Path, model_path: str | Path = None) -> PostIndex:
+    """Index of the processed dataset, scored with the model at `model_path` when given."""
+    from src.Utils import cached_artifact, processed_columns, read_processed
+    from src.components.feature_schema import resolve_schema
+    from src.components.forest_compiler import load_predictor
+
+    if model_path is not None and Path(model_path).exists():
+        model = cached_artifact(str(model_path), load_predictor)
+        schema = cached_artifact(str(model_path), resolve_schema, name="feature_schema")
+        return PostIndex.build(score_processed(processed_path, model, schema))
+    available = processed_columns(str(processed_path))
+    return PostIndex.build(read_processed(str(processed_path), columns=[c for c in DISPLAY_COLUMNS if c in available]))
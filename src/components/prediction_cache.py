@@ -0,0 +1,226 @@
+# src/components/prediction_cache.py
+from __future__ import annotations
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional
+
+import numpy as np
+
+from src.logger import get_logger
+
+log = get_logger(__name__)
+
+CACHE_SUFFIX = ".predictions.sqlite"
+DEFAULT_MAX_ITEMS = 200_000  # in-memory tier (LRU)
+DEFAULT_MAX_ROWS = 5_000_000  # on-disk tier (oldest first)
+DEFAULT_TTL_S = 7 * 24 * 3600
+CACHE_MODES = ("off", "memory", "disk")
+# the disk tier is trimmed to this share of max_rows at once, so eviction scans stay rare
+EVICT_TO = 0.9
+_SQL_CHUNK = 500  # keys per IN (...) lookup, under SQLite's bound-parameter limit
+_HASH_BLOCK = 32_768
+# two independent 64-bit row hashes make the 128-bit key
+_SEEDS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F))
+_PRIME = np.uint64(0x100000001B3)
+
+
+def _fmix(h: np.ndarray) -> np.ndarray:
+    """64-bit finalizer (MurmurHash3) so every input bit affects every output bit."""
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xFF51AFD7ED558CCD)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xC4CEB9FE1A85EC53)
+    h ^= h >> np.uint64(33)
+    return h
+
+
+def feature_keys(X: np.ndarray, version: str = "") -> np.ndarray:
+    """
+    (n, 2) uint64 key per row of a schema-ordered feature matrix, seeded with the model
+    version so keys of different models never meet. Rows are normalized first (float32,
+    -0.0 -> 0.0, one NaN bit pattern), so equal feature vectors always share a key.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    salt = np.uint64(int.from_bytes(hashlib.blake2b(version.encode(), digest_size=8).digest(), "little"))
+    keys = np.empty((len(X), 2), dtype=np.uint64)
+    # blocks small enough for the per-column passes to stay in CPU cache
+    for start in range(0, len(X), _HASH_BLOCK):
+        keys[start:start + _HASH_BLOCK] = _block_keys(X[start:start + _HASH_BLOCK], salt)
+    return keys
+
+
+def _block_keys(X: np.ndarray, salt: np.uint64) -> np.ndarray:
+    X = X + np.float32(0)
+    X[np.isnan(X)] = np.nan
+    if X.shape[1] % 2:
+        X = np.hstack([X, np.zeros((len(X), 1), dtype=np.float32)])
+    columns = np.ascontiguousarray(X.view(np.uint64).T)  # pairs of features as 64-bit words
+    keys = np.empty((len(X), 2), dtype=np.uint64)
+    shifted = np.empty(len(X), dtype=np.uint64)
+    for j, seed in enumerate(_SEEDS):
+        h = np.full(len(X), seed ^ salt, dtype=np.uint64)
+        for column in columns:
+            h ^= column
+            h *= _PRIME
+            np.right_shift(h, np.uint64(29), out=shifted)
+            h ^= shifted
+        keys[:, j] = _fmix(h)
+    return keys
+
+
+def model_version(model_path: str | Path) -> str:
+    """Content hash of the model artifact; a retrained model gets a new version."""
+    from src.Utils import file_fingerprint
+
+    return file_fingerprint(str(model_path))[-1]
+
+
+def prediction_cache_path_for(model_path: str | Path) -> Path:
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + CACHE_SUFFIX)
+
+
+class PredictionCache:
+    """
+    Two-tier cache of model predictions keyed by feature_keys() of the input row under
+    one model version.
+
+    The memory tier is an LRU of at most `max_items` entries. The optional disk tier is a
+    SQLite table next to the model, shared across runs and processes (WAL mode); the
+    first key word is its integer primary key and the second is checked on read. It is
+    trimmed oldest-first once it exceeds `max_rows`. Entries older than `ttl` seconds are
+    ignored in both tiers; the disk tier is emptied when it was written by another version.
+    """
+
+    def __init__(self, version: str, disk_path: str | Path | None = None, max_items: int = DEFAULT_MAX_ITEMS,
+                 max_rows: int = DEFAULT_MAX_ROWS, ttl: float = DEFAULT_TTL_S):
+        self.version = version
+        self.max_items = max_items
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.hits = self.misses = 0
+        self._memory: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path is not None:
+            self._db = self._open(Path(disk_path))
+
+    def _open(self, path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), timeout=30, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        db.execute("CREATE TABLE IF NOT EXISTS predictions (key INTEGER PRIMARY KEY, key2 INTEGER NOT NULL, "
+                   "value REAL NOT NULL, created REAL NOT NULL)")
+        row = db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if row is None or row[0] != self.version:
+            dropped = db.execute("DELETE FROM predictions").rowcount
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+        else:
+            dropped = db.execute("DELETE FROM predictions WHERE created < ?", (time.time() - self.ttl,)).rowcount
+        self._rows = db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        log.info(f"🗄️ Prediction cache opened: {path} ({self._rows:,} rows, {dropped:,} stale dropped)")
+        return db
+
+    def get_many(self, keys: np.ndarray) -> tuple:
+        """(values, hit mask) for feature_keys() rows; values of misses are NaN."""
+        now = time.time()
+        k1, k2 = keys[:, 0].view(np.int64).tolist(), keys[:, 1].view(np.int64).tolist()
+        values = np.full(len(keys), np.nan)
+        hit = np.zeros(len(keys), dtype=bool)
+        with self._lock:
+            for i, key in enumerate(k1):
+                entry = self._memory.get(key)
+                if entry is not None and entry[0] == k2[i] and now - entry[2] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    values[i], hit[i] = entry[1], True
+            if self._db is not None and not hit.all():
+                missing: Dict[int, list] = {}
+                for i in np.flatnonzero(~hit).tolist():
+                    missing.setdefault(k1[i], []).append(i)
+                pending = list(missing)
+                for start in range(0, len(pending), _SQL_CHUNK):
+                    chunk = pending[start:start + _SQL_CHUNK]
+                    rows = self._db.execute(
+                        f"SELECT key, key2, value, created FROM predictions WHERE created >= ? "
+                        f"AND key IN ({','.join('?' * len(chunk))})", [now - self.ttl, *chunk]).fetchall()
+                    for key, key2, value, created in rows:
+                        for i in missing[key]:
+                            if k2[i] == key2:
+                                values[i], hit[i] = value, True
+                        self._remember(key, key2, value, created)
+            self.hits += int(hit.sum())
+            self.misses += int(len(keys) - hit.sum())
+        return values, hit
+
+    def _remember(self, key: int, key2: int, value: float, created: float):
+        self._memory[key] = (key2, value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def put_many(self, keys: np.ndarray, values: np.ndarray):
+        now = time.time()
+        rows = list(zip(keys[:, 0].view(np.int64).tolist(), keys[:, 1].view(np.int64).tolist(),
+                        np.asarray(values, dtype=float).tolist(), [now] * len(keys)))
+        with self._lock:
+            for key, key2, value, created in rows:
+                self._remember(key, key2, value, created)
+            if self._db is not None and rows:
+                before = self._db.total_changes
+                self._db.execute("BEGIN")
+                # rows another process stored meanwhile are kept (same key, same model, same value)
+                self._db.executemany("INSERT OR IGNORE INTO predictions VALUES (?, ?, ?, ?)", rows)
+                self._db.execute("COMMIT")
+                self._rows += self._db.total_changes - before
+                if self._rows > self.max_rows:
+                    self._rows -= self._db.execute(
+                        "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY created LIMIT ?)",
+                        (self._rows - int(self.max_rows * EVICT_TO),)).rowcount
+
+    def predict(self, predict_fn: Callable[[np.ndarray], np.ndarray], X: np.ndarray) -> np.ndarray:
+        """predict_fn(X) with cached rows looked up and only the misses scored."""
+        keys = feature_keys(X, self.version)
+        values, hit = self.get_many(keys)
+        miss = np.flatnonzero(~hit)
+        if len(miss):
+            pred = np.asarray(predict_fn(X[miss]), dtype=float)
+            values[miss] = pred
+            self.put_many(keys[miss], pred)
+        return values
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "memory_items": len(self._memory)}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def open_prediction_cache(model_path: str | Path, mode: str = "disk", max_items: int = DEFAULT_MAX_ITEMS,
+                          ttl: float = DEFAULT_TTL_S) -> Optional[PredictionCache]:
+    """Cache for the model at `model_path` ('memory' = LRU only, 'disk' = LRU + SQLite); None when 'off'."""
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unknown prediction cache mode {mode!r}; expected one of {CACHE_MODES}")
+    if mode == "off":
+        return None
+    disk_path = prediction_cache_path_for(model_path) if mode == "disk" else None
+    return PredictionCache(model_version(model_path), disk_path, max_items=max_items, ttl=ttl)
+
+
+def clear_prediction_cache(model_path: str | Path):
+    """Remove the on-disk cache of a model that is being replaced (its WAL files too)."""
+    path = prediction_cache_path_for(model_path)
+    for p in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+        if p.exists():
+            p.unlink()
+            log.info(f"🧹 Removed stale prediction cache: {p}")
+
@@ -0,0 +1,281 @@
+# src/components/text_features.py
+from __future__ import annotations
+import atexit
+import re
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+
+if TYPE_CHECKING:  # scipy.sparse is imported where it is used, not at module import
+    from scipy import sparse
+
+log = get_logger(__name__)
+
+# dense caption/hashtag statistics (model feature candidates)
+TEXT_FEATURES = ["caption_length", "caption_tokens", "caption_avg_token_len", "hashtag_count", "emoji_count"]
+# hashed hashtag vocabulary: bounded no matter how many distinct tags appear, and small
+# enough to train on as dense count columns
+HASHTAG_BUCKETS = 16
+HASHTAG_BUCKET_FEATURES = [f"hashtag_bucket_{i:02d}" for i in range(HASHTAG_BUCKETS)]
+MAX_CACHE_ROWS = 1_000_000
+
+# Patterns use literal character classes only, so pandas' Arrow (RE2) string kernels and
+# Python's re (records fast path) agree; \w and \s differ between the two engines.
+_SPACE = " \t\n\r\f\v"
+TOKEN_RE = f"[^{_SPACE}]+"
+NONSPACE_RE = f"[^{_SPACE}]"
+HASHTAG_RE = f"#[^{_SPACE}#]+"
+EMOJI_RE = "[\U0001F1E6-\U0001F1FF\U0001F300-\U0001FAFF\u2600-\u27BF]"
+_TOKEN = re.compile(TOKEN_RE)
+_HASHTAG = re.compile(HASHTAG_RE)
+_EMOJI = re.compile(EMOJI_RE)
+
+
+def hashtag_bucket(tag: str) -> int:
+    """Stable bucket of a lower-cased hashtag (crc32, unlike hash(), is not salted per process)."""
+    return zlib.crc32(tag.lower().encode("utf-8")) % HASHTAG_BUCKETS
+
+
+def _text(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].fillna("").astype(str)
+
+
+def _compute(captions: pd.Series, hashtags: pd.Series) -> Tuple[np.ndarray, sparse.csr_matrix]:
+    """Vectorized stats (n x len(TEXT_FEATURES), float32) and the n x HASHTAG_BUCKETS count matrix."""
+    from scipy import sparse
+
+    n = len(captions)
+    chars = captions.str.len().to_numpy(dtype=np.float32)
+    tokens = captions.str.count(TOKEN_RE).to_numpy(dtype=np.float32)
+    token_chars = captions.str.count(NONSPACE_RE).to_numpy(dtype=np.float32)
+    avg_len = np.divide(token_chars, tokens, out=np.zeros(n, dtype=np.float32), where=tokens > 0)
+    tags = hashtags.str.findall(HASHTAG_RE)
+    tag_count = tags.str.len().to_numpy(dtype=np.float32)
+    emojis = (captions.str.count(EMOJI_RE) + hashtags.str.count(EMOJI_RE)).to_numpy(dtype=np.float32)
+    dense = np.column_stack([chars, tokens, avg_len, tag_count, emojis]).astype(np.float32)
+
+    # hash each distinct tag once, then scatter the counts into a sparse matrix
+    flat = tags.explode().dropna()
+    if flat.empty:
+        buckets = sparse.csr_matrix((n, HASHTAG_BUCKETS), dtype=np.float32)
+    else:
+        codes, uniques = pd.factorize(flat.to_numpy())
+        cols = np.array([hashtag_bucket(t) for t in uniques], dtype=np.int32)[codes]
+        rows = np.repeat(np.arange(n), tags.str.len().to_numpy())
+        buckets = sparse.csr_matrix((np.ones(len(cols), dtype=np.float32), (rows, cols)),
+                                    shape=(n, HASHTAG_BUCKETS))
+        buckets.sum_duplicates()
+    return dense, buckets
+
+
+def record_hashtag_buckets(hashtags) -> List[float]:
+    """Scalar equivalent of one row of the hashed hashtag counts, for the records fast path."""
+    counts = [0.0] * HASHTAG_BUCKETS
+    if hashtags is not None and hashtags == hashtags:
+        for tag in _HASHTAG.findall(str(hashtags)):
+            counts[hashtag_bucket(tag)] += 1.0
+    return counts
+
+
+def record_text_stats(caption, hashtags) -> List[float]:
+    """Scalar equivalent of one row of the dense stats, for the records fast path."""
+    caption = "" if caption is None or caption != caption else str(caption)
+    hashtags = "" if hashtags is None or hashtags != hashtags else str(hashtags)
+    words = _TOKEN.findall(caption)
+    token_chars = sum(len(w) for w in words)
+    return [float(len(caption)), float(len(words)), token_chars / len(words) if words else 0.0,
+            float(len(_HASHTAG.findall(hashtags))),
+            float(len(_EMOJI.findall(caption)) + len(_EMOJI.findall(hashtags)))]
+
+
+# ---------------------------------------------------------
+# ON-DISK CACHE — memoized per post_id (+ content hash)
+# ---------------------------------------------------------
+def _content_hash(captions: pd.Series, hashtags: pd.Series) -> np.ndarray:
+    """Row hash of the text, so a reused post_id with edited text is recomputed."""
+    frame = pd.DataFrame({"caption": captions.to_numpy(), "hashtags": hashtags.to_numpy()})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+_LOADED: Dict[str, tuple] = {}  # path -> (mtime_ns, arrays): chunked runs don't re-read the file
+# path -> rows computed since the last flush; lookups see them at once, the file is written
+# once per run by flush_text_cache (also at exit) instead of after every chunk
+_PENDING: Dict[str, List[Dict[str, np.ndarray]]] = {}
+_PENDING_LOCK = threading.Lock()
+
+
+def _read_cache(path: Path) -> Optional[Dict[str, np.ndarray]]:
+    try:
+        with np.load(path) as data:
+            arrays = {k: data[k] for k in data.files}
+    except Exception as e:
+        log.warning(f"⚠️ Ignoring unreadable text feature cache {path}: {e}")
+        return None
+    if int(arrays.get("n_buckets", -1)) != HASHTAG_BUCKETS:
+        log.warning(f"⚠️ Ignoring text feature cache {path} written with a different number of hashtag buckets")
+        return None
+    return arrays
+
+
+def _load_cache(path: Path) -> Optional[Dict[str, np.ndarray]]:
+    memo = _LOADED.get(str(path))
+    if memo is not None and str(path) in _PENDING:
+        return memo[1]  # holds rows not written yet; another writer's file is merged at flush
+    if not path.exists():
+        return None
+    mtime = path.stat().st_mtime_ns
+    if memo is not None and memo[0] == mtime:
+        return memo[1]
+    arrays = _read_cache(path)
+    if arrays is not None:
+        _LOADED[str(path)] = (mtime, arrays)
+    return arrays
+
+
+def _cache_arrays(post_ids, hashes, dense, buckets: sparse.csr_matrix) -> Dict[str, np.ndarray]:
+    return {"post_id": np.asarray(post_ids, dtype=str), "content_hash": np.asarray(hashes, dtype=np.uint64),
+            "dense": dense, "indptr": buckets.indptr, "indices": buckets.indices, "data": buckets.data,
+            "n_buckets": np.asarray(HASHTAG_BUCKETS)}
+
+
+def _cache_buckets(arrays: Dict[str, np.ndarray]) -> sparse.csr_matrix:
+    from scipy import sparse
+
+    return sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]),
+                             shape=(len(arrays["post_id"]), HASHTAG_BUCKETS))
+
+
+def _concat_cache(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Rows of several caches, later parts last, trimmed to the most recent MAX_CACHE_ROWS."""
+    from scipy import sparse
+
+    post_ids = np.concatenate([p["post_id"] for p in parts])
+    hashes = np.concatenate([p["content_hash"] for p in parts])
+    dense = np.vstack([p["dense"] for p in parts])
+    buckets = sparse.vstack([_cache_buckets(p) for p in parts], format="csr")
+    if len(post_ids) > MAX_CACHE_ROWS:
+        keep = slice(len(post_ids) - MAX_CACHE_ROWS, None)
+        post_ids, hashes, dense, buckets = post_ids[keep], hashes[keep], dense[keep], buckets[keep]
+    return _cache_arrays(post_ids, hashes, dense, buckets)
+
+
+def _add_to_cache(path: Path, base: Optional[Dict[str, np.ndarray]], new: Dict[str, np.ndarray]):
+    """Make `new` rows visible to lookups now and queue them for the next flush."""
+    memo = _LOADED.get(str(path))
+    merged = _concat_cache([base, new]) if base is not None else new
+    _LOADED[str(path)] = (memo[0] if memo is not None else None, merged)
+    with _PENDING_LOCK:
+        if not _PENDING:
+            atexit.register(flush_text_cache)
+        _PENDING.setdefault(str(path), []).append(new)
+
+
+def flush_text_cache(path: str | Path | None = None):
+    """
+    Write rows computed since the last flush to the on-disk cache (all caches without
+    `path`). The file is re-read first, so rows another process wrote meanwhile are kept;
+    it is written to a unique temp file and renamed over the old one.
+    """
+    with _PENDING_LOCK:
+        keys = [str(path)] if path is not None else list(_PENDING)
+        pending = {key: _PENDING.pop(key) for key in keys if key in _PENDING}
+    for key, parts in pending.items():
+        path = Path(key)
+        new = _concat_cache(parts)
+        on_disk = _read_cache(path) if path.exists() else None
+        if on_disk is not None:
+            known = pd.MultiIndex.from_arrays([on_disk["post_id"], on_disk["content_hash"]])
+            fresh = known.get_indexer(pd.MultiIndex.from_arrays([new["post_id"], new["content_hash"]])) < 0
+            new = _concat_cache([on_disk, _cache_arrays(new["post_id"][fresh], new["content_hash"][fresh],
+                                                         new["dense"][fresh], _cache_buckets(new)[fresh])])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".", suffix=".tmp",
+                                             delete=False) as fh:
+                tmp = Path(fh.name)
+                np.savez(fh, **new)
+            tmp.replace(path)
+            _LOADED[key] = (path.stat().st_mtime_ns, new)
+            log.info(f"💾 Text feature cache saved: {path} ({len(new['post_id'])} rows)")
+        except Exception as e:
+            log.warning(f"⚠️ Failed to update text feature cache {path}: {e}")
+            if tmp is not None and tmp.exists():
+                tmp.unlink()
+
+
+def text_features(df: pd.DataFrame, cache_path: str | Path | None = None) -> Tuple[np.ndarray, sparse.csr_matrix]:
+    """
+    Dense stats (TEXT_FEATURES order) and sparse hashed hashtag counts for every row.
+    With `cache_path` and a post_id column, rows already in the cache are not recomputed
+    and new rows are added to it.
+    """
+    from scipy import sparse
+
+    captions, hashtags = _text(df, "caption"), _text(df, "hashtags")
+    if cache_path is None or "post_id" not in df.columns or df.empty:
+        return _compute(captions, hashtags)
+
+    cache_path = Path(cache_path)
+    post_ids = df["post_id"].astype(str).to_numpy()
+    hashes = _content_hash(captions, hashtags)
+    cache = _load_cache(cache_path)
+
+    dense = np.empty((len(df), len(TEXT_FEATURES)), dtype=np.float32)
+    hit = np.zeros(len(df), dtype=bool)
+    if cache is not None:
+        cached_buckets = _cache_buckets(cache)
+        lookup = pd.MultiIndex.from_arrays([cache["post_id"], cache["content_hash"]])
+        idx = lookup.get_indexer(pd.MultiIndex.from_arrays([post_ids, hashes]))
+        hit = idx >= 0
+        dense[hit] = cache["dense"][idx[hit]]
+
+    miss = ~hit
+    if miss.any():
+        miss_dense, miss_buckets = _compute(captions[miss], hashtags[miss])
+        dense[miss] = miss_dense
+    if hit.all():
+        buckets = cached_buckets[idx]
+    else:
+        # assemble rows in input order from the cached and freshly computed parts
+        order = np.concatenate([np.flatnonzero(hit), np.flatnonzero(miss)])
+        parts = [cached_buckets[idx[hit]]] if hit.any() else []
+        stacked = sparse.vstack(parts + [miss_buckets], format="csr")
+        buckets = stacked[np.argsort(order)]
+
+        # queue the new rows (first occurrence of each key) for the cache
+        new_keys = pd.MultiIndex.from_arrays([post_ids[miss], hashes[miss]])
+        first = ~new_keys.duplicated()
+        _add_to_cache(cache_path, cache, _cache_arrays(post_ids[miss][first], hashes[miss][first],
+                                                       miss_dense[first], miss_buckets[np.flatnonzero(first)]))
+    log.info(f"🔤 Text features: {int(hit.sum())} cached, {int(miss.sum())} computed ({cache_path})")
+    return dense, buckets.tocsr()
+
+
+def add_text_features(df: pd.DataFrame, cache_path: str | Path | None = None) -> pd.DataFrame:
+    """
+    Add the dense TEXT_FEATURES and HASHTAG_BUCKET_FEATURES columns in place. Without
+    caption/hashtags columns (e.g. an already processed dataset) existing feature columns
+    are kept and missing ones set to 0.
+    """
+    if "caption" not in df.columns and "hashtags" not in df.columns:
+        for col in TEXT_FEATURES + HASHTAG_BUCKET_FEATURES:
+            if col not in df.columns:
+                df[col] = 0
+        return df
+    dense, buckets = text_features(df, cache_path)
+    for j, col in enumerate(TEXT_FEATURES):
+        if col == "caption_length" and col in df.columns:
+            continue  # an explicit caption_length wins over the derived one
+        df[col] = dense[:, j]
+    df[HASHTAG_BUCKET_FEATURES] = pd.DataFrame(buckets.toarray(), index=df.index, columns=HASHTAG_BUCKET_FEATURES)
+    return df
@@ -0,0 +1,144 @@
+# src/components/what_if.py
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.components.data_transformation import parse_posted_at
+from src.components.feature_schema import as_model_input, feature_names, records_matrix
+from src.components.feature_store import HISTORY_FEATURES, epoch_days
+from src.logger import get_logger
+
+log = get_logger(__name__)
+
+PLATFORMS = ["instagram", "twitter", "linkedin", "tiktok"]
+MEDIA_TYPES = ["image", "video", "carousel", "text", "reel"]
+HOURS = list(range(24))
+# sweep dimensions, in the axis order of the prediction array
+DIMENSIONS = ["platform", "media_type", "hour", "followers"]
+MAX_CACHED_SWEEPS = 64
+
+
+def follower_grid(low: int, high: int, steps: int) -> List[int]:
+    """Up to `steps` distinct log-spaced follower counts from `low` to `high`."""
+    low, high = max(1, int(low)), max(1, int(high))
+    if steps <= 1 or low == high:
+        return [low]
+    low, high = min(low, high), max(low, high)
+    return np.unique(np.geomspace(low, high, steps).round().astype(np.int64)).tolist()
+
+
+def sweep_matrix(base: Dict[str, Any], schema: Dict[str, Any], platforms: Sequence[str],
+                 media_types: Sequence[str], hours: Sequence[int], followers: Sequence[int],
+                 feature_store=None) -> np.ndarray:
+    """
+    Feature matrix of every platform x media_type x hour x followers combination of one post,
+    rows in C order of DIMENSIONS. The post is encoded once (records_matrix) and broadcast;
+    only the swept columns are overwritten. Values outside the schema vocabulary encode as
+    all-zero one-hots, like unseen categories elsewhere. History features (which depend on
+    platform, media type and hour) are looked up once per combination in `feature_store`.
+    """
+    names = feature_names(schema)
+    col = {name: j for j, name in enumerate(names)}
+    shape = (len(platforms), len(media_types), len(hours), len(followers))
+    X = np.broadcast_to(records_matrix([base], schema, feature_store)[0], shape + (len(names),)).copy()
+
+    for axis, (source, values) in enumerate([("platform", platforms), ("media_type", media_types)]):
+        onehots = [j for name, j in col.items() if name.startswith(source + "_")]
+        X[..., onehots] = 0
+        for i, value in enumerate(values):
+            j = col.get(f"{source}_{value}")
+            if j is not None:
+                X[(slice(None),) * axis + (i, Ellipsis, j)] = 1
+    if "hour" in col:
+        X[..., col["hour"]] = np.asarray(hours, dtype=np.float32)[None, None, :, None]
+    if "followers" in col:
+        X[..., col["followers"]] = np.asarray(followers, dtype=np.float32)[None, None, None, :]
+    history = [name for name in HISTORY_FEATURES if name in col]
+    if feature_store is not None and history:
+        p, m, h = (a.ravel() for a in np.meshgrid(platforms, media_types, hours, indexing="ij"))
+        day = _posted_day(base)
+        values = feature_store.lookup(p, m, h, np.full(len(h), np.nan if day is None else day)).astype(np.float32).reshape(shape[:3] + (-1,))
+        for name in history:
+            X[..., col[name]] = values[..., HISTORY_FEATURES.index(name)][..., None]
+    return X.reshape(-1, len(names))
+
+
+def _posted_day(base: Dict[str, Any]):
+    """Posting day (days since the epoch) of the base post, None without a parseable posted_at."""
+    if base.get("posted_at") is None:
+        return None
+    days = epoch_days(parse_posted_at(pd.Series([base["posted_at"]], dtype=object)))
+    return None if np.isnan(days[0]) else float(days[0])
+
+
+def run_sweep(model, schema: Dict[str, Any], base: Dict[str, Any], platforms: Sequence[str] = PLATFORMS,
+              media_types: Sequence[str] = MEDIA_TYPES, hours: Sequence[int] = HOURS,
+              followers: Sequence[int] = (1000,), feature_store=None) -> Dict[str, Any]:
+    """
+    Score the whole grid with a single model.predict call.
+    Returns {"pred": array shaped like DIMENSIONS, "axes": {dimension: values}, "seconds": ...}.
+    """
+    start = time.perf_counter()
+    axes = {"platform": list(platforms), "media_type": list(media_types),
+            "hour": [int(h) for h in hours], "followers": [int(f) for f in followers]}
+    X = sweep_matrix(base, schema, axes["platform"], axes["media_type"], axes["hour"], axes["followers"],
+                     feature_store)
+    pred = np.asarray(model.predict(as_model_input(model, X, schema)), dtype=float)
+    seconds = time.perf_counter() - start
+    log.info(f"🧪 What-if sweep: {len(X)} scenarios scored in {seconds * 1000:.1f}ms")
+    return {"pred": pred.reshape([len(axes[d]) for d in DIMENSIONS]), "axes": axes, "seconds": seconds}
+
+
+def sweep_grid(result: Dict[str, Any], rows: str, cols: str) -> np.ndarray:
+    """2-D (rows x cols) view of a sweep, averaging predictions over the other dimensions."""
+    if rows == cols:
+        raise ValueError("Heatmap rows and columns must be different dimensions")
+    r, c = DIMENSIONS.index(rows), DIMENSIONS.index(cols)
+    others = tuple(i for i in range(len(DIMENSIONS)) if i not in (r, c))
+    grid = result["pred"].mean(axis=others)
+    return grid if r < c else grid.T
+
+
+def best_scenario(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The swept combination with the highest predicted engagement rate."""
+    idx = np.unravel_index(int(np.argmax(result["pred"])), result["pred"].shape)
+    scenario = {d: result["axes"][d][i] for d, i in zip(DIMENSIONS, idx)}
+    scenario["engagement_rate"] = float(result["pred"][idx])
+    return scenario
+
+
+# ---------------------------------------------------------
+# RESULT CACHE — one entry per (model version, input tuple), LRU-bounded
+# ---------------------------------------------------------
+_SWEEPS: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_SWEEP_LOCK = threading.Lock()
+
+
+def cached_sweep(model_path: str | Path, model, schema: Dict[str, Any], base: Dict[str, Any],
+                 platforms: Sequence[str], media_types: Sequence[str], hours: Sequence[int],
+                 followers: Sequence[int], feature_store=None) -> Dict[str, Any]:
+    """
+    run_sweep memoized per input tuple; retraining the model (new file content, which also
+    rewrites its feature store) invalidates its entries. Callers must treat the result as read-only.
+    """
+    from src.Utils import file_fingerprint
+
+    key = (file_fingerprint(str(model_path))[-1], tuple(sorted(base.items())), tuple(platforms),
+           tuple(media_types), tuple(hours), tuple(followers))
+    with _SWEEP_LOCK:
+        if key in _SWEEPS:
+            _SWEEPS.move_to_end(key)
+            log.info("♻️ What-if sweep cache hit")
+            return _SWEEPS[key]
+    result = run_sweep(model, schema, base, platforms, media_types, hours, followers, feature_store)
+    with _SWEEP_LOCK:
+        _SWEEPS[key] = result
+        while len(_SWEEPS) > MAX_CACHED_SWEEPS:
+            _SWEEPS.popitem(last=False)
+    return result
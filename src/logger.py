@@ -1,18 +1,289 @@
+import atexit
+import functools
+import json
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import resource
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, TimedRotatingFileHandler
 from pathlib import Path
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 
+# created on first use, so importing this module touches no files
 LOG_DIR = Path(os.getcwd()) / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
 
 LOG_FILE = LOG_DIR / "app.log"
+METRICS_FILE = LOG_DIR / "metrics.jsonl"
+METRICS_LOGGER = "metrics"
+
+# ---------------------------------------------------------
+# SHARED HANDLERS — one bounded queue and one writer thread per process
+# ---------------------------------------------------------
+# Every logger gets the same handler, so logs/app.log is opened once and the calling
+# thread only enqueues records. A background writer drains the queue in batches and
+# flushes the file/console streams once per batch instead of once per record.
+# Settings come from the environment or configure_logging():
+#   LOG_ASYNC=0          write synchronously on the calling thread
+#   LOG_QUEUE_SIZE=10000 records buffered before the overflow policy applies
+#   LOG_OVERFLOW=drop    'drop' new records when full (counted) or 'block' the caller
+_SETTINGS = {
+    "async": os.environ.get("LOG_ASYNC", "1") != "0",
+    "queue_size": int(os.environ.get("LOG_QUEUE_SIZE", "10000")),
+    "overflow": os.environ.get("LOG_OVERFLOW", "drop"),
+    "batch_size": 256,
+}
+_STATS = {"dropped": 0, "written": 0, "batches": 0}
+_STATS_LOCK = threading.Lock()
+_HANDLER_LOCK = threading.Lock()
+_queue_handler = None
+_handlers = []
+_writer = None
+_SENTINEL = object()
+
+
+class _MetricsFilter(logging.Filter):
+    def __init__(self, metrics: bool):
+        super().__init__()
+        self.metrics = metrics
+
+    def filter(self, record):
+        return (record.name == METRICS_LOGGER) == self.metrics
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps(record.msg if isinstance(record.msg, dict) else {"message": record.getMessage()},
+                          default=str)
+
+
+class _BatchFlushMixin:
+    """Skip the per-record flush in emit(); the writer calls flush_batch() once per batch."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class _BatchedFileHandler(_BatchFlushMixin, TimedRotatingFileHandler):
+    pass
+
+
+class _BatchedStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+def _handle(record):
+    for handler in _handlers:
+        if record.levelno >= handler.level:
+            handler.handle(record)
+
+
+class _BackgroundWriter:
+    """Drains the bounded queue on a daemon thread, writing records in batches."""
+
+    def __init__(self, queue_size: int, overflow: str, batch_size: int):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, record):
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _STATS_LOCK:
+                _STATS["dropped"] += 1
+
+    def _run(self):
+        reported = _STATS["dropped"]
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [r for r in batch if r is not _SENTINEL]
+            try:
+                for record in records:
+                    _handle(record)
+                dropped = _STATS["dropped"]
+                if dropped > reported:  # surface drops in the log itself
+                    _handle(logging.makeLogRecord({
+                        "name": "logger", "levelno": logging.WARNING, "levelname": "WARNING",
+                        "msg": f"⚠️ {dropped - reported} log records dropped (queue full, total {dropped})"}))
+                    reported = dropped
+                for handler in _handlers:
+                    handler.flush_batch()
+            except Exception:
+                pass  # a failing handler must not kill the writer; handlers report their own errors
+            with _STATS_LOCK:
+                _STATS["written"] += len(records)
+                _STATS["batches"] += 1
+            for _ in batch:
+                self.queue.task_done()
+            if len(records) != len(batch):
+                return
+
+    def stop(self, timeout: float = 5.0):
+        """Write everything still queued, then end the thread."""
+        if self._thread.is_alive():
+            self.queue.put(_SENTINEL)  # queued behind pending records, so they are written first
+            self._thread.join(timeout)
+
+
+class _SharedHandler(QueueHandler):
+    def __init__(self):
+        super().__init__(None)
+
+    def prepare(self, record):
+        # keep metric dicts intact for the JSON-lines formatter (prepare() would stringify them)
+        if isinstance(record.msg, dict):
+            record = logging.makeLogRecord(record.__dict__)
+            record.exc_info = record.exc_text = None
+            return record
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        writer = _writer
+        if writer is not None:
+            writer.put(record)
+            return
+        with _HANDLER_LOCK:  # synchronous mode
+            _handle(record)
+            for handler in _handlers:
+                handler.flush_batch()
+        with _STATS_LOCK:
+            _STATS["written"] += 1
+
+
+def _start_writer():
+    """(Re)start the background writer according to _SETTINGS; callers hold _HANDLER_LOCK."""
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+    if _SETTINGS["async"]:
+        _writer = _BackgroundWriter(_SETTINGS["queue_size"], _SETTINGS["overflow"], _SETTINGS["batch_size"])
+
+
+def _stop_writer():
+    writer = _writer
+    if writer is not None:
+        writer.stop()
+
+
+def _shared_queue_handler() -> QueueHandler:
+    global _queue_handler
+    with _HANDLER_LOCK:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        formatter = logging.Formatter(
+            fmt="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+            datefmt="%d/%m/%Y %H:%M:%S"
+        )
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+        # File handler: rotates daily; opened by the writer thread on the first record (delay)
+        file_handler = _BatchedFileHandler(
+            str(LOG_FILE),
+            when="midnight",
+            interval=1,
+            backupCount=7,
+            encoding="utf-8",
+            delay=True
+        )
+        file_handler.setFormatter(formatter)
+        file_handler.addFilter(_MetricsFilter(False))
+
+        # Console handler
+        console_handler = _BatchedStreamHandler()
+        console_handler.setFormatter(formatter)
+        console_handler.addFilter(_MetricsFilter(False))
+
+        # Stage timings as JSON lines
+        metrics_handler = _BatchedFileHandler(
+            str(METRICS_FILE), when="midnight", interval=1, backupCount=7, encoding="utf-8", delay=True
+        )
+        metrics_handler.setFormatter(_JsonLinesFormatter())
+        metrics_handler.addFilter(_MetricsFilter(True))
+
+        _handlers[:] = [file_handler, console_handler, metrics_handler]
+        _start_writer()
+        atexit.register(_stop_writer)  # flushes the queue before the process exits
+        _queue_handler = _SharedHandler()
+
+    session = logging.getLogger("session")
+    session.setLevel(logging.INFO)
+    session.propagate = False
+    session.addHandler(_queue_handler)
+    session.info("─────────────────────────────────────────────")
+    session.info(f"🟢 APP SESSION STARTED — {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    session.info("─────────────────────────────────────────────")
+    return _queue_handler
+
+
+def _restart_writer_in_child():
+    """Forked workers (process pools) inherit the handler but not the writer thread."""
+    global _writer
+    if _writer is None:
+        return
+    _writer = None
+    _start_writer()
+    # multiprocessing workers skip atexit; its finalizers still run on a clean worker exit
+    from multiprocessing import util
+    util.Finalize(None, _stop_writer, exitpriority=10)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_writer_in_child)
+
+
+def configure_logging(async_mode: bool = None, queue_size: int = None, overflow: str = None,
+                      batch_size: int = None):
+    """
+    Change the writer settings (see above). Records already queued are written
+    before the new settings take effect.
+    """
+    if overflow is not None and overflow not in ("drop", "block"):
+        raise ValueError(f"overflow must be 'drop' or 'block', got {overflow!r}")
+    updates = {"async": async_mode, "queue_size": queue_size, "overflow": overflow, "batch_size": batch_size}
+    with _HANDLER_LOCK:
+        _SETTINGS.update({k: v for k, v in updates.items() if v is not None})
+        if _queue_handler is not None:
+            _start_writer()
+
+
+def flush_logs():
+    """Block until every queued record has been written and flushed."""
+    writer = _writer
+    if writer is not None:
+        writer.queue.join()
+
+
+def logging_stats() -> dict:
+    """Writer mode, queue depth and dropped/written record counters."""
+    writer = _writer
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    return {"mode": "async" if writer is not None else "sync", "overflow": _SETTINGS["overflow"],
+            "queue_size": _SETTINGS["queue_size"], "queued": writer.queue.qsize() if writer else 0, **stats}
+
 
 def get_logger(name: str = __name__) -> logging.Logger:
     """
-    Returns a daily rotating logger with consistent formatting.
-    Logs go to both console and file (logs/app.log).
+    Returns a logger writing through the process-wide handler: records go to console
+    and the daily rotating logs/app.log, written in batches by one background thread.
     Each Streamlit rerun will not duplicate handlers.
     """
     logger = logging.getLogger(name)
@@ -21,31 +292,158 @@ def get_logger(name: str = __name__) -> logging.Logger:
         return logger
 
     logger.setLevel(logging.INFO)
+    logger.addHandler(_shared_queue_handler())
+    logger._is_configured = True
+    return logger
 
-    formatter = logging.Formatter(
-        fmt="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-        datefmt="%d/%m/%Y %H:%M:%S"
-    )
-
-    # File handler: rotates daily
-    file_handler = TimedRotatingFileHandler(
-        str(LOG_FILE),
-        when="midnight",
-        interval=1,
-        backupCount=7,
-        encoding="utf-8"
-    )
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
-    logger._is_configured = True
-    logger.info("─────────────────────────────────────────────")
-    logger.info(f"🟢 APP SESSION STARTED — {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-    logger.info("─────────────────────────────────────────────")
+# ---------------------------------------------------------
+# STAGE TIMERS & LATENCY HISTOGRAMS
+# ---------------------------------------------------------
+# upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc), else the process peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram of stage durations (Prometheus style), thread-safe."""
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float, rows: int = 0):
+        i = next((k for k, b in enumerate(self.bounds) if ms <= b), len(self.bounds))
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.rows += rows or 0
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound below which a fraction `q` of observations fall."""
+        with self._lock:
+            target, seen = q * self.count, 0
+            for i, c in enumerate(self.counts):
+                seen += c
+                if self.count and seen >= target:
+                    return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, c in zip(list(self.bounds) + ["+Inf"], self.counts):
+                running += c
+                cumulative[str(bound)] = running
+            out = {"count": self.count, "sum_ms": round(self.total_ms, 3), "rows": self.rows, "buckets": cumulative}
+        out.update(p50_ms=self.quantile(0.5), p95_ms=self.quantile(0.95), p99_ms=self.quantile(0.99))
+        return out
+
 
+_HISTOGRAMS = {}
+_HIST_LOCK = threading.Lock()
+
+
+def histogram(stage: str) -> LatencyHistogram:
+    with _HIST_LOCK:
+        if stage not in _HISTOGRAMS:
+            _HISTOGRAMS[stage] = LatencyHistogram()
+        return _HISTOGRAMS[stage]
+
+
+class timed:
+    """
+    Times a stage as a context manager or decorator. Each run adds one JSON line to
+    logs/metrics.jsonl (duration, rows, RSS) and one observation to the stage histogram.
+
+        with timed("train.fit", rows=len(X)) as t:
+            ...
+            t.rows = n_rows  # may be set once known
+
+        @timed("predict.score_frame")
+        def score_frame(...): ...
+    """
+
+    def __init__(self, stage: str, rows: int = None, **fields):
+        self.stage = stage
+        self.rows = rows
+        self.fields = fields
+
+    def __enter__(self):
+        self.rss_before = rss_mb()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        rss = self.rss_after = rss_mb()
+        histogram(self.stage).observe(self.duration_ms, self.rows or 0)
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "stage": self.stage,
+            "duration_ms": round(self.duration_ms, 3),
+            "rows": self.rows,
+            "rss_mb": round(rss, 1),
+            "rss_delta_mb": round(rss - self.rss_before, 1),
+            "status": "ok" if exc_type is None else "error",
+            **self.fields,
+        }
+        _metrics_logger().info(record)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage, self.rows, **self.fields):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def _metrics_logger() -> logging.Logger:
+    logger = logging.getLogger(METRICS_LOGGER)
+    if not getattr(logger, "_is_configured", False):
+        logger.setLevel(logging.INFO)
+        logger.addHandler(_shared_queue_handler())
+        logger.propagate = False
+        logger._is_configured = True
     return logger
+
+
+def metrics_snapshot() -> dict:
+    """Per-stage histogram snapshots (count, sum, rows, cumulative buckets, p50/p95/p99)."""
+    with _HIST_LOCK:
+        stages = dict(_HISTOGRAMS)
+    return {stage: h.snapshot() for stage, h in sorted(stages.items())}
+
+
+def dump_metrics(path=None) -> Path:
+    """Write metrics_snapshot() as JSON (default: logs/metrics_snapshot.json)."""
+    path = Path(path) if path else LOG_DIR / "metrics_snapshot.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(metrics_snapshot(), indent=2), encoding="utf-8")
+    return path
+
+
+def export_prometheus(prefix: str = "stage_duration_ms") -> str:
+    """Histograms in the Prometheus text exposition format, for a /metrics endpoint."""
+    lines = [f"# TYPE {prefix} histogram"]
+    for stage, snap in metrics_snapshot().items():
+        for bound, c in snap["buckets"].items():
+            lines.append(f'{prefix}_bucket{{stage="{stage}",le="{bound}"}} {c}')
+        lines.append(f'{prefix}_sum{{stage="{stage}"}} {snap["sum_ms"]}')
+        lines.append(f'{prefix}_count{{stage="{stage}"}} {snap["count"]}')
+    return "\n".join(lines) + "\n"
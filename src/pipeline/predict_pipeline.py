@@ -1,26 +1,262 @@
-import argparse, pandas as pd
+import argparse, os, time, pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from src.Utils import load_joblib, write_parquet
-from src.components.data_transformation import coerce_and_engineer, get_feature_sets
-from src.logger import get_logger
+from src.components.data_ingestion import TEXT_CACHE, iter_csv_chunks, load_csv
+from src.components.data_transformation import coerce_and_engineer
+from src.components.feature_schema import as_model_input, build_matrix, resolve_schema
+from src.components.feature_store import load_store_for
+from src.components.forest_compiler import ENGINES, load_predictor
+from src.components.prediction_cache import (
+    CACHE_MODES, DEFAULT_MAX_ITEMS, DEFAULT_TTL_S, open_prediction_cache,
+)
+from src.components.text_features import flush_text_cache
+from src.logger import dump_metrics, get_logger, timed
 
 log = get_logger(__name__)
 
+DEFAULT_CHUNKSIZE = 50_000
+
+# popularity label thresholds on engagement rate (2% and 5%)
+T_LOW = 0.02
+T_HIGH = 0.05
+
+
+def popularity_label(er: float) -> str:
+    return "LOW" if er < T_LOW else ("MEDIUM" if er < T_HIGH else "HIGH")
+
+
+def score_frame(df: pd.DataFrame, model, schema, text_cache=None, feature_store=None, cache=None) -> pd.DataFrame:
+    """
+    Engineer features, build the schema-ordered matrix and append engagement_rate_pred.
+    With a prediction cache only rows whose feature vector is not cached reach the model.
+    """
+    with timed('predict.engineer', rows=len(df)):
+        df_fe = coerce_and_engineer(df, text_cache=text_cache, feature_store=feature_store)
+    with timed('predict.encode', rows=len(df)):
+        X = build_matrix(df_fe, schema)
+    with timed('predict.model', rows=len(df)):
+        predict = lambda rows: model.predict(as_model_input(model, rows, schema))
+        df_fe['engagement_rate_pred'] = predict(X) if cache is None else cache.predict(predict, X)
+    return df_fe
+
+
+class ChunkWriter:
+    """Appends scored chunks to a single CSV or Parquet file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.is_parquet = self.path.suffix.lower() == '.parquet'
+        self._writer = None
+        self._schema = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame):
+        if self.is_parquet:
+            import pyarrow as pa, pyarrow.parquet as pq
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(str(self.path), self._schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        self._first = False
+
+    def write_csv_text(self, text: str):
+        """Append a chunk that was already rendered with DataFrame.to_csv (header included for chunk 0)."""
+        with open(self.path, 'w' if self._first else 'a', encoding='utf-8', newline='') as fh:
+            fh.write(text)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def iter_chunks(path: str, chunksize: int):
+    if str(path).lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from iter_csv_chunks(path, chunksize)
+
+
+def score_streaming(input_path: str, model, output_path: str, chunksize: int, schema, text_cache=None,
+                    feature_store=None, cache=None) -> int:
+    """
+    Score the input in fixed-size row chunks and append each result to the output,
+    so peak memory is bounded by the chunk size rather than the input size.
+    The feature schema fixes column alignment for every chunk.
+    """
+    writer = ChunkWriter(output_path)
+    total = 0
+    start = time.perf_counter()
+    try:
+        for i, chunk in enumerate(iter_chunks(input_path, chunksize)):
+            t0 = time.perf_counter()
+            scored = score_frame(chunk, model, schema, text_cache, feature_store, cache)
+            writer.write(scored)
+            total += len(scored)
+            dt = time.perf_counter() - t0
+            log.info(f'🧮 Chunk {i}: {len(scored)} rows in {dt:.2f}s '
+                     f'({len(scored) / max(dt, 1e-9):,.0f} rows/s) — total {total:,} rows')
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    log.info(f'✅ Streamed {total:,} rows in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)')
+    return total
+
+
+# ---------------------------------------------------------
+# MULTI-PROCESS SCORING
+# ---------------------------------------------------------
+_worker_model = None
+_worker_store = None
+_worker_cache = None
+
+
+def load_model(model_path: str, engine: str = 'auto'):
+    """
+    'auto' scores micro-batches with the compiled forest next to the model and larger
+    batches with sklearn (see AutoPredictor); 'compiled' and 'sklearn' force one engine.
+    """
+    if engine == 'sklearn':
+        return load_joblib(model_path)
+    return load_predictor(model_path, engine=engine)
+
+
+def _init_worker(model_path: str, engine: str = 'auto', cache_mode: str = 'off', cache_size: int = DEFAULT_MAX_ITEMS,
+                 cache_ttl: float = DEFAULT_TTL_S):
+    """
+    Load the model (and feature store) once per worker process; arrays are memory-mapped
+    where possible. With cache_mode='disk' workers share the SQLite tier; each has its own memory tier.
+    """
+    global _worker_model, _worker_store, _worker_cache
+    _worker_store = load_store_for(model_path, resolve_schema(model_path))
+    _worker_cache = open_prediction_cache(model_path, cache_mode, cache_size, cache_ttl)
+    _worker_model = load_predictor(model_path, engine=engine)
+    if hasattr(_worker_model, 'n_jobs'):
+        _worker_model.n_jobs = 1  # parallelism comes from the pool, avoid oversubscription
+
+
+def _score_shard(chunk: pd.DataFrame, schema, as_csv: bool, header: bool):
+    """Returns (rows, scored chunk or its CSV text, cache hits, cache misses) for this shard."""
+    before = (_worker_cache.hits, _worker_cache.misses) if _worker_cache is not None else (0, 0)
+    scored = score_frame(chunk, _worker_model, schema, feature_store=_worker_store, cache=_worker_cache)
+    after = (_worker_cache.hits, _worker_cache.misses) if _worker_cache is not None else (0, 0)
+    payload = scored.to_csv(index=False, header=header, lineterminator=os.linesep) if as_csv else scored
+    return len(scored), payload, after[0] - before[0], after[1] - before[1]
+
+
+def score_parallel(input_path: str, model_path: str, output_path: str, chunksize: int, workers: int,
+                   engine: str = 'auto', cache_mode: str = 'off', cache_size: int = DEFAULT_MAX_ITEMS,
+                   cache_ttl: float = DEFAULT_TTL_S) -> tuple:
+    """
+    Shard the input into chunks, engineer and score them in a process pool and write
+    the results back in input order. Chunk boundaries are the same as in streaming mode,
+    so the output is byte-identical to a single-process run with the same --chunksize.
+    Returns (rows, cache hits, cache misses) summed over the workers.
+    """
+    writer = ChunkWriter(output_path)
+    as_csv = not writer.is_parquet
+    schema = resolve_schema(model_path)
+    total = hits = misses = 0
+    start = time.perf_counter()
+    pending = deque()
+    max_in_flight = workers * 2  # bounds memory: at most this many chunks are queued
+
+    def drain_one():
+        nonlocal total, hits, misses
+        i, t0, fut = pending.popleft()
+        n, result, shard_hits, shard_misses = fut.result()
+        hits, misses = hits + shard_hits, misses + shard_misses
+        if as_csv:
+            writer.write_csv_text(result)
+        else:
+            writer.write(result)
+        total += n
+        dt = time.perf_counter() - t0
+        log.info(f'🧮 Chunk {i}: {n} rows in {dt:.2f}s (worker) — total {total:,} rows')
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path, engine, cache_mode, cache_size, cache_ttl)) as pool:
+            for i, chunk in enumerate(iter_chunks(input_path, chunksize)):
+                pending.append((i, time.perf_counter(), pool.submit(_score_shard, chunk, schema, as_csv, i == 0)))
+                if len(pending) >= max_in_flight:
+                    drain_one()
+            while pending:
+                drain_one()
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    log.info(f'✅ Scored {total:,} rows with {workers} workers in {elapsed:.2f}s '
+             f'({total / max(elapsed, 1e-9):,.0f} rows/s)')
+    return total, hits, misses
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--input', default='Notebook/sample_posts.csv')
     parser.add_argument('--model', default='artifacts/model.joblib')
     parser.add_argument('--output', default='artifacts/predictions.csv')
+    parser.add_argument('--chunksize', type=int, default=0,
+                        help='Rows per chunk; >0 enables streaming mode (CSV or .parquet output)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes; >1 shards the input across a process pool (implies streaming)')
+    parser.add_argument('--engine', choices=ENGINES, default='auto',
+                        help="'auto' scores batches of up to COMPILED_MAX_ROWS rows with the compiled forest "
+                             "(.npz next to the model) and larger ones with sklearn; 'compiled' / 'sklearn' force one")
+    parser.add_argument('--cache', choices=CACHE_MODES, default='memory',
+                        help="Prediction cache: 'memory' reuses predictions within this run, 'disk' also across "
+                             "runs (SQLite next to the model), 'off' scores every row")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ITEMS,
+                        help='In-memory cache entries (per worker process with --workers)')
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL_S, help='Seconds a cached prediction stays valid')
     args = parser.parse_args()
 
-    df = pd.read_csv(args.input)
-    df_fe = coerce_and_engineer(df)
-    model = load_joblib(args.model)
-    cat_cols, num_cols = get_feature_sets(df_fe)
-    X = pd.get_dummies(df_fe[cat_cols + num_cols], columns=cat_cols, drop_first=True)
-    preds = model.predict(X)
-    df_fe['engagement_rate_pred'] = preds
-    df_fe.to_csv(args.output, index=False)
+    with timed('predict.run', workers=args.workers, chunksize=args.chunksize) as run:
+        if args.workers > 1:
+            run.rows, hits, misses = score_parallel(args.input, args.model, args.output,
+                                                    args.chunksize or DEFAULT_CHUNKSIZE, args.workers, args.engine,
+                                                    args.cache, args.cache_size, args.cache_ttl)
+        else:
+            with timed('predict.load_model', engine=args.engine):
+                model = load_model(args.model, args.engine)
+                schema = resolve_schema(args.model, model)
+                feature_store = load_store_for(args.model, schema)
+                cache = open_prediction_cache(args.model, args.cache, args.cache_size, args.cache_ttl)
+            if args.chunksize > 0:
+                run.rows = score_streaming(args.input, model, args.output, args.chunksize, schema, TEXT_CACHE,
+                                           feature_store, cache)
+            else:
+                with timed('predict.load') as t:
+                    df = load_csv(args.input)
+                    t.rows = len(df)
+                df_fe = score_frame(df, model, schema, TEXT_CACHE, feature_store, cache)
+                with timed('predict.write', rows=len(df_fe)):
+                    if args.output.lower().endswith('.parquet'):
+                        write_parquet(df_fe, args.output)
+                    else:
+                        df_fe.to_csv(args.output, index=False)
+                run.rows = len(df_fe)
+            flush_text_cache(TEXT_CACHE)
+            hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+            if cache is not None:
+                cache.close()
+        if args.cache != 'off':
+            rate = hits / max(hits + misses, 1)
+            log.info(f'♻️ Prediction cache: {hits:,} hits / {misses:,} misses ({rate:.1%} hit rate), '
+                     f'{misses:,} rows scored by the model')
+            run.fields.update(cache_hits=hits, cache_misses=misses, cache_hit_rate=round(rate, 4))
     log.info(f'Wrote predictions to {args.output}')
+    log.info(f'⏱️ Stage metrics written to {dump_metrics()}')
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,215 @@
+# src/pipeline/serve.py
+from __future__ import annotations
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import numpy as np
+
+from src.components.forest_compiler import load_predictor
+from src.components.feature_schema import as_model_input, records_matrix, resolve_schema
+from src.components.feature_store import load_store_for
+from src.exception import CustomException
+from src.pipeline.predict_pipeline import popularity_label
+from src.logger import export_prometheus, get_logger, histogram, logging_stats, timed
+
+log = get_logger(__name__)
+
+
+class InvalidRequest(CustomException):
+    """Records of one request could not be encoded; answered with 400, other requests are unaffected."""
+
+
+class _Pending:
+    __slots__ = ("records", "done", "result", "error", "queued_at", "started_at", "finished_at", "batch_size")
+
+    def __init__(self, records: List[dict]):
+        self.records = records
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.queued_at = time.perf_counter()
+        self.started_at = self.finished_at = self.queued_at
+        self.batch_size = 0
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to `max_wait_ms` (or `max_batch` rows) and scores
+    them with a single model.predict call. Records are encoded per request, so a request
+    that cannot be encoded fails with InvalidRequest without affecting the rest of its batch.
+    """
+
+    def __init__(self, model, schema, max_batch: int = 256, max_wait_ms: float = 5.0, feature_store=None):
+        self.model = model
+        self.schema = schema
+        self.feature_store = feature_store
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, records: List[dict], timeout: float = 30.0) -> _Pending:
+        item = _Pending(records)
+        self._queue.put(item)
+        if not item.done.wait(timeout):
+            raise CustomException("Prediction timed out")
+        if item.error is not None:
+            raise item.error
+        return item
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0].records)
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item.records)
+            self._score(batch, rows)
+
+    def _score(self, batch: List[_Pending], rows: int):
+        started = time.perf_counter()
+        try:
+            with timed("serve.batch", rows=rows, requests=len(batch)):
+                # dict -> matrix fast path, one request at a time so a malformed request fails alone
+                matrices = []
+                for item in batch:
+                    try:
+                        matrices.append(records_matrix(item.records, self.schema, self.feature_store))
+                    except Exception as e:
+                        log.warning(f"⚠️ Rejected request ({len(item.records)} rows): {e}")
+                        item.error = InvalidRequest(f"Invalid post data: {e}")
+                valid = [item for item in batch if item.error is None]
+                if valid:
+                    X = np.vstack(matrices)
+                    preds = self.model.predict(as_model_input(self.model, X, self.schema))
+            offset = 0
+            for item in valid:
+                n = len(item.records)
+                item.result = preds[offset:offset + n].tolist()
+                item.batch_size = len(X)
+                offset += n
+        except Exception as e:
+            log.exception(f"❌ Batch scoring failed: {e}")
+            for item in batch:
+                if item.error is None:
+                    item.error = e
+        finally:
+            finished = time.perf_counter()
+            for item in batch:
+                item.started_at, item.finished_at = started, finished
+                item.done.set()
+
+
+def _make_handler(batcher: MicroBatcher):
+    class PredictionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "logging": logging_stats()})
+            elif self.path == "/metrics":
+                # latency histograms of every timed stage, Prometheus text format
+                body = export_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"error": "not found"})
+                return
+            t0 = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"null")
+                single = isinstance(payload, dict)
+                records = [payload] if single else payload
+                if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+                    raise ValueError("Body must be a post object or a non-empty JSON array of post objects")
+            except Exception as e:
+                self._send(400, {"error": str(e)})
+                return
+
+            try:
+                item = batcher.submit(records)
+            except InvalidRequest as e:
+                self._send(400, {"error": str(e)})
+                return
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+                return
+
+            results = [{"engagement_rate": er, "label": popularity_label(er)} for er in item.result]
+            total_ms = (time.perf_counter() - t0) * 1000
+            # histogram only, no metrics.jsonl line; the per-request log line is debug level
+            histogram("serve.request").observe(total_ms, len(records))
+            timing = {"total_ms": round(total_ms, 3),
+                      "queue_ms": round((item.started_at - item.queued_at) * 1000, 3),
+                      "score_ms": round((item.finished_at - item.started_at) * 1000, 3),
+                      "batch_rows": item.batch_size}
+            log.debug(f"⚡ /predict rows={len(records)} batch_rows={item.batch_size} total={total_ms:.2f}ms")
+            self._send(200, {"predictions": results[0] if single else results, "timing": timing})
+
+        def log_message(self, format, *args):  # route http.server access logs away from stderr
+            pass
+
+    return PredictionHandler
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # default of 5 resets connections under bursts of concurrent clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP prediction service for Social Media Post Popularity")
+    parser.add_argument("--model", default="artifacts/model.joblib")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=256, help="Max rows per model.predict call")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Max time to wait while filling a batch")
+    args = parser.parse_args()
+
+    model = load_predictor(args.model)
+    schema = resolve_schema(args.model, model)
+    batcher = MicroBatcher(model, schema, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                           feature_store=load_store_for(args.model, schema))
+    server = PredictionServer((args.host, args.port), _make_handler(batcher))
+    log.info(f"🚀 Prediction service listening on http://{args.host}:{args.port} (model={args.model})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        log.info("🛑 Prediction service stopped")
+
+
+if __name__ == "__main__":
+    main()
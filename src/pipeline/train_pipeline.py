@@ -2,41 +2,131 @@
 from __future__ import annotations
 import argparse
 from pathlib import Path
-from src.components.data_ingestion import load_csv
-from src.components.model_trainer import train_and_save
-from src.logger import get_logger
+from src.Utils import append_parquet, write_processed
+from src.components.data_ingestion import TEXT_CACHE, iter_csv_chunks, load_csv
+from src.components.data_transformation import coerce_and_engineer
+from src.components.model_trainer import (
+    FIT_MODES, OOC_BATCH_ROWS, OOC_CHUNK_ROWS, prepare_training_frame, train_and_save, train_incremental,
+    train_out_of_core,
+)
+from src.components.text_features import flush_text_cache
+from src.logger import dump_metrics, get_logger, timed
 
 log = get_logger(__name__)
 
 
+def stream_processed(input_path: str, processed_out: str, chunksize: int, partition_month: bool = False) -> int:
+    """
+    Engineer the input CSV chunk by chunk into the processed dataset: the first chunk
+    replaces it, later chunks are appended as part files. Returns the rows written.
+    """
+    if str(processed_out).lower().endswith(".csv"):
+        raise ValueError("Out-of-core training needs a Parquet processed dataset, not a .csv")
+    rows = 0
+    for i, chunk in enumerate(iter_csv_chunks(input_path, chunksize)):
+        df_clean, _, _ = prepare_training_frame(coerce_and_engineer(chunk))
+        if df_clean.empty:
+            continue
+        if rows == 0:
+            write_processed(df_clean, processed_out, by_month=partition_month)
+        else:
+            append_parquet(df_clean, processed_out)
+        rows += len(df_clean)
+        log.info(f"🧱 Chunk {i}: {len(df_clean)} rows written to {processed_out} ({rows} total)")
+    return rows
+
+
 def main():
     parser = argparse.ArgumentParser(description="Train model for Social Media Post Popularity Prediction")
     parser.add_argument("--input", default="Notebook/sample_posts.csv", help="Path to input CSV dataset")
     parser.add_argument("--model", default="artifacts/model.joblib", help="Path to save trained model")
-    parser.add_argument("--processed", default="artifacts/processed.parquet", help="Path to save processed data")
+    parser.add_argument("--processed", default="artifacts/processed",
+                        help="Processed data: a directory (partitioned by platform) or a .parquet file")
+    parser.add_argument("--partition-month", action="store_true",
+                        help="Also partition the processed dataset by posting month")
+    parser.add_argument("--summary", default=None,
+                        help="Path to save per-platform evaluation summary (default: next to the model)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Warm-start: grow the existing model on --input (new rows only) and append them")
+    parser.add_argument("--new-trees", type=int, default=50, help="Trees to add in incremental mode")
+    parser.add_argument("--skip-summary", action="store_true",
+                        help="Incremental mode: do not rescore the full dataset for the dashboard summary")
+    parser.add_argument("--search", action="store_true",
+                        help="Successive-halving hyperparameter search before the final fit")
+    parser.add_argument("--search-candidates", type=int, default=24, help="Configurations sampled for --search")
+    parser.add_argument("--search-workers", type=int, default=None, help="Worker processes for --search (default: CPUs)")
+    parser.add_argument("--latency-budget-ms", type=float, default=None,
+                        help="Prefer configurations whose single-row predict latency is within this budget")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="Stream --input into the processed dataset chunk by chunk and train from "
+                             "memory-mapped row groups instead of loading everything into memory")
+    parser.add_argument("--fit-mode", choices=FIT_MODES, default="mmap",
+                        help="Out-of-core: one forest on the memmap, or per-chunk forests merged into one")
+    parser.add_argument("--chunksize", type=int, default=OOC_BATCH_ROWS,
+                        help="Out-of-core: rows per CSV chunk and per Parquet batch")
+    parser.add_argument("--chunk-rows", type=int, default=OOC_CHUNK_ROWS,
+                        help="Out-of-core chunked fit: rows per chunk forest")
+    parser.add_argument("--skip-stream", action="store_true",
+                        help="Out-of-core: train from the existing --processed dataset without re-reading --input")
     args = parser.parse_args()
 
     log.info("🚀 Train pipeline started")
 
+    search = None
+    if args.search:
+        search = {"n_candidates": args.search_candidates, "workers": args.search_workers,
+                  "latency_budget_ms": args.latency_budget_ms}
+
     # Step 1: Validate input path
     input_path = Path(args.input)
-    if not input_path.exists():
+    if not (args.out_of_core and args.skip_stream) and not input_path.exists():
         log.error(f"❌ Input file not found: {input_path.resolve()}")
         raise FileNotFoundError(f"Input CSV not found: {input_path.resolve()}")
 
+    if args.out_of_core:
+        # Steps 2-4 chunk by chunk: input → processed dataset → memory-mapped matrix → model
+        try:
+            if not args.skip_stream:
+                with timed("train.stream_processed") as t:
+                    t.rows = stream_processed(str(input_path), args.processed, args.chunksize, args.partition_month)
+            with timed("train.train_out_of_core", fit_mode=args.fit_mode, search=bool(search)):
+                stats = train_out_of_core(args.processed, args.model, args.summary, args.fit_mode, search,
+                                          batch_rows=args.chunksize, chunk_rows=args.chunk_rows)
+            log.info("✅ Training completed successfully")
+            log.info(f"📊 Training summary:\n{stats}")
+            log.info(f"⏱️ Stage metrics written to {dump_metrics()}")
+        except Exception as e:
+            log.exception(f"❌ Training pipeline failed: {e}")
+            raise
+        return
+
     # Step 2: Load data
     try:
-        df = load_csv(str(input_path))
+        with timed("train.load") as t:
+            df = load_csv(str(input_path))
+            t.rows = len(df)
         log.info(f"✅ Data loaded: shape={df.shape}")
     except Exception as e:
         log.exception(f"❌ Failed to load data: {e}")
         raise
 
-    # Step 3: Train and Save
+    # Step 3: Feature engineering (same transformation used at prediction time)
+    with timed("train.engineer", rows=len(df)):
+        df = coerce_and_engineer(df, text_cache=TEXT_CACHE)
+        flush_text_cache(TEXT_CACHE)
+
+    # Step 4: Train and Save
     try:
-        stats = train_and_save(df, args.model, args.processed)
+        if args.incremental:
+            with timed("train.incremental", rows=len(df)):
+                stats = train_incremental(df, args.model, args.processed, n_new_trees=args.new_trees,
+                                          summary_out=args.summary, refresh_summary=not args.skip_summary)
+        else:
+            with timed("train.train_and_save", rows=len(df), search=bool(search)):
+                stats = train_and_save(df, args.model, args.processed, args.summary, args.partition_month, search)
         log.info("✅ Training completed successfully")
         log.info(f"📊 Training summary:\n{stats}")
+        log.info(f"⏱️ Stage metrics written to {dump_metrics()}")
     except Exception as e:
         log.exception(f"❌ Training pipeline failed: {e}")
         raise
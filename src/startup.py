@@ -0,0 +1,162 @@
+# src/startup.py
+"""
+Cold-start helpers for app.py: a per-module import-time profile of the page's and the
+warm-up's imports and a background thread that warms modules and artifacts while the
+first widgets are already interactive. The profile is written to logs/startup_profile.json.
+"""
+import builtins
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any
+
+from src.logger import LOG_DIR, get_logger, timed
+
+log = get_logger(__name__)
+
+PROFILE_FILE = LOG_DIR / "startup_profile.json"
+_PROFILE: Dict[str, Any] = {"imports_ms": {}, "warmup_imports_ms": {}, "warmup_ms": {}, "first_paint_ms": None}
+_PROFILE_LOCK = threading.Lock()
+_WARMUP_THREAD = None
+_IMPORTS_PROFILED = False
+_IMPORT_HOOK: Dict[str, Callable] = {}  # original and profiling __import__ while imports are profiled
+WARMUP_THREAD_NAME = "artifact-warmup"
+# the profile is written once, when both of these have finished
+_PENDING = {"imports", "warmup"}
+
+
+def _record(section: str, name: str, ms: float):
+    with _PROFILE_LOCK:
+        _PROFILE[section][name] = round(ms, 1)
+
+
+def startup_profile() -> Dict[str, Any]:
+    with _PROFILE_LOCK:
+        return json.loads(json.dumps(_PROFILE))
+
+
+def _finished(part: str):
+    """Mark `part` of the start-up as done; the last one writes the profile."""
+    with _PROFILE_LOCK:
+        if part not in _PENDING:
+            return
+        _PENDING.discard(part)
+        if _PENDING:
+            return
+    _stop_import_profile()
+    save_startup_profile()
+
+
+def save_startup_profile(path=None):
+    path = path or PROFILE_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(startup_profile(), indent=2), encoding="utf-8")
+    return path
+
+
+def start_import_profile():
+    """
+    Start timing each import statement that loads a new module, dependencies included (the
+    cumulative column of `python -X importtime`): on the calling thread into 'imports_ms',
+    on the warm-up thread into 'warmup_imports_ms'. Call it before warm_up so modules the
+    warm-up loads first are profiled too. Only the first call in the process installs the
+    hook (later Streamlit reruns find every module loaded, and patching builtins.__import__
+    from overlapping sessions could leave a stale wrapper); it is removed once the page's
+    imports and the warm-up have both finished.
+    """
+    global _IMPORTS_PROFILED
+    with _PROFILE_LOCK:
+        if _IMPORTS_PROFILED:
+            return
+        _IMPORTS_PROFILED = True
+
+    original = builtins.__import__
+    owner = threading.get_ident()
+    nested = threading.local()
+
+    def profiled(name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() == owner:
+            section = "imports_ms"
+        elif threading.current_thread().name == WARMUP_THREAD_NAME:
+            section = "warmup_imports_ms"
+        else:
+            section = None
+        if section is None or not _IMPORT_HOOK or getattr(nested, "depth", 0) or level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        nested.depth = 1
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            nested.depth = 0
+            _record(section, name, (time.perf_counter() - start) * 1000)
+
+    _IMPORT_HOOK.update(original=original, wrapper=profiled)
+    builtins.__import__ = profiled
+
+
+def _stop_import_profile():
+    """Restore builtins.__import__; a wrapper someone else stacked on top stays, as a pass-through."""
+    if _IMPORT_HOOK and builtins.__import__ is _IMPORT_HOOK["wrapper"]:
+        builtins.__import__ = _IMPORT_HOOK["original"]
+    _IMPORT_HOOK.clear()
+
+
+@contextmanager
+def import_profile(stage: str = "app.imports"):
+    """
+    Time the page's deferred imports as `stage`, profiling them per module (see
+    start_import_profile, which is called here if the page has not already). Only the
+    first run is timed; on later reruns the block runs as is.
+    """
+    start_import_profile()
+    with _PROFILE_LOCK:
+        first = "imports" in _PENDING
+    if not first:
+        yield
+        return
+    with timed(stage):
+        try:
+            yield
+        finally:
+            _finished("imports")
+
+
+def mark_first_paint(ms: float):
+    """Time from script start until the first interactive widgets were sent (first run only)."""
+    with _PROFILE_LOCK:
+        if _PROFILE["first_paint_ms"] is not None:
+            return
+        _PROFILE["first_paint_ms"] = round(ms, 1)
+    log.info(f"🎨 First paint after {ms:.0f}ms")
+
+
+def warm_up(tasks: Dict[str, Callable[[], Any]]) -> threading.Thread:
+    """
+    Run `tasks` in order on one daemon thread, once per process (later calls return the
+    running or finished thread). A failing task is logged and skipped; the page loads
+    that artifact itself when it renders.
+    """
+    global _WARMUP_THREAD
+    with _PROFILE_LOCK:
+        if _WARMUP_THREAD is not None:
+            return _WARMUP_THREAD
+
+        def run():
+            start = time.perf_counter()
+            for name, task in tasks.items():
+                try:
+                    with timed("startup.warmup", task=name) as t:
+                        task()
+                    _record("warmup_ms", name, t.duration_ms)
+                except Exception as e:
+                    log.warning(f"⚠️ Warm-up task '{name}' failed: {e}")
+            log.info(f"🔥 Warm-up finished in {(time.perf_counter() - start) * 1000:.0f}ms "
+                     f"({', '.join(tasks)})")
+            _finished("warmup")
+
+        _WARMUP_THREAD = threading.Thread(target=run, name=WARMUP_THREAD_NAME, daemon=True)
+        _WARMUP_THREAD.start()
+        return _WARMUP_THREAD
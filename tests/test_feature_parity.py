@@ -0,0 +1,83 @@
+# tests/test_feature_parity.py
+"""The records fast path (engineer_records / records_matrix) must match the DataFrame path."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.data_transformation import coerce_and_engineer, get_feature_sets
+from src.components.feature_schema import build_feature_schema, build_matrix, records_matrix
+from src.components.feature_store import HISTORY_FEATURES, FeatureStore
+
+EDGE_RECORDS = [
+    {},
+    {"hour": 8},
+    {"hour": "8"},
+    {"hour": "late"},
+    {"weekday": "Mon"},
+    {"weekday": "6"},
+    {"weekday": 6, "hour": 23.0},
+    {"weekday": None, "hour": None},
+    {"posted_at": "05-07-2024 14:00", "hour": 3},
+    {"posted_at": "2024-03-02T08:30:00"},
+    {"posted_at": "not a date", "weekday": 5},
+    {"posted_at": None},
+    {"likes": "12", "comments": None, "shares": 3.5, "followers": "abc", "views": -1},
+    {"platform": " TikTok ", "media_type": "VIDEO", "followers": 0},
+    {"platform": None, "media_type": "podcast"},
+    {"caption": "Big news 😀 #launch #Launch", "hashtags": "#a #b", "caption_length": 7},
+    {"caption": None, "hashtags": float("nan")},
+    {"hashtags": "#AI #ai #coding,#x 😀 ##"},
+]
+
+
+@pytest.fixture(scope="module")
+def store():
+    rng = np.random.default_rng(0)
+    n = 400
+    history = pd.DataFrame({
+        "post_id": [f"p{i}" for i in range(n)],
+        "platform": rng.choice(["instagram", "tiktok", "twitter"], n),
+        "media_type": rng.choice(["image", "video"], n),
+        "posted_at": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 120 * 24, n), unit="h"),
+        "engagement_rate": rng.random(n) / 10,
+    })
+    store = FeatureStore()
+    store.update(history)
+    return store
+
+
+def _schema(feature_store):
+    cat_cols, num_cols = get_feature_sets()
+    numeric = num_cols + ["weekday"] + (HISTORY_FEATURES if feature_store is not None else [])
+    categories = {"platform": ["instagram", "tiktok", "twitter"], "media_type": ["image", "video"]}
+    return build_feature_schema(pd.DataFrame(), numeric, cat_cols, categories)
+
+
+def _dataframe_matrix(records, schema, feature_store):
+    return build_matrix(coerce_and_engineer(pd.DataFrame(records), feature_store=feature_store), schema)
+
+
+@pytest.mark.parametrize("with_store", [False, True])
+@pytest.mark.parametrize("record", EDGE_RECORDS, ids=[str(r) for r in EDGE_RECORDS])
+def test_single_record_matches_dataframe_path(record, with_store, store):
+    feature_store = store if with_store else None
+    schema = _schema(feature_store)
+    np.testing.assert_array_equal(records_matrix([record], schema, feature_store),
+                                  _dataframe_matrix([record], schema, feature_store))
+
+
+@pytest.mark.parametrize("with_store", [False, True])
+def test_batch_matches_dataframe_path(with_store, store):
+    feature_store = store if with_store else None
+    schema = _schema(feature_store)
+    np.testing.assert_array_equal(records_matrix(EDGE_RECORDS, schema, feature_store),
+                                  _dataframe_matrix(EDGE_RECORDS, schema, feature_store))
+
+
+@pytest.mark.parametrize("with_store", [False, True])
+def test_batch_without_posted_at_keeps_hour(with_store, store):
+    feature_store = store if with_store else None
+    schema = _schema(feature_store)
+    records = [r for r in EDGE_RECORDS if "posted_at" not in r]
+    np.testing.assert_array_equal(records_matrix(records, schema, feature_store),
+                                  _dataframe_matrix(records, schema, feature_store))
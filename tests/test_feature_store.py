@@ -0,0 +1,136 @@
+# tests/test_feature_store.py
+"""FeatureStore trailing-window means against a brute-force scan of the posts, and post-id dedup."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.feature_store import HISTORY_WINDOWS, MIN_POSTS, FeatureStore, epoch_days
+
+PLATFORMS = ["instagram", "tiktok", "twitter"]
+MEDIA = ["image", "video"]
+
+
+def make_posts(n, seed=0, start="2024-01-01", days=60):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "post_id": [f"s{seed}-{i}" for i in range(n)],
+        "platform": rng.choice(PLATFORMS, n),
+        "media_type": rng.choice(MEDIA, n),
+        # few hours, so some cells have enough posts and others back off
+        "posted_at": pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n) * 24 + rng.choice([9, 19], n),
+                                                           unit="h"),
+        "engagement_rate": rng.random(n) / 10,
+    })
+
+
+def brute_force(posts, day0, n_days, platform, media_type, hour, day):
+    """Mean ER of the posts in each trailing window before `day`, with the store's back-off order."""
+    posted = epoch_days(posts["posted_at"])
+    end = day0 + n_days if day is None or np.isnan(day) else min(max(day, day0), day0 + n_days)
+    overall = posts["engagement_rate"].mean()
+    out = []
+    for window in HISTORY_WINDOWS:
+        in_window = (posted >= end - window) & (posted < end)
+        pm = in_window & (posts["platform"] == platform).to_numpy() & (posts["media_type"] == media_type).to_numpy()
+        cell = pm & (posts["posted_at"].dt.hour == hour).to_numpy()
+        value = overall
+        for mask, needed in ((in_window, 1), (pm, MIN_POSTS), (cell, MIN_POSTS)):
+            if mask.sum() >= needed:
+                value = posts["engagement_rate"].to_numpy()[mask].mean()
+        out.append(value)
+    return out
+
+
+@pytest.fixture(scope="module")
+def posts():
+    return make_posts(1_500)
+
+
+@pytest.fixture(scope="module")
+def store(posts):
+    store = FeatureStore()
+    # two batches out of time order: the day range grows in both directions
+    store.update(posts.iloc[750:])
+    store.update(posts.iloc[:750])
+    return store
+
+
+def test_trailing_windows_match_brute_force(posts, store):
+    rng = np.random.default_rng(1)
+    day0 = store.day0
+    queries = [(p, m, h, d) for p, m, h, d in zip(
+        rng.choice(PLATFORMS + ["myspace"], 200), rng.choice(MEDIA + ["podcast"], 200), rng.choice([9, 19, 3], 200),
+        rng.integers(day0 - 5, day0 + store.n_days + 5, 200).astype(float))]
+    queries += [("tiktok", "video", 19, np.nan), ("instagram", "image", 9, float(day0))]
+    platforms, media, hours, days = map(list, zip(*queries))
+    got = store.lookup(platforms, media, hours, days)
+    expected = [brute_force(posts, day0, store.n_days, *q) for q in queries]
+    np.testing.assert_allclose(got, expected, rtol=1e-12)
+
+
+def test_lookup_normalizes_categories_and_defaults_to_latest_window(posts, store):
+    latest = store.lookup(["tiktok"], ["video"], [19])
+    np.testing.assert_allclose(store.lookup([" TikTok "], ["VIDEO"], [19], [np.nan]), latest)
+    np.testing.assert_allclose(latest[0], brute_force(posts, store.day0, store.n_days, "tiktok", "video", 19, None))
+
+
+def test_a_post_never_sees_its_own_day():
+    posts = make_posts(10, seed=2, days=1)
+    store = FeatureStore()
+    store.update(posts)
+    day = float(store.day0)
+    # nothing before the first day: every level is empty, so the all-time mean is used
+    np.testing.assert_allclose(store.lookup(["tiktok"], ["video"], [19], [day]),
+                               [[store.sums.sum() / store.n_posts] * len(HISTORY_WINDOWS)])
+    # the next day's window holds exactly that day's posts
+    np.testing.assert_allclose(store.lookup(["myspace"], ["video"], [19], [day + 1]),
+                               [[posts["engagement_rate"].mean()] * len(HISTORY_WINDOWS)])
+
+
+def test_reingested_post_ids_are_skipped(posts):
+    store = FeatureStore()
+    assert store.update(posts) == len(posts)
+    sums, counts = store.sums.copy(), store.counts.copy()
+    assert store.update(posts) == 0
+    assert store.update(posts.iloc[::3]) == 0
+    np.testing.assert_array_equal(store.sums, sums)
+    np.testing.assert_array_equal(store.counts, counts)
+    assert store.n_posts == len(posts) and len(store.seen) == len(posts)
+
+
+def test_duplicate_ids_in_one_batch_count_once(posts):
+    batch = pd.concat([posts.iloc[:10], posts.iloc[:10]])
+    assert FeatureStore().update(batch) == 10
+
+
+def test_posts_without_ids_are_always_counted(posts):
+    store = FeatureStore()
+    batch = posts.iloc[:10].copy()
+    batch["post_id"] = [None] * 5 + list(batch["post_id"].iloc[5:])
+    assert store.update(batch) == 10
+    assert store.update(batch) == 5
+    assert store.n_posts == 15 and len(store.seen) == 5
+
+
+def test_rows_without_timestamp_or_target_are_skipped(posts):
+    batch = posts.iloc[:4].copy()
+    batch["posted_at"] = batch["posted_at"].astype(object)
+    batch.loc[batch.index[0], "posted_at"] = None
+    batch.loc[batch.index[1], "engagement_rate"] = np.nan
+    store = FeatureStore()
+    assert store.update(batch) == 2
+    # the skipped rows can still be added once they are complete
+    assert store.update(posts.iloc[:2]) == 2
+
+
+def test_save_and_load_keep_aggregates_and_seen_ids(tmp_path, posts, store):
+    loaded = FeatureStore.load(store.save(tmp_path / "model.store.npz"))
+    np.testing.assert_array_equal(loaded.sums, store.sums)
+    np.testing.assert_array_equal(loaded.counts, store.counts)
+    assert (loaded.platforms, loaded.media_types, loaded.day0) == (store.platforms, store.media_types, store.day0)
+    assert loaded.update(posts) == 0
+
+
+def test_update_requires_columns():
+    with pytest.raises(ValueError):
+        FeatureStore().update(pd.DataFrame({"platform": ["tiktok"]}))
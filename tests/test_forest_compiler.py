@@ -0,0 +1,76 @@
+# tests/test_forest_compiler.py
+"""The compiled forest and the engine picked by load_predictor must predict exactly what sklearn does."""
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.Utils import save_joblib
+from src.components.forest_compiler import (
+    AutoPredictor, CompiledForest, compile_forest, load_compiled_forest, load_predictor, save_compiled_forest,
+)
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 6))
+    y = X[:, 0] * 2 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=600)
+    X[rng.random(X.shape) < 0.05] = np.nan  # missing values take the learned missing_go_to_left branch
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def forest(data):
+    X, y = data
+    return RandomForestRegressor(n_estimators=25, max_depth=8, random_state=0, n_jobs=1).fit(X, y)
+
+
+@pytest.fixture
+def model_path(tmp_path, forest):
+    path = tmp_path / "model.joblib"
+    save_joblib(forest, str(path))
+    save_compiled_forest(forest, path.with_suffix(".npz"))
+    return path
+
+
+def test_compiled_matches_sklearn_exactly(data, forest):
+    X, _ = data
+    np.testing.assert_array_equal(CompiledForest(compile_forest(forest)).predict(X), forest.predict(X))
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_saved_forest_matches_sklearn_exactly(data, forest, model_path, mmap):
+    X, _ = data
+    compiled = load_compiled_forest(model_path.with_suffix(".npz"), mmap=mmap)
+    assert compiled.n_estimators == forest.n_estimators
+    np.testing.assert_array_equal(compiled.predict(X), forest.predict(X))
+
+
+def test_compiled_rejects_wrong_width(forest):
+    with pytest.raises(ValueError):
+        CompiledForest(compile_forest(forest)).predict(np.zeros((2, 3)))
+
+
+@pytest.mark.parametrize("rows", [1, 256, 257, 600])
+def test_auto_engine_matches_sklearn_exactly(data, forest, model_path, rows):
+    X, _ = data
+    predictor = load_predictor(model_path)
+    assert isinstance(predictor, AutoPredictor)
+    np.testing.assert_array_equal(predictor.predict(X[:rows]), forest.predict(X[:rows]))
+    # the sklearn model is only unpickled once a batch is too large for the compiled forest
+    assert (predictor._sklearn is not None) == (rows > predictor.max_rows)
+
+
+def test_stale_compiled_forest_falls_back_to_sklearn(model_path, forest):
+    compiled = model_path.with_suffix(".npz")
+    stat = model_path.stat()
+    os.utime(compiled, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+    assert isinstance(load_predictor(model_path), RandomForestRegressor)
+    assert isinstance(load_predictor(model_path, engine="compiled"), CompiledForest)
+
+
+def test_unknown_engine(model_path):
+    with pytest.raises(ValueError):
+        load_predictor(model_path, engine="gpu")
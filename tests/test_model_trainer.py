@@ -0,0 +1,143 @@
+# tests/test_model_trainer.py
+"""Warm-start incremental and out-of-core training on top of a full training run, and the successive-halving search."""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.Utils import load_joblib, read_processed
+from src.components import model_trainer
+from src.components.data_transformation import coerce_and_engineer
+from src.components.feature_store import FeatureStore, store_path_for
+from src.components.forest_compiler import compiled_path_for, load_compiled_forest
+
+SAMPLE_POSTS = Path(__file__).resolve().parents[1] / "Notebook" / "sample_posts.csv"
+SMALL_FOREST = {"n_estimators": 10, "max_depth": 6, "min_samples_leaf": 1, "max_features": 1.0}
+
+
+@pytest.fixture(scope="module")
+def posts():
+    return coerce_and_engineer(pd.read_csv(SAMPLE_POSTS, nrows=600))
+
+
+@pytest.fixture
+def trained(tmp_path, posts, monkeypatch):
+    monkeypatch.setattr(model_trainer, "DEFAULT_PARAMS", SMALL_FOREST)
+    model_path, processed = tmp_path / "model.joblib", tmp_path / "processed"
+    model_trainer.train_and_save(posts.iloc[:400], model_path, processed)
+    return model_path, processed
+
+
+def test_incremental_training_adds_exactly_the_new_trees(trained, posts):
+    model_path, processed = trained
+    before = load_joblib(str(model_path))
+
+    stats = model_trainer.train_incremental(posts.iloc[400:500], model_path, processed, n_new_trees=5,
+                                            refresh_summary=False)
+    assert (stats["trees_before"], stats["trees_after"]) == (10, 15)
+    after = load_joblib(str(model_path))
+    assert len(after.estimators_) == after.n_estimators == 15
+    assert not after.warm_start
+    # the existing trees are kept as they were, the compiled forest is re-exported with all of them
+    for old, kept in zip(before.estimators_, after.estimators_):
+        np.testing.assert_array_equal(old.tree_.threshold, kept.tree_.threshold)
+    assert load_compiled_forest(compiled_path_for(model_path)).n_estimators == 15
+
+    stats = model_trainer.train_incremental(posts.iloc[500:], model_path, processed, n_new_trees=3,
+                                            refresh_summary=False)
+    assert (stats["trees_before"], stats["trees_after"]) == (15, 18)
+    assert len(load_joblib(str(model_path)).estimators_) == 18
+
+
+def test_incremental_training_appends_rows_and_updates_the_store(trained, posts):
+    model_path, processed = trained
+    rows_before = len(read_processed(str(processed)))
+    posts_before = FeatureStore.load(store_path_for(model_path)).n_posts
+
+    stats = model_trainer.train_incremental(posts.iloc[400:500], model_path, processed, n_new_trees=2,
+                                            refresh_summary=False)
+    assert len(read_processed(str(processed))) == rows_before + stats["n_new_rows"] == rows_before + 100
+    assert FeatureStore.load(store_path_for(model_path)).n_posts == posts_before + 100
+
+    # the same posts again: appended to the dataset, but not counted twice in the store
+    model_trainer.train_incremental(posts.iloc[400:500], model_path, processed, n_new_trees=2, refresh_summary=False)
+    assert FeatureStore.load(store_path_for(model_path)).n_posts == posts_before + 100
+
+
+def test_incremental_training_needs_a_model(tmp_path, posts):
+    with pytest.raises(FileNotFoundError):
+        model_trainer.train_incremental(posts, tmp_path / "missing.joblib", tmp_path / "processed")
+
+
+@pytest.mark.parametrize("rows, chunk_rows, n_estimators", [(300, 100, 10), (300, 100, 200), (300, 10, 5),
+                                                           (300, 1_000, 7), (301, 100, 9)])
+def test_chunked_fit_keeps_the_tree_count(rows, chunk_rows, n_estimators):
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(rows, 3)), rng.normal(size=rows)
+    model = model_trainer._fit_chunked(X, y, dict(SMALL_FOREST, n_estimators=n_estimators), chunk_rows)
+    assert len(model.estimators_) == model.n_estimators == n_estimators
+    assert model.predict(X[:5]).shape == (5,)
+
+
+def test_out_of_core_chunked_training_keeps_the_tree_count(trained, tmp_path):
+    _, processed = trained
+    model_path = tmp_path / "ooc" / "model.joblib"
+    model_trainer.train_out_of_core(processed, model_path, fit_mode="chunked", chunk_rows=100)
+    assert len(load_joblib(str(model_path)).estimators_) == SMALL_FOREST["n_estimators"]
+    assert load_compiled_forest(compiled_path_for(model_path)).n_estimators == SMALL_FOREST["n_estimators"]
+
+# ---------------------------------------------------------
+# HYPERPARAMETER SEARCH
+# ---------------------------------------------------------
+SMALL_SPACE = {"n_estimators": [5, 10], "max_depth": [2, 4, None], "min_samples_leaf": [1, 5, 20],
+               "max_features": [1.0, 0.5]}
+
+
+@pytest.fixture
+def search(monkeypatch):
+    monkeypatch.setattr(model_trainer, "DEFAULT_PARAMS", SMALL_FOREST)
+    monkeypatch.setattr(model_trainer, "SEARCH_SPACE", SMALL_SPACE)
+    monkeypatch.setattr(model_trainer, "LATENCY_REPEATS", 2)
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(900, 4))
+    y = X[:, 0] - 2 * X[:, 1] ** 2 + rng.normal(scale=0.1, size=900)
+    return lambda **kwargs: model_trainer.search_hyperparameters(X, y, workers=1, **kwargs)
+
+
+def _rungs(results):
+    rungs = {}
+    for r in results["history"]:
+        rungs.setdefault(r["rung"], []).append(r)
+    return [rungs[i] for i in sorted(rungs)]
+
+
+def test_successive_halving_rungs(search):
+    results = search(n_candidates=9, factor=3, min_rows=100)
+    rungs = _rungs(results)
+    assert [len(r) for r in rungs] == [9, 3, 1]
+    assert [{r["rows"] for r in rung} for rung in rungs] == [{100}, {300}, {900}]
+    assert rungs[0][0]["params"] == SMALL_FOREST  # the defaults are always a candidate
+
+    # the best 1/factor of each rung (lowest RMSE) and nothing else moves on
+    for rung, survivors in zip(rungs, rungs[1:]):
+        ranked = sorted(rung, key=lambda r: r["rmse"])
+        assert {r["candidate"] for r in survivors} == {r["candidate"] for r in ranked[:len(rung) // 3]}
+    assert results["best"]["candidate"] == rungs[-1][0]["candidate"]
+    assert results["best_params"] == rungs[-1][0]["params"]
+
+
+def test_search_stops_when_one_candidate_is_left(search):
+    # 4 rungs are planned for 5 candidates (900 // 2**3 = 112 rows first), but 5 -> 2 -> 1
+    # leaves a single candidate before the full data is reached
+    rungs = _rungs(search(n_candidates=5, factor=2, min_rows=50))
+    assert [len(r) for r in rungs] == [5, 2, 1]
+    assert [rung[0]["rows"] for rung in rungs] == [112, 224, 448]
+
+
+def test_latency_budget_ranks_slow_candidates_last(search):
+    results = search(n_candidates=4, factor=4, min_rows=100, latency_budget_ms=0.0)
+    # nothing fits a zero budget: every candidate is flagged and the most accurate one still wins
+    assert not any(r["within_budget"] for r in results["history"])
+    final = _rungs(results)[-1]
+    assert results["best"]["candidate"] == min(final, key=lambda r: r["rmse"])["candidate"]
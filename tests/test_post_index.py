@@ -0,0 +1,107 @@
+# tests/test_post_index.py
+"""PostIndex range and top-K queries must return what a brute-force filter and sort of the rows does."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.model_evaluation import ALL_PLATFORMS
+from src.components.post_index import PostIndex, _bound, _epoch_seconds, page
+
+
+@pytest.fixture(scope="module")
+def index():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    posted_at = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90 * 24, n), unit="h")
+    df = pd.DataFrame({
+        "post_id": [f"p{i}" for i in range(n)],
+        "platform": rng.choice(["Instagram", "tiktok ", "twitter"], n),
+        # rounded so many rows tie on the sort key
+        "engagement_rate": np.round(rng.random(n) / 10, 3),
+        "posted_at": pd.Series(posted_at.strftime("%Y-%m-%d %H:%M:%S"), dtype=object),
+    })
+    df.loc[rng.random(n) < 0.03, "engagement_rate"] = np.nan
+    df.loc[rng.random(n) < 0.03, "posted_at"] = None
+    return PostIndex.build(df, predictions=np.round(rng.random(n) / 10, 2))
+
+
+def brute_force(index, platform=ALL_PLATFORMS, key="predicted_er", lo=None, hi=None, start=None, end=None,
+                k=None, descending=True):
+    a, b = index.slices[platform]
+    positions = np.arange(a, b)
+    values = index.values[key][a:b]
+    keep = ~np.isnan(values)
+    if lo is not None:
+        keep &= values >= lo
+    if hi is not None:
+        keep &= values <= hi
+    if start is not None or end is not None:
+        times = index.values["posted_at"][a:b]
+        keep &= ~np.isnan(times)
+        if start is not None:
+            keep &= times >= _bound(start)
+        if end is not None:
+            keep &= times < _bound(end)
+    positions, values = positions[keep], values[keep]
+    # ascending by value, ties by position; descending is the exact reverse
+    order = positions[np.lexsort((positions, values))]
+    if descending:
+        order = order[::-1]
+    return order if k is None else order[:k]
+
+
+QUERIES = [
+    {},
+    {"k": 10},
+    {"k": 10, "descending": False},
+    {"key": "engagement_rate", "lo": 0.02, "hi": 0.05},
+    {"key": "engagement_rate", "lo": 0.05},
+    {"key": "engagement_rate", "hi": 0.01, "descending": False},
+    {"lo": 0.03, "hi": 0.03},
+    {"start": "2024-02-01", "end": "2024-02-15"},
+    {"start": "2024-01-15", "lo": 0.03, "hi": 0.03},
+    {"start": "2024-02-01", "end": "2024-02-15", "k": 25},
+    {"start": "2024-01-01", "k": 5, "descending": False},
+    {"end": "2024-03-01", "key": "engagement_rate", "lo": 0.01, "hi": 0.09, "k": 40},
+    {"start": "2024-03-20", "end": "2024-03-21", "k": 1000},
+]
+
+
+@pytest.mark.parametrize("platform", [ALL_PLATFORMS, "instagram", "tiktok", "twitter"])
+@pytest.mark.parametrize("query", QUERIES, ids=[str(q) for q in QUERIES])
+def test_query_matches_brute_force(index, platform, query):
+    np.testing.assert_array_equal(index.query(platform, **query), brute_force(index, platform, **query))
+
+
+def test_platforms_are_normalized_slices(index):
+    assert index.platforms == ["instagram", "tiktok", "twitter"]
+    for name in index.platforms:
+        a, b = index.slices[name]
+        assert (index.rows["platform"].iloc[a:b] == name).all()
+
+
+def test_top_k_and_between_frames(index):
+    top = index.top_k(5, "tiktok")
+    assert len(top) == 5 and (top["platform"] == "tiktok").all()
+    assert top["predicted_er"].is_monotonic_decreasing
+    rows = index.between(0.02, 0.04)
+    assert rows["engagement_rate"].between(0.02, 0.04).all()
+    assert len(rows) == len(brute_force(index, key="engagement_rate", lo=0.02, hi=0.04))
+
+
+def test_unknown_platform_and_key(index):
+    assert len(index.query("myspace")) == 0
+    with pytest.raises(ValueError):
+        index.query(key="likes")
+
+
+def test_missing_timestamps_are_nan():
+    seconds = _epoch_seconds(pd.Series(["2024-01-01 00:00:00", None], dtype=object))
+    assert seconds[0] == _bound("2024-01-01") and np.isnan(seconds[1])
+
+
+def test_page():
+    positions = np.arange(95)
+    np.testing.assert_array_equal(page(positions, 2, 30), np.arange(30, 60))
+    np.testing.assert_array_equal(page(positions, 4, 30), np.arange(90, 95))
+    assert len(page(positions, 5, 30)) == 0
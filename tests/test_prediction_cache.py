@@ -0,0 +1,133 @@
+# tests/test_prediction_cache.py
+"""PredictionCache hit/miss accounting, LRU and TTL eviction, and invalidation by model version."""
+import numpy as np
+import pytest
+
+from src.components import prediction_cache
+from src.components.prediction_cache import (
+    PredictionCache, clear_prediction_cache, feature_keys, open_prediction_cache, prediction_cache_path_for,
+)
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, "time", clock)
+    return clock
+
+
+class CountingModel:
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, X):
+        self.rows += len(X)
+        return X.sum(axis=1)
+
+
+def rows(*values):
+    return np.array([[v, v * 2.0, -v] for v in values], dtype=float)
+
+
+def test_hits_and_misses_are_counted(clock):
+    cache, model = PredictionCache("v1"), CountingModel()
+    X = rows(1, 2, 3)
+    np.testing.assert_array_equal(cache.predict(model, X), X.sum(axis=1))
+    assert (cache.hits, cache.misses, model.rows) == (0, 3, 3)
+
+    X = rows(2, 3, 4)
+    np.testing.assert_array_equal(cache.predict(model, X), X.sum(axis=1))
+    assert (cache.hits, cache.misses, model.rows) == (2, 4, 4)
+    assert cache.stats() == {"hits": 2, "misses": 4, "hit_rate": 2 / 6, "memory_items": 4}
+
+
+def test_memory_tier_is_lru(clock):
+    cache, model = PredictionCache("v1", max_items=2), CountingModel()
+    cache.predict(model, rows(1, 2))
+    cache.predict(model, rows(1))      # 1 becomes the most recently used
+    cache.predict(model, rows(3))      # evicts 2
+    assert model.rows == 3
+    cache.predict(model, rows(1, 3))
+    assert model.rows == 3
+    cache.predict(model, rows(2))
+    assert model.rows == 4
+
+
+@pytest.mark.parametrize("disk", [False, True])
+def test_entries_expire_after_ttl(tmp_path, clock, disk):
+    cache = PredictionCache("v1", tmp_path / "p.sqlite" if disk else None, ttl=60)
+    model = CountingModel()
+    cache.predict(model, rows(1))
+    clock.now += 60
+    cache.predict(model, rows(1))
+    assert model.rows == 1
+    clock.now += 1
+    cache.predict(model, rows(1))
+    assert model.rows == 2
+    cache.close()
+
+
+def test_disk_tier_survives_reopen_for_the_same_version(tmp_path, clock):
+    path, model = tmp_path / "p.sqlite", CountingModel()
+    cache = PredictionCache("v1", path)
+    cache.predict(model, rows(1, 2))
+    cache.close()
+
+    cache = PredictionCache("v1", path)
+    cache.predict(model, rows(1, 2))
+    assert (cache.hits, model.rows) == (2, 2)
+    cache.close()
+
+
+def test_disk_tier_is_emptied_for_another_version(tmp_path, clock):
+    path, model = tmp_path / "p.sqlite", CountingModel()
+    cache = PredictionCache("v1", path)
+    cache.predict(model, rows(1, 2))
+    cache.close()
+
+    cache = PredictionCache("v2", path)
+    assert cache._rows == 0
+    cache.predict(model, rows(1, 2))
+    assert (cache.hits, model.rows) == (0, 4)
+    cache.close()
+
+
+def test_keys_depend_on_row_and_version():
+    X = rows(1, 2)
+    assert not np.array_equal(feature_keys(X, "v1"), feature_keys(X, "v2"))
+    assert not np.array_equal(feature_keys(X, "v1")[0], feature_keys(X, "v1")[1])
+    np.testing.assert_array_equal(feature_keys(X, "v1"), feature_keys(X.copy(), "v1"))
+
+
+def test_retrained_model_gets_a_new_version(tmp_path, clock):
+    model_path, model = tmp_path / "model.joblib", CountingModel()
+    model_path.write_bytes(b"model 1")
+    cache = open_prediction_cache(model_path, "disk")
+    cache.predict(model, rows(1))
+    cache.close()
+
+    model_path.write_bytes(b"model 2")
+    cache = open_prediction_cache(model_path, "disk")
+    cache.predict(model, rows(1))
+    assert (cache.hits, model.rows) == (0, 2)
+    cache.close()
+
+    clear_prediction_cache(model_path)
+    assert not prediction_cache_path_for(model_path).exists()
+
+
+def test_open_modes(tmp_path):
+    model_path = tmp_path / "model.joblib"
+    model_path.write_bytes(b"model")
+    assert open_prediction_cache(model_path, "off") is None
+    assert open_prediction_cache(model_path, "memory")._db is None
+    with pytest.raises(ValueError):
+        open_prediction_cache(model_path, "redis")